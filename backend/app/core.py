@@ -0,0 +1,354 @@
+"""
+What the API (`app.main`) and the standalone snapshot refresher
+(`app.refresher`) share: settings, fetching jobs from Teraslice, building
+the pipeline graph from them and publishing snapshots.  Nothing here creates
+the ASGI app, so the refresher runs without the frontend build.
+"""
+import asyncio
+import contextvars
+import gzip
+import importlib
+import logging
+import os
+import pprint
+import ssl
+import time
+
+import httpx
+
+from concurrent.futures import ThreadPoolExecutor
+from operator import itemgetter
+
+from pathlib import Path
+from pydantic_core import to_json
+from pydantic_settings import BaseSettings
+from typing import Literal, NamedTuple
+
+from .lib.ts import JobInfo, NodeTable
+from .lib.cache import REFRESHES_IN_FLIGHT, FetchResult
+from .lib.capture import CaptureRecorder, CaptureReplayer
+from .lib import health, parse_warnings, profiling, schema
+from .lib.memdiag import MemoryDiagnostics
+from .lib.metrics import Histogram
+from .lib.snapshot import LeaderLock, SnapshotStore
+from .lib.tracing import span
+
+# Get settings from Environment with Pydantic BaseSettings
+class Settings(BaseSettings):
+    teraslice_url: str = "http://localhost:5678"
+    grafana_url: str | None = None
+    cacert_file: Path | None = None
+    cache_ttl: int = 300    # Default TTL for cache entries in seconds
+    refresh_interval: int = 90  # Default interval for refreshing cache entriesin seconds
+    cache_backend_url: str | None = None  # e.g. redis://redis:6379/0 to share the cache between workers
+    cache_lock_ttl: int = 60  # Seconds a worker may hold a key's refresh lock in the shared backend
+    snapshot_dir: Path | None = None  # e.g. /dev/shm/teraslice-3d to share one snapshot between workers on a host
+    # 'shared': workers elect a leader to refresh snapshots themselves
+    # 'reader': only serve snapshots written by `python -m app.refresher`, never contact Teraslice
+    snapshot_mode: Literal['shared', 'reader'] = 'shared'
+    cpu_workers: int = 2  # Threads for JSON decoding and graph building, off the event loop
+    loop_monitor_interval: float = 0.5  # Seconds between event loop lag samples
+    loop_monitor_debug: bool = False  # Capture stacks of callbacks that block the event loop
+    loop_block_threshold: float = 0.1  # Seconds a callback may run before it counts as blocking
+    trace_buffer_size: int = 0  # Keep the N slowest requests per endpoint for /api/debug/traces (0 disables)
+    admin_token: str | None = None  # Required in the X-Admin-Token header by admin-only features
+    profiling_enabled: bool = False  # Allow admins to profile /api/pipeline_graph with the X-Profile header
+    profile_dir: Path | None = None  # Where profiles are saved when requested with X-Profile-Output: file
+    memory_diagnostics: bool = False  # Track RSS and tracemalloc growth between refreshes (slows allocations)
+    memory_sample_interval: float = 60  # Seconds between RSS samples
+    memory_growth_threshold_mb: float = 50  # Warn when memory grows by more than this between refresh cycles
+    # 'record': append every Teraslice /jobs response to CAPTURE_FILE
+    # 'replay': serve /jobs responses from CAPTURE_FILE instead of calling Teraslice
+    capture_mode: Literal['off', 'record', 'replay'] = 'off'
+    capture_file: Path | None = None  # e.g. captures/jobs.capture.gz
+    replay_speed: float = 0  # 0 replays one recorded response per fetch, N replays N times faster than recorded
+    # Modules registering handlers for in-house operators, e.g. '["mycompany.teraslice_ops"]'
+    operator_plugins: list[str] = []
+
+settings = Settings()
+
+# Setup logging
+log_level = os.getenv("LOG_LEVEL", "INFO").upper()
+logging.basicConfig(level=log_level)
+logger = logging.getLogger(__name__)
+
+if settings.cacert_file:
+    logger.info(f"Using custom CA certificate: {settings.cacert_file}")
+
+for plugin in settings.operator_plugins:
+    # Imported for the operator handlers they register, see app.lib.operators
+    importlib.import_module(plugin)
+    logger.info(f"Loaded operator plugin: {plugin}")
+
+# Bounded pool for the CPU-bound parts of a refresh (decoding the /jobs body,
+# building and encoding the graph) so they don't stall the event loop.
+cpu_executor = ThreadPoolExecutor(max_workers=settings.cpu_workers, thread_name_prefix='teraslice3d-cpu')
+
+
+async def _run_cpu_bound(func, *args):
+    """Run `func(*args)` on the CPU executor and await its result."""
+    loop = asyncio.get_running_loop()
+    # Carry the request's context over so spans recorded in the worker
+    # thread land in the right trace
+    context = contextvars.copy_context()
+    session = profiling.current_session()
+    if session is not None:
+        return await loop.run_in_executor(cpu_executor, context.run, session.run, func, *args)
+    return await loop.run_in_executor(cpu_executor, context.run, func, *args)
+
+
+UPSTREAM_JOBS_DURATION = Histogram(
+    'teraslice3d_upstream_jobs_request_duration_seconds',
+    'Latency of Teraslice /jobs requests, by outcome (success, http_error, transport_error).',
+    ['outcome'],
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 15, 20, 30, 45, 60),
+)
+GRAPH_BUILD_DURATION = Histogram(
+    'teraslice3d_graph_build_duration_seconds',
+    'Time to build and serialize the pipeline graph from jobs data.',
+)
+GRAPH_PAYLOAD_BYTES = Histogram(
+    'teraslice3d_graph_payload_bytes',
+    'Size of the serialized pipeline graph.',
+    buckets=(1e4, 5e4, 1e5, 2.5e5, 5e5, 1e6, 2.5e6, 5e6, 1e7, 2.5e7),
+)
+
+
+memory_diagnostics = MemoryDiagnostics(
+    sample_interval=settings.memory_sample_interval,
+    growth_threshold=int(settings.memory_growth_threshold_mb * 1024 * 1024),
+) if settings.memory_diagnostics else None
+
+
+# Same-host mode: one worker (holding the leader lock) refreshes and publishes
+# serialized snapshots that every worker on the host serves straight from a
+# shared memory mapping.  In reader mode the snapshots come from the separate
+# refresher process instead (see app/refresher.py).
+snapshots = SnapshotStore(settings.snapshot_dir) if settings.snapshot_dir else None
+snapshot_leader = LeaderLock(settings.snapshot_dir / 'leader.lock') if settings.snapshot_dir else None
+
+# Recording, or replaying, upstream /jobs responses (see lib/capture.py)
+if settings.capture_mode != 'off' and settings.capture_file is None:
+    raise ValueError(f"CAPTURE_FILE must be set when CAPTURE_MODE is '{settings.capture_mode}'")
+capture_recorder = CaptureRecorder(settings.capture_file) if settings.capture_mode == 'record' else None
+capture_replayer = (
+    CaptureReplayer(settings.capture_file, speed=settings.replay_speed) if settings.capture_mode == 'replay' else None
+)
+
+# The jobs query behind /api/pipeline_graph, which is what snapshots cover
+DEFAULT_JOBS_PARAMS = {'size': 500, 'active': 'true', 'ex': '_status'}
+PIPELINE_GRAPH_SNAPSHOT = 'pipeline_graph'
+PIPELINE_HEALTH_SNAPSHOT = 'pipeline_health'
+PARSE_WARNINGS_SNAPSHOT = 'parse_warnings'
+
+
+def _jobs_cache_key(size, active, ex) -> str:
+    return f"jobs_{size}_{active}_{ex}"
+
+
+def _publish_snapshot(name: str, payload: bytes) -> int:
+    """Publish a JSON `payload` along with a pre-compressed gzip variant."""
+    version = snapshots.publish(name, payload)
+    snapshots.publish(f"{name}.gz", gzip.compress(payload, compresslevel=6))
+    return version
+
+
+async def _refresh_snapshots() -> int:
+    """Fetch jobs, build the graph and publish both as snapshots.  Returns the
+    new graph snapshot version."""
+    with REFRESHES_IN_FLIGHT.labels(family='snapshot').track_inprogress():
+        jobs_data = await _fetch_jobs_from_api(**DEFAULT_JOBS_PARAMS)
+        version = await _run_cpu_bound(_build_and_publish_snapshots, jobs_data)
+    if memory_diagnostics is not None:
+        memory_diagnostics.refresh_completed()
+    return version
+
+
+def _build_and_publish_snapshots(jobs_data) -> int:
+    build = _build_pipeline_graph(jobs_data)
+    _publish_reports(build)
+    _publish_snapshot(_jobs_cache_key(**DEFAULT_JOBS_PARAMS), to_json(jobs_data))
+    version = _publish_snapshot(PIPELINE_GRAPH_SNAPSHOT, build.graph_json)
+    _publish_snapshot(PIPELINE_HEALTH_SNAPSHOT, to_json(health.latest))
+    _publish_snapshot(PARSE_WARNINGS_SNAPSHOT, to_json(parse_warnings.latest))
+    return version
+
+
+def _teraslice_client() -> httpx.AsyncClient:
+    """Create an HTTP client for the Teraslice API."""
+    # Configure SSL verification - use custom CA cert if provided
+    if settings.cacert_file:
+        ssl_context = ssl.create_default_context(cafile=str(settings.cacert_file))
+        verify_ssl = ssl_context
+    else:
+        verify_ssl = True
+
+    return httpx.AsyncClient(verify=verify_ssl)
+
+
+async def _fetch_jobs_from_api(size: None | int = 500, active: None | str = 'true', ex: None | str = '_status'):
+    """Fetch jobs from Teraslice API (internal function).
+
+    Args:
+        size (int): Number of jobs to fetch. Defaults to 500.
+        active (str): Filter for active jobs. Defaults to 'true'.
+        ex (str): Field to request from corresponding Execution. Defaults to '_status'.
+
+    Returns:
+        dict: The response from the Teraslice API.
+    """
+    return (await _fetch_jobs(size, active, ex)).data
+
+async def _fetch_jobs(size: None | int = 500, active: None | str = 'true', ex: None | str = '_status') -> FetchResult:
+    """`_fetch_jobs_from_api`, along with the size and digest of the response
+    body for the cache's refresh history."""
+    url = settings.teraslice_url
+
+    params = {'size': size, 'active': active, 'ex': ex}
+
+    start = time.perf_counter()
+    try:
+        with span('upstream'):
+            if capture_replayer is not None:
+                r = await _replay_jobs_response(f'{url}/jobs', params)
+            else:
+                async with _teraslice_client() as client:
+                    r = await client.get(f'{url}/jobs', params=params)
+                if capture_recorder is not None:
+                    # Compressing a large body takes a while, keep it off the loop
+                    await _run_cpu_bound(capture_recorder.record, params, r.status_code, r.content,
+                                         time.perf_counter() - start)
+        r.raise_for_status()  # Raise exception for HTTP errors
+    except httpx.HTTPError as e:
+        outcome = 'http_error' if isinstance(e, httpx.HTTPStatusError) else 'transport_error'
+        UPSTREAM_JOBS_DURATION.labels(outcome=outcome).observe(time.perf_counter() - start)
+        logger.error(f"HTTP error occurred when connecting to {url}: {e}")
+        raise
+    UPSTREAM_JOBS_DURATION.labels(outcome='success').observe(time.perf_counter() - start)
+
+    # The body can be several MB, decode it off the event loop.  The graph
+    # needs each job's status, so jobs fetched with it are checked against
+    # the schema it's built from.
+    validate = ex is not None and '_status' in ex.split(',')
+    with span('decode'):
+        return await _run_cpu_bound(_decode_jobs_response, r.content, validate)
+
+def _decode_jobs_response(content: bytes, validate: bool) -> FetchResult:
+    return FetchResult.from_payload(schema.decode_jobs(content, validate), content)
+
+async def _replay_jobs_response(url: str, params) -> httpx.Response:
+    """Build the response to a /jobs request from the capture being
+    replayed, taking as long as the original did when replaying in time."""
+    captured = await _run_cpu_bound(capture_replayer.next, params)
+    if capture_replayer.speed > 0:
+        await asyncio.sleep(captured.duration / capture_replayer.speed)
+    return httpx.Response(captured.status, content=captured.body,
+                          request=httpx.Request('GET', url, params=params))
+
+
+def _process_jobs_to_graph(jobs_data, warnings=None):
+    """Process jobs data into graph format (nodes and links).
+    
+    Args:
+        jobs_data: Raw jobs data from Teraslice API
+        warnings (ParseWarnings): Collects the jobs' parse warnings for the
+            caller to publish.  By default they're published as soon as the
+            graph is built.
+        
+    Returns:
+        dict: Graph data with nodes and links.  The same jobs always give the
+        same graph, in the same order: jobs are taken in `job_id` order, links
+        follow that order (routes in routing map order), and nodes are listed
+        where they first appear, each job's source before its destinations.
+    """
+    nodes = []
+    links = []    # {'source': '', 'target': ''}
+    publish_warnings = warnings is None
+    if publish_warnings:
+        warnings = parse_warnings.ParseWarnings()
+    # Jobs sharing a topic or index share its node
+    node_table = NodeTable()
+
+    # Checked once up front, this loop runs for every job on every refresh
+    debug = logger.isEnabledFor(logging.DEBUG)
+    base_teraslice = settings.teraslice_url.rstrip('/')
+    base_grafana = settings.grafana_url.rstrip('/') if settings.grafana_url else None
+
+    with span('parse'):
+        # Teraslice lists jobs by last update, which says nothing about the graph
+        for job in sorted(jobs_data, key=itemgetter('job_id')):
+            try:
+                teraslice_url = f"{base_teraslice}/jobs/{job['job_id']}"
+                if debug:
+                    logger.debug("%s - %s - %s", job['name'], job['ex']['_status'], teraslice_url)
+
+                job_info = JobInfo(job, logger, warnings, node_table)
+
+                nodes.append(job_info.source)
+
+                for destination in job_info.destinations:
+                    nodes.append(destination)
+                    link_dict = {
+                        'source': job_info.source.id,
+                        'target': destination.id,
+                        'job_id': job['job_id'],
+                        'name': job['name'],
+                        'url': teraslice_url,
+                        'workers': job['workers'],
+                        'status': job['ex']['_status']
+                    }
+                    if base_grafana:
+                        link_dict['grafana_url'] = f"{base_grafana}/d/_ZjPQViiz/teraslice-job-detail?orgId=1&from=now-6h&to=now&var-job={job['job_id']}"
+                    links.append(link_dict)
+            except Exception as e:
+                logger.error(f"Error processing job: {e}\nJob: {pprint.pformat(job)}")
+                raise e
+
+    with span('dedup'):
+        # Keeps first appearances in order, unlike a set whose order changes
+        # from process to process with hash randomization
+        unique_nodes = list(dict.fromkeys(nodes))
+
+    if publish_warnings:
+        # One summary per refresh rather than a warning per job
+        parse_warnings.publish(warnings, logger)
+
+    return {
+        'nodes': unique_nodes,
+        'links': links
+    }
+
+def _serialize_graph(graph_data) -> bytes:
+    """Serialize a graph from `_process_jobs_to_graph` to JSON."""
+    return schema.encode_graph(graph_data)
+
+class GraphBuild(NamedTuple):
+    """A graph built from one set of jobs, with the reports derived from it,
+    which aren't published until the graph is remembered."""
+    graph: dict
+    graph_json: bytes
+    health: dict
+    warnings: parse_warnings.ParseWarnings
+
+
+def _build_pipeline_graph(jobs_data) -> GraphBuild:
+    """Build and serialize the graph, and compute the pipeline health derived
+    from it."""
+    warnings = parse_warnings.ParseWarnings()
+    with GRAPH_BUILD_DURATION.time():
+        graph_data = _process_jobs_to_graph(jobs_data, warnings)
+        with span('serialize'):
+            graph_json = _serialize_graph(graph_data)
+    GRAPH_PAYLOAD_BYTES.observe(len(graph_json))
+    with span('health'):
+        report = health.compute_pipeline_health(jobs_data, graph_data)
+    return GraphBuild(graph_data, graph_json, report, warnings)
+
+def _encode_pipeline_graph(jobs_data) -> bytes:
+    return _build_pipeline_graph(jobs_data).graph_json
+
+def _publish_reports(build: GraphBuild) -> None:
+    """Make `build`'s pipeline health and parse warnings the latest."""
+    health.export_pipeline_health(build.health)
+    # One summary per refresh rather than a warning per job
+    parse_warnings.publish(build.warnings, logger)
@@ -0,0 +1,268 @@
+import asyncio
+import struct
+import time
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlparse
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class StoredPayload:
+    """A serialized payload as held by a backend, along with the time it was
+    produced (so readers can tell how fresh the shared copy is)."""
+    payload: bytes
+    timestamp: float
+
+    def age(self) -> float:
+        return time.time() - self.timestamp
+
+
+class CacheBackend(ABC):
+    """Storage shared between CacheManagers.
+
+    Backends hold serialized payloads rather than Python objects so that they
+    can live outside of the process (e.g. in Redis) and be shared by several
+    uvicorn workers or replicas.  They also provide a lease-style lock used to
+    make sure only one worker refreshes a given key at a time.
+    """
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[StoredPayload]:
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, payload: bytes, ttl: int) -> None:
+        ...
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        ...
+
+    @abstractmethod
+    async def acquire_lock(self, key: str, ttl: float) -> Optional[str]:
+        """Try to take the refresh lock for `key`.
+
+        Returns a token when the lock was acquired (to be handed back to
+        `release_lock`), or None if another holder has it.  The lock expires
+        on its own after `ttl` seconds so a crashed worker can't wedge it.
+        """
+        ...
+
+    @abstractmethod
+    async def release_lock(self, key: str, token: str) -> None:
+        ...
+
+    async def close(self) -> None:
+        pass
+
+
+class InMemoryBackend(CacheBackend):
+    """Process-local backend, useful for single worker deployments and tests."""
+
+    def __init__(self):
+        self._data: Dict[str, Tuple[StoredPayload, float]] = {}
+        self._locks: Dict[str, Tuple[str, float]] = {}
+
+    async def get(self, key: str) -> Optional[StoredPayload]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        stored, expires_at = item
+        if time.time() > expires_at:
+            del self._data[key]
+            return None
+        return stored
+
+    async def set(self, key: str, payload: bytes, ttl: int) -> None:
+        now = time.time()
+        self._data[key] = (StoredPayload(payload=payload, timestamp=now), now + ttl)
+
+    async def delete(self, key: str) -> None:
+        self._data.pop(key, None)
+
+    async def acquire_lock(self, key: str, ttl: float) -> Optional[str]:
+        now = time.time()
+        held = self._locks.get(key)
+        if held is not None and held[1] > now:
+            return None
+        token = uuid.uuid4().hex
+        self._locks[key] = (token, now + ttl)
+        return token
+
+    async def release_lock(self, key: str, token: str) -> None:
+        held = self._locks.get(key)
+        if held is not None and held[0] == token:
+            del self._locks[key]
+
+
+class RedisError(Exception):
+    pass
+
+
+# Deletes the lock only if we still own it; a plain DEL could remove a lock
+# that expired and was since taken by another worker.
+RELEASE_LOCK_SCRIPT = (
+    "if redis.call('get', KEYS[1]) == ARGV[1] then "
+    "return redis.call('del', KEYS[1]) else return 0 end"
+)
+
+# Payloads are stored with the producing timestamp as an 8 byte prefix
+_TIMESTAMP = struct.Struct('>d')
+
+
+class RedisBackend(CacheBackend):
+    """Backend speaking the Redis protocol (RESP2) over a single connection.
+
+    Only the handful of commands needed here are used (GET, SET with NX/PX,
+    DEL and EVAL), so any Redis compatible server works, including local
+    stand-ins used in tests.
+
+    Args:
+        url (str): `redis://[:password@]host[:port][/db]`
+        key_prefix (str): Prefix applied to every key stored by this backend.
+    """
+
+    def __init__(self, url: str, key_prefix: str = 'teraslice3d:'):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or 'localhost'
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip('/') or 0)
+        self.key_prefix = key_prefix
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # Held for each command and any reconnect it needs, so that commands
+        # share one connection one at a time and replies can't get mixed up
+        self._lock = asyncio.Lock()
+
+    async def _connect(self) -> None:
+        """Open a new connection, replacing any current one.  Called with
+        `_lock` held."""
+        self._disconnect()
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        self._loop = asyncio.get_running_loop()
+        if self.password:
+            await self._roundtrip('AUTH', self.password)
+        if self.db:
+            await self._roundtrip('SELECT', str(self.db))
+
+    def _disconnect(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = self._writer = None
+
+    def _needs_connecting(self) -> bool:
+        # Connections are bound to the loop that opened them, so reconnect if
+        # we're being driven by a different one (e.g. between test clients).
+        return self._writer is None or self._writer.is_closing() or self._loop is not asyncio.get_running_loop()
+
+    @staticmethod
+    def _encode(*args) -> bytes:
+        out = [b'*%d\r\n' % len(args)]
+        for arg in args:
+            if isinstance(arg, str):
+                arg = arg.encode()
+            elif isinstance(arg, (int, float)):
+                arg = str(arg).encode()
+            out.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+        return b''.join(out)
+
+    async def _read_reply(self):
+        line = await self._reader.readline()
+        if not line:
+            raise ConnectionError("Redis connection closed")
+        prefix, body = line[:1], line[1:-2]
+        if prefix == b'+':
+            return body.decode()
+        if prefix == b'-':
+            raise RedisError(body.decode())
+        if prefix == b':':
+            return int(body)
+        if prefix == b'$':
+            length = int(body)
+            if length == -1:
+                return None
+            data = await self._reader.readexactly(length + 2)
+            return data[:-2]
+        if prefix == b'*':
+            length = int(body)
+            if length == -1:
+                return None
+            return [await self._read_reply() for _ in range(length)]
+        raise RedisError(f"Unexpected reply from Redis: {line!r}")
+
+    async def _roundtrip(self, *args):
+        """Send a command and read its reply.  Called with `_lock` held."""
+        try:
+            self._writer.write(self._encode(*args))
+            await self._writer.drain()
+            return await self._read_reply()
+        except RedisError:
+            raise
+        except BaseException:
+            # Cancelled or failed part way, the reply (or the rest of it) would
+            # be read as the next command's
+            self._disconnect()
+            raise
+
+    async def execute(self, *args):
+        async with self._lock:
+            if self._needs_connecting():
+                await self._connect()
+            try:
+                return await self._roundtrip(*args)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                # One retry on a fresh connection covers servers restarting or
+                # idle connections being dropped.
+                await self._connect()
+                return await self._roundtrip(*args)
+
+    async def get(self, key: str) -> Optional[StoredPayload]:
+        value = await self.execute('GET', self.key_prefix + key)
+        if value is None:
+            return None
+        (timestamp,) = _TIMESTAMP.unpack_from(value)
+        return StoredPayload(payload=value[_TIMESTAMP.size:], timestamp=timestamp)
+
+    async def set(self, key: str, payload: bytes, ttl: int) -> None:
+        value = _TIMESTAMP.pack(time.time()) + payload
+        await self.execute('SET', self.key_prefix + key, value, 'PX', int(ttl * 1000))
+
+    async def delete(self, key: str) -> None:
+        await self.execute('DEL', self.key_prefix + key)
+
+    async def acquire_lock(self, key: str, ttl: float) -> Optional[str]:
+        token = uuid.uuid4().hex
+        reply = await self.execute(
+            'SET', f"{self.key_prefix}lock:{key}", token, 'NX', 'PX', int(ttl * 1000)
+        )
+        return token if reply == 'OK' else None
+
+    async def release_lock(self, key: str, token: str) -> None:
+        await self.execute('EVAL', RELEASE_LOCK_SCRIPT, 1, f"{self.key_prefix}lock:{key}", token)
+
+    async def close(self) -> None:
+        async with self._lock:
+            self._disconnect()
+
+
+def create_backend(url: Optional[str]) -> Optional[CacheBackend]:
+    """Build a backend from a URL such as `redis://cache:6379/0` or
+    `memory://`.  Returns None when no URL is configured, in which case the
+    CacheManager works purely in-process."""
+    if not url:
+        return None
+
+    scheme = urlparse(url).scheme
+    if scheme == 'memory':
+        return InMemoryBackend()
+    if scheme == 'redis':
+        return RedisBackend(url)
+
+    raise ValueError(f"Unsupported cache backend URL: {url}")
@@ -1,11 +1,35 @@
 import asyncio
+import contextvars
+import hashlib
+import json
 import time
-from typing import Dict, Any, Optional
+from collections import deque
+from typing import Dict, Any, Optional, Tuple
 from dataclasses import dataclass
 import logging
 
+from .backends import CacheBackend
+from .metrics import Counter, Gauge
+
 logger = logging.getLogger(__name__)
 
+CACHE_REQUESTS = Counter(
+    'teraslice3d_cache_requests',
+    'Cache lookups by key family and result (hit, miss, or stale: served '
+    'after its refresh interval passed without a successful refresh).',
+    ['family', 'result'],
+)
+REFRESHES_IN_FLIGHT = Gauge(
+    'teraslice3d_cache_refreshes_in_flight',
+    'Upstream fetches currently running to fill or refresh the cache.',
+    ['family'],
+)
+
+
+def key_family(key: str) -> str:
+    """The kind of data a key holds, e.g. 'jobs' for 'jobs_500_true__status'."""
+    return key.split('_', 1)[0]
+
 
 @dataclass
 class CacheEntry:
@@ -17,21 +41,116 @@ class CacheEntry:
         return time.time() - self.timestamp > self.ttl
 
 
+@dataclass
+class KeyStats:
+    """Lookup counters and refresh bookkeeping for one cache key."""
+    hits: int = 0
+    misses: int = 0
+    stale: int = 0
+    size_bytes: Optional[int] = None
+    digest: Optional[bytes] = None
+    last_refresh_at: Optional[float] = None
+    last_error: Optional[str] = None
+    last_error_at: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses + self.stale
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'stale_serves': self.stale,
+            'hit_ratio': round((self.hits + self.stale) / lookups, 4) if lookups else None,
+            'size_bytes': self.size_bytes,
+            'last_refresh_at': self.last_refresh_at,
+            'last_error': self.last_error,
+            'last_error_at': self.last_error_at,
+        }
+
+
+@dataclass
+class FetchResult:
+    """Decoded data along with the size and digest of the payload it was
+    decoded from.
+
+    Fetch functions passed to `CacheManager.load` and `schedule_refresh` may
+    return one of these instead of the bare data, so the refresh history can
+    record sizes and whether the data changed without serializing it again.
+    """
+    data: Any
+    size_bytes: Optional[int] = None
+    digest: Optional[bytes] = None
+
+    @classmethod
+    def from_payload(cls, data: Any, payload: bytes) -> 'FetchResult':
+        return cls(data, len(payload), hashlib.blake2b(payload, digest_size=16).digest())
+
+
+def _serialize(data: Any) -> bytes:
+    return json.dumps(data, separators=(',', ':')).encode()
+
+
+def _deserialize(payload: bytes) -> FetchResult:
+    return FetchResult.from_payload(json.loads(payload), payload)
+
+
+def _serialize_result(data: Any) -> Tuple[bytes, FetchResult]:
+    payload = _serialize(data)
+    return payload, FetchResult.from_payload(data, payload)
+
+
 class CacheManager:
-    def __init__(self, default_ttl: int = 30):
+    """Per-process cache of decoded data.
+
+    When a shared `backend` is supplied, loads and background refreshes are
+    coordinated through it: serialized payloads are published to the backend
+    and only the worker holding a key's refresh lock calls upstream, while the
+    others pick up the shared result.
+
+    Lookups are counted per key, and the last `history_size` loads and
+    refreshes are kept in `refresh_history` for `get_status`.
+    """
+    def __init__(self, default_ttl: int = 30, backend: Optional[CacheBackend] = None, lock_ttl: int = 60,
+                 history_size: int = 50):
         self.cache: Dict[str, CacheEntry] = {}
+        self.stats: Dict[str, KeyStats] = {}
+        self.refresh_history: deque = deque(maxlen=history_size)
         self.default_ttl = default_ttl
+        self.backend = backend
+        self.lock_ttl = lock_ttl
+        self.lock_poll_interval = 0.1
         self._refresh_tasks: Dict[str, asyncio.Task] = {}
+        self._refresh_intervals: Dict[str, float] = {}
+        # key -> load in progress, shared by everyone who misses meanwhile
+        self._loads: Dict[str, asyncio.Task] = {}
         
+    def _key_stats(self, key: str) -> KeyStats:
+        stats = self.stats.get(key)
+        if stats is None:
+            stats = self.stats[key] = KeyStats()
+        return stats
+
     def get(self, key: str) -> Optional[Any]:
+        family = key_family(key)
+        stats = self._key_stats(key)
         entry = self.cache.get(key)
         if entry is None:
+            CACHE_REQUESTS.labels(family=family, result='miss').inc()
+            stats.misses += 1
             return None
         
         if entry.is_expired():
             self._remove_entry(key)
+            CACHE_REQUESTS.labels(family=family, result='miss').inc()
+            stats.misses += 1
             return None
         
+        refresh_interval = self._refresh_intervals.get(key)
+        if refresh_interval is not None and time.time() - entry.timestamp > refresh_interval:
+            CACHE_REQUESTS.labels(family=family, result='stale').inc()
+            stats.stale += 1
+        else:
+            CACHE_REQUESTS.labels(family=family, result='hit').inc()
+            stats.hits += 1
         return entry.data
     
     def set(self, key: str, data: Any, ttl: Optional[int] = None) -> None:
@@ -40,8 +159,121 @@ class CacheManager:
         
         entry = CacheEntry(data=data, timestamp=time.time(), ttl=ttl)
         self.cache[key] = entry
-        logger.debug(f"Cache set for key '{key}' with TTL {ttl}s")
+        logger.debug("Cache set for key '%s' with TTL %ss", key, ttl)
     
+    async def load(self, key: str, fetch_func, ttl: Optional[int] = None) -> Any:
+        """Fetch data for `key` with `fetch_func` and cache it locally.
+
+        With a shared backend, a copy already published by another worker is
+        used when available instead of calling `fetch_func`.  Loads of a key
+        while one is already in progress wait for it rather than fetching
+        again.
+        """
+        task = self._loads.get(key)
+        if task is None:
+            task = self._loads[key] = asyncio.ensure_future(self._load(key, fetch_func, ttl))
+
+            def forget(done):
+                if self._loads.get(key) is done:
+                    del self._loads[key]
+
+            task.add_done_callback(forget)
+        # One waiter giving up doesn't cancel the load for the others
+        return await asyncio.shield(task)
+
+    async def _load(self, key: str, fetch_func, ttl: Optional[int]) -> Any:
+        if self.backend is None:
+            data = await self._tracked(key, 'load', lambda: self._fetch(key, fetch_func))
+        else:
+            data = await self._tracked(key, 'load', lambda: self._load_shared(key, fetch_func, ttl))
+        self.set(key, data, ttl)
+        return data
+
+    async def _tracked(self, key: str, kind: str, load) -> Any:
+        """Await `load()` and record the attempt in `refresh_history`."""
+        stats = self._key_stats(key)
+        attempt = {'key': key, 'kind': kind, 'started_at': time.time()}
+        start = time.perf_counter()
+        try:
+            result = await load()
+        except Exception as e:
+            attempt.update(duration_seconds=round(time.perf_counter() - start, 4), outcome='error',
+                           error=f"{type(e).__name__}: {e}", changed=None)
+            stats.last_error = attempt['error']
+            stats.last_error_at = time.time()
+            self.refresh_history.append(attempt)
+            raise
+        duration = time.perf_counter() - start
+
+        if not isinstance(result, FetchResult):
+            result = FetchResult(result)
+        data, size, digest = result.data, result.size_bytes, result.digest
+        attempt.update(duration_seconds=round(duration, 4), outcome='success', error=None,
+                       changed=None if stats.digest is None or digest is None else digest != stats.digest,
+                       size_bytes=size)
+        stats.size_bytes = size
+        stats.digest = digest
+        stats.last_refresh_at = time.time()
+        self.refresh_history.append(attempt)
+        return data
+
+    async def _fetch(self, key: str, fetch_func) -> Any:
+        with REFRESHES_IN_FLIGHT.labels(family=key_family(key)).track_inprogress():
+            return await fetch_func()
+
+    async def _load_shared(self, key: str, fetch_func, ttl: Optional[int] = None,
+                           max_age: Optional[float] = None) -> FetchResult:
+        """Read `key` from the shared backend, fetching and publishing it if
+        it is missing or older than `max_age` seconds.
+
+        Only the worker that wins the backend lock calls `fetch_func`; the
+        others poll the backend until the new payload shows up.  If the lock
+        holder goes away, the lock expires and a waiter takes over.
+        """
+        if ttl is None:
+            ttl = self.default_ttl
+
+        def is_fresh(stored):
+            return stored is not None and (max_age is None or stored.age() < max_age)
+
+        # The payload is the whole jobs list, (de)serialize it off the loop.
+        # Results are fingerprinted from the shared payload, which is the
+        # same whichever worker fetched it.
+        async def decoded(stored):
+            return await asyncio.to_thread(_deserialize, stored.payload)
+
+        deadline = time.monotonic() + self.lock_ttl
+        while True:
+            stored = await self.backend.get(key)
+            if is_fresh(stored):
+                logger.debug("Using shared cache payload for key '%s'", key)
+                return await decoded(stored)
+
+            token = await self.backend.acquire_lock(key, self.lock_ttl)
+            if token is not None:
+                try:
+                    # Someone may have published between our read and the lock
+                    stored = await self.backend.get(key)
+                    if is_fresh(stored):
+                        return await decoded(stored)
+
+                    result = await self._fetch(key, fetch_func)
+                    data = result.data if isinstance(result, FetchResult) else result
+                    payload, result = await asyncio.to_thread(_serialize_result, data)
+                    await self.backend.set(key, payload, ttl)
+                    logger.debug(f"Published shared cache payload for key '{key}'")
+                    return result
+                finally:
+                    await self.backend.release_lock(key, token)
+
+            if time.monotonic() > deadline:
+                if stored is not None:
+                    logger.warning(f"Timed out waiting for refresh of key '{key}', using older shared payload")
+                    return await decoded(stored)
+                raise TimeoutError(f"Timed out waiting for another worker to load key '{key}'")
+
+            await asyncio.sleep(self.lock_poll_interval)
+
     def has(self, key: str) -> bool:
         return self.get(key) is not None
     
@@ -50,9 +282,13 @@ class CacheManager:
         logger.debug(f"Cache invalidated for key '{key}'")
     
     def clear(self) -> None:
+        """Drop every entry and refresh task, and reset the statistics."""
         for key in list(self._refresh_tasks.keys()):
             self._cancel_refresh_task(key)
         self.cache.clear()
+        self._loads.clear()
+        self.stats.clear()
+        self.refresh_history.clear()
         logger.debug("Cache cleared")
     
     def _remove_entry(self, key: str) -> None:
@@ -66,28 +302,54 @@ class CacheManager:
             if not task.done():
                 task.cancel()
             del self._refresh_tasks[key]
+        self._refresh_intervals.pop(key, None)
     
     def get_status(self) -> Dict[str, Any]:
         now = time.time()
         status = {
             'cache_size': len(self.cache),
             'active_refresh_tasks': len(self._refresh_tasks),
-            'entries': []
+            'entries': [],
+            'keys': {key: stats.to_dict() for key, stats in self.stats.items()},
+            'refresh_history': list(self.refresh_history),
         }
         
         for key, entry in self.cache.items():
             age = now - entry.timestamp
             time_left = entry.ttl - age
+            stats = self.stats.get(key)
             
             status['entries'].append({
                 'key': key,
                 'age_seconds': round(age, 2),
                 'ttl_seconds': entry.ttl,
                 'time_left_seconds': round(time_left, 2),
-                'is_expired': entry.is_expired()
+                'is_expired': entry.is_expired(),
+                'size_bytes': stats.size_bytes if stats else None,
             })
         
         return status
+
+    def get_summary(self) -> Dict[str, Any]:
+        """Totals across all keys, small enough for a dashboard to poll."""
+        totals = KeyStats(
+            hits=sum(s.hits for s in self.stats.values()),
+            misses=sum(s.misses for s in self.stats.values()),
+            stale=sum(s.stale for s in self.stats.values()),
+        ).to_dict()
+        errors = [a for a in self.refresh_history if a['outcome'] == 'error']
+        return {
+            'cache_size': len(self.cache),
+            'active_refresh_tasks': len(self._refresh_tasks),
+            'hits': totals['hits'],
+            'misses': totals['misses'],
+            'stale_serves': totals['stale_serves'],
+            'hit_ratio': totals['hit_ratio'],
+            'size_bytes': sum(self.stats[key].size_bytes or 0 for key in self.cache if key in self.stats),
+            'recent_refreshes': len(self.refresh_history),
+            'recent_refresh_errors': len(errors),
+            'last_refresh_error': errors[-1] if errors else None,
+        }
     
     def schedule_refresh(self, key: str, refresh_func, refresh_interval: int) -> None:
         self._cancel_refresh_task(key)
@@ -97,7 +359,13 @@ class CacheManager:
                 while True:
                     await asyncio.sleep(refresh_interval)
                     try:
-                        data = await refresh_func()
+                        if self.backend is None:
+                            data = await self._tracked(key, 'refresh', lambda: self._fetch(key, refresh_func))
+                        else:
+                            # Only one worker per interval actually refreshes,
+                            # the rest pick up what it published.
+                            data = await self._tracked(key, 'refresh', lambda: self._load_shared(
+                                key, refresh_func, max_age=refresh_interval))
                         self.set(key, data)
                         logger.debug(f"Background refresh completed for key '{key}'")
                     except Exception as e:
@@ -106,6 +374,10 @@ class CacheManager:
                 logger.debug(f"Background refresh task cancelled for key '{key}'")
                 raise
         
-        task = asyncio.create_task(refresh_task())
+        # The refresh outlives the request that scheduled it, so it mustn't
+        # carry over that request's context (its trace, or a profiling
+        # session)
+        task = asyncio.create_task(refresh_task(), context=contextvars.Context())
         self._refresh_tasks[key] = task
+        self._refresh_intervals[key] = refresh_interval
         logger.debug(f"Background refresh scheduled for key '{key}' with interval {refresh_interval}s")
\ No newline at end of file
@@ -0,0 +1,138 @@
+import gzip
+import json
+import logging
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def _params_key(params: Dict[str, Any]) -> str:
+    return json.dumps(params, sort_keys=True, default=str)
+
+
+class CapturedResponse:
+    """One upstream `/jobs` response as recorded."""
+
+    def __init__(self, params: Dict[str, Any], status: int, body: bytes, timestamp: float, duration: float):
+        self.params = params
+        self.status = status
+        self.body = body
+        self.timestamp = timestamp
+        self.duration = duration
+
+
+class CaptureRecorder:
+    """Appends upstream responses to a gzip compressed capture file.
+
+    Each record is a JSON header line (time, parameters, status, upstream
+    duration and body length) followed by the raw body, so bodies are kept
+    byte for byte.  Every record is its own gzip member, which keeps the file
+    readable even if the process dies mid-write, and lets a restarted backend
+    keep appending to the same capture.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def record(self, params: Dict[str, Any], status: int, body: bytes, duration: float,
+               timestamp: Optional[float] = None) -> None:
+        header = {
+            'time': time.time() if timestamp is None else timestamp,
+            'params': params,
+            'status': status,
+            'duration': duration,
+            'length': len(body),
+        }
+        data = gzip.compress(json.dumps(header).encode() + b'\n' + body + b'\n', compresslevel=6)
+        with self._lock:
+            with open(self.path, 'ab') as f:
+                f.write(data)
+
+
+class CaptureReplayer:
+    """Serves recorded responses back in the order they were captured.
+
+    With `speed` 0, every call to `next` moves on to the next recorded
+    response for the requested parameters, so a replay goes through the
+    capture deterministically, as fast as it is asked.  Otherwise the capture
+    plays back against the clock, `speed` times faster than it was recorded
+    (1 for the original timing), and `next` returns the latest response
+    recorded at that point.  Once the capture runs out, the last response for
+    each set of parameters keeps being served.
+
+    The file is streamed rather than loaded, so a long capture of one query
+    only ever holds a response or two in memory.
+    """
+
+    def __init__(self, path: Path, speed: float = 0.0):
+        self.path = Path(path)
+        self.speed = speed
+        self._file = gzip.open(self.path, 'rb')
+        self._latest: Dict[str, CapturedResponse] = {}
+        self._queued: Dict[str, deque] = {}  # read ahead while looking for other params
+        self._pending: Optional[CapturedResponse] = None
+        self._exhausted = False
+        self._capture_start: Optional[float] = None
+        self._replay_start: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def _read(self) -> Optional[CapturedResponse]:
+        if self._pending is not None:
+            record, self._pending = self._pending, None
+            return record
+        if self._exhausted:
+            return None
+        line = self._file.readline()
+        if not line:
+            self._exhausted = True
+            logger.info(f"Reached the end of capture {self.path}")
+            return None
+        header = json.loads(line)
+        body = self._file.read(header['length'])
+        self._file.read(1)  # trailing newline
+        if self._capture_start is None:
+            self._capture_start = header['time']
+        return CapturedResponse(header['params'], header['status'], body, header['time'], header['duration'])
+
+    def next(self, params: Dict[str, Any]) -> CapturedResponse:
+        """Return the response to serve for a request with `params`.
+
+        Raises:
+            LookupError: If the capture holds no response for `params`.
+        """
+        key = _params_key(params)
+        with self._lock:
+            if self.speed > 0:
+                self._advance_to_clock()
+            elif self._queued.get(key):
+                self._latest[key] = self._queued[key].popleft()
+            else:
+                while (record := self._read()) is not None:
+                    record_key = _params_key(record.params)
+                    if record_key == key:
+                        self._latest[key] = record
+                        break
+                    self._queued.setdefault(record_key, deque()).append(record)
+            if key not in self._latest:
+                raise LookupError(f"No response for {params} in capture {self.path}")
+            return self._latest[key]
+
+    def _advance_to_clock(self) -> None:
+        now = time.monotonic()
+        if self._replay_start is None:
+            self._replay_start = now
+        while (record := self._read()) is not None:
+            target = self._capture_start + (now - self._replay_start) * self.speed
+            if record.timestamp > target and self._latest:
+                self._pending = record
+                return
+            self._latest[_params_key(record.params)] = record
+
+    def close(self) -> None:
+        self._file.close()
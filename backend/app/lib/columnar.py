@@ -0,0 +1,189 @@
+"""
+Columnar copy of the pipeline graph's links for aggregate queries.
+
+Each link (one per job and destination) is a row.  String columns are
+categorical: an int32 array of codes into a list of categories, so that
+grouping and filtering are integer array operations rather than a loop over
+dicts.  A `GraphTable` is built once per graph version and answers queries
+like "jobs per status per ES cluster" or "top 20 topics by downstream
+workers" with `numpy.unique`/`bincount`.
+"""
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .memo import Memo
+from .ts import node_connection
+
+# Columns that can be grouped and filtered on
+COLUMNS = (
+    'source', 'target',
+    'source_connection', 'target_connection',
+    'source_type', 'target_type',
+    'status', 'job_id', 'name',
+)
+# `rows` counts links, `jobs` distinct jobs, `workers` sums each job's
+# workers once per group (a routed_sender has a link per route)
+METRICS = ('rows', 'jobs', 'workers')
+MAX_GROUP_BY = 3
+
+
+def _distinct(values: np.ndarray) -> np.ndarray:
+    """Sorted distinct values, faster than `np.unique`'s hashing when most
+    values are distinct."""
+    values = np.sort(values)
+    keep = np.empty(len(values), dtype=bool)
+    keep[:1] = True
+    np.not_equal(values[1:], values[:-1], out=keep[1:])
+    return values[keep]
+
+
+class Categorical:
+    """Codes into `categories`, one per row."""
+    __slots__ = ('codes', 'categories', '_index')
+
+    def __init__(self, codes: np.ndarray, categories: List[str]):
+        self.codes = codes
+        self.categories = categories
+        self._index = None
+
+    @classmethod
+    def encode(cls, values: List[str]) -> 'Categorical':
+        # Categories in order of first appearance
+        index = {value: code for code, value in enumerate(dict.fromkeys(values))}
+        codes = np.fromiter(map(index.__getitem__, values), dtype=np.int32, count=len(values))
+        categorical = cls(codes, list(index))
+        categorical._index = index
+        return categorical
+
+    def derive(self, func) -> 'Categorical':
+        """A column computed from each category of this one, e.g. the
+        connection of each node, without touching every row in Python."""
+        mapped = Categorical.encode(list(map(func, self.categories)))
+        mapped.codes = mapped.codes[self.codes]
+        return mapped
+
+    def code(self, value: str) -> Optional[int]:
+        if self._index is None:
+            self._index = {category: code for code, category in enumerate(self.categories)}
+        return self._index.get(value)
+
+
+class GraphTable:
+    """The graph's links as columns, see the module docstring.
+
+    Args:
+        graph (dict): Graph data from `_process_jobs_to_graph`.
+        cache_size (int): Query results kept, they're only valid for this
+            table so there's never a need to invalidate them.
+    """
+
+    def __init__(self, graph: Dict[str, Any], cache_size: int = 256):
+        links = graph['links']
+        node_types = {node.id: node.connector_type for node in graph['nodes']}
+
+        source = Categorical.encode([link['source'] for link in links])
+        target = Categorical.encode([link['target'] for link in links])
+        job_id = Categorical.encode([link['job_id'] for link in links])
+        self.columns: Dict[str, Categorical] = {
+            'source': source,
+            'target': target,
+            'source_connection': source.derive(node_connection),
+            'target_connection': target.derive(node_connection),
+            'source_type': source.derive(node_types.get),
+            'target_type': target.derive(node_types.get),
+            'status': Categorical.encode([link['status'] for link in links]),
+            'job_id': job_id,
+            'name': Categorical.encode([link['name'] for link in links]),
+        }
+        # Per job (indexed by job_id code) rather than per row
+        self.job_workers = np.zeros(len(job_id.categories), dtype=np.int64)
+        self.job_workers[job_id.codes] = np.fromiter((link['workers'] for link in links), dtype=np.int64, count=len(links))
+        self.rows = len(links)
+        self._results = Memo(cache_size)
+
+    def aggregate(self, group_by: Sequence[str], metric: str = 'jobs',
+                  where: Sequence[Tuple[str, str]] = (), limit: int = 100) -> Dict[str, Any]:
+        """Group rows by the `group_by` columns and compute `metric` per group.
+
+        Args:
+            group_by: One to three of `COLUMNS`.
+            metric: One of `METRICS`.
+            where: (column, value) pairs rows must all match.
+            limit: Number of groups returned, largest first.
+
+        Returns:
+            dict: The groups, each with its column values and `value`, and
+            the number of groups before the limit.
+
+        Raises:
+            ValueError: For unknown columns or metrics.
+        """
+        key = self._key(group_by, metric, where, limit)
+        return self._results.get(key, lambda: self._aggregate(*key))
+
+    def is_memoized(self, group_by: Sequence[str], metric: str = 'jobs',
+                    where: Sequence[Tuple[str, str]] = (), limit: int = 100) -> bool:
+        """Whether `aggregate` has the result for these arguments at hand."""
+        return self._key(group_by, metric, where, limit) in self._results
+
+    @staticmethod
+    def _key(group_by, metric, where, limit):
+        return tuple(group_by), metric, tuple(sorted(where)), limit
+
+    def _aggregate(self, group_by, metric, where, limit) -> Dict[str, Any]:
+        if not group_by or len(group_by) > MAX_GROUP_BY:
+            raise ValueError(f"group_by takes 1 to {MAX_GROUP_BY} columns")
+        for column in (*group_by, *(column for column, _ in where)):
+            if column not in self.columns:
+                raise ValueError(f"Unknown column '{column}', expected one of {', '.join(COLUMNS)}")
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric '{metric}', expected one of {', '.join(METRICS)}")
+
+        mask = np.ones(self.rows, dtype=bool)
+        for column, value in where:
+            code = self.columns[column].code(value)
+            if code is None:
+                mask[:] = False
+                break
+            mask &= self.columns[column].codes == code
+        selected = np.flatnonzero(mask)
+
+        # Combine the group columns' codes into one group number per row,
+        # renumbering after each column so the numbers stay small
+        groups = np.zeros(len(selected), dtype=np.int64)
+        for column in group_by:
+            categorical = self.columns[column]
+            groups = groups * len(categorical.categories) + categorical.codes[selected]
+            _, groups = np.unique(groups, return_inverse=True)
+        group_count = int(groups.max()) + 1 if len(groups) else 0
+        # The first row of each group: with repeated indexes the last
+        # assignment wins, so assign in reverse
+        first_rows = np.empty(group_count, dtype=np.int64)
+        first_rows[groups[::-1]] = np.arange(len(groups) - 1, -1, -1)
+
+        if metric == 'rows':
+            values = np.bincount(groups, minlength=group_count)
+        else:
+            jobs = self.columns['job_id'].codes[selected].astype(np.int64)
+            job_count = len(self.columns['job_id'].categories)
+            group_jobs = _distinct(groups * job_count + jobs)
+            job_groups = group_jobs // job_count
+            weights = self.job_workers[group_jobs % job_count] if metric == 'workers' else None
+            values = np.bincount(job_groups, weights=weights, minlength=group_count)
+
+        # Largest first, ties in first appearance order
+        order = np.lexsort((first_rows, -values))[:limit]
+        rows = selected[first_rows[order]]
+        labels = {column: [self.columns[column].categories[code] for code in self.columns[column].codes[rows]]
+                  for column in group_by}
+        return {
+            'group_by': list(group_by),
+            'metric': metric,
+            'where': [{'column': column, 'value': value} for column, value in where],
+            'total_groups': group_count,
+            'groups': [
+                {**{column: labels[column][i] for column in group_by}, 'value': int(values[group])}
+                for i, group in enumerate(order)
+            ],
+        }
@@ -0,0 +1,91 @@
+import time
+from collections import Counter as TallyCounter, defaultdict
+from typing import Any, Dict, Optional
+
+from .metrics import Gauge
+from .ts import node_connection
+
+JOBS_BY_STATUS = Gauge(
+    'teraslice3d_pipeline_jobs',
+    'Jobs in the current pipeline graph, by execution status.',
+    ['status'],
+)
+WORKERS_BY_CONNECTION = Gauge(
+    'teraslice3d_pipeline_workers',
+    'Workers of jobs reading from or writing to each connector cluster.',
+    ['connection'],
+)
+DEAD_END_TOPICS = Gauge(
+    'teraslice3d_pipeline_dead_end_topics',
+    'Kafka topics written by some job but read by none, per cluster.',
+    ['connection'],
+)
+SOURCELESS_TOPICS = Gauge(
+    'teraslice3d_pipeline_sourceless_topics',
+    'Kafka topics read by some job but written by none, per cluster.',
+    ['connection'],
+)
+
+# Most recent report, from the last graph built in this process
+latest: Optional[Dict[str, Any]] = None
+
+
+def compute_pipeline_health(jobs_data, graph) -> Dict[str, Any]:
+    """Summarize pipeline health from jobs data and the graph built from it.
+
+    Args:
+        jobs_data: Raw jobs data from the Teraslice API
+        graph: Graph data with nodes and links (see `_process_jobs_to_graph`)
+
+    Returns:
+        dict: Jobs per status, workers per connector cluster, and the Kafka
+        topics that are only written (dead ends) or only read (source-less).
+    """
+    jobs_by_status = TallyCounter(job['ex']['_status'] for job in jobs_data)
+
+    written, read = set(), set()
+    connections_by_job = defaultdict(set)
+    workers_by_job = {}
+    for link in graph['links']:
+        read.add(link['source'])
+        written.add(link['target'])
+        connections_by_job[link['job_id']].update(
+            (node_connection(link['source']), node_connection(link['target']))
+        )
+        workers_by_job[link['job_id']] = link['workers']
+
+    # A job counts its workers once against every cluster it touches
+    workers_by_connection = TallyCounter()
+    for job_id, connections in connections_by_job.items():
+        for connection in connections:
+            workers_by_connection[connection] += workers_by_job[job_id]
+
+    topics = {node.id for node in graph['nodes'] if node.connector_type == 'KAFKA'}
+
+    return {
+        'computed_at': time.time(),
+        'jobs_by_status': dict(sorted(jobs_by_status.items())),
+        'workers_by_connection': dict(sorted(workers_by_connection.items())),
+        'dead_end_topics': sorted(topics & (written - read)),
+        'sourceless_topics': sorted(topics & (read - written)),
+    }
+
+
+def export_pipeline_health(report: Dict[str, Any]) -> None:
+    """Publish `report` through the pipeline gauges, replacing the values
+    from the previous graph so vanished statuses or clusters drop out."""
+    global latest
+    latest = report
+
+    JOBS_BY_STATUS.set_all({(status,): count for status, count in report['jobs_by_status'].items()})
+    WORKERS_BY_CONNECTION.set_all({
+        (connection,): workers for connection, workers in report['workers_by_connection'].items()
+    })
+    DEAD_END_TOPICS.set_all({
+        (connection,): count
+        for connection, count in TallyCounter(map(node_connection, report['dead_end_topics'])).items()
+    })
+    SOURCELESS_TOPICS.set_all({
+        (connection,): count
+        for connection, count in TallyCounter(map(node_connection, report['sourceless_topics'])).items()
+    })
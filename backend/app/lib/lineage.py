@@ -0,0 +1,132 @@
+"""
+Upstream/downstream lineage of the pipeline graph's nodes.
+
+A `LineageIndex` is built once per graph version.  It holds the graph's
+adjacency in both directions, so impact questions ("which ES indices are fed
+from `kafka_cluster1:incoming-x`?") are a breadth-first search rather than
+a scan of every link per hop.  Results are memoized per index.
+"""
+from collections import deque
+from typing import Any, Dict, List, Literal, Optional
+
+from .memo import Memo
+
+Direction = Literal['up', 'down']
+
+
+class LineageIndex:
+    """Adjacency of the graph from `_process_jobs_to_graph`.
+
+    Args:
+        graph (dict): The graph's nodes and links.
+        cache_size (int): Query results kept.
+    """
+
+    def __init__(self, graph: Dict[str, Any], cache_size: int = 256):
+        self.nodes = {node.id: node for node in graph['nodes']}
+        # node -> neighbour -> the links (jobs) between them, in link order
+        self.adjacency: Dict[str, Dict[str, Dict[str, List[dict]]]] = {'down': {}, 'up': {}}
+        down, up = self.adjacency['down'], self.adjacency['up']
+        for link in graph['links']:
+            source, target = link['source'], link['target']
+            down.setdefault(source, {}).setdefault(target, []).append(link)
+            up.setdefault(target, {}).setdefault(source, []).append(link)
+        self._results = Memo(cache_size)
+
+    def _check(self, node_id: str) -> None:
+        if node_id not in self.nodes:
+            raise KeyError(node_id)
+
+    def closure(self, node_id: str, direction: Direction = 'down', depth: Optional[int] = None) -> Dict[str, Any]:
+        """The nodes reachable from `node_id` following links downstream
+        (what it feeds) or upstream (what feeds it).
+
+        Args:
+            node_id (str): The starting node.
+            direction (str): 'down' or 'up'.
+            depth (int): Maximum number of hops, unlimited when None.
+
+        Returns:
+            dict: The reachable nodes with their distance in hops, nearest
+            first, and the links followed to reach them.
+
+        Raises:
+            KeyError: If the node isn't in the graph.
+        """
+        self._check(node_id)
+        return self._results.get(('closure', node_id, direction, depth),
+                                 lambda: self._closure(node_id, direction, depth))
+
+    def closure_memoized(self, node_id: str, direction: Direction = 'down', depth: Optional[int] = None) -> bool:
+        """Whether `closure` has the result for these arguments at hand."""
+        return ('closure', node_id, direction, depth) in self._results
+
+    def _closure(self, node_id, direction, depth) -> Dict[str, Any]:
+        adjacency = self.adjacency[direction]
+        distances = {node_id: 0}
+        links = []
+        queue = deque([node_id])
+        while queue:
+            current = queue.popleft()
+            distance = distances[current]
+            if depth is not None and distance >= depth:
+                continue
+            for neighbour, between in adjacency.get(current, {}).items():
+                links.extend(between)
+                if neighbour not in distances:
+                    distances[neighbour] = distance + 1
+                    queue.append(neighbour)
+        del distances[node_id]
+        return {
+            'node': node_id,
+            'direction': direction,
+            'depth': depth,
+            'nodes': [
+                {'id': neighbour, 'connector_type': self.nodes[neighbour].connector_type, 'distance': distance}
+                for neighbour, distance in distances.items()
+            ],
+            'links': links,
+        }
+
+    def path(self, source: str, target: str) -> Optional[Dict[str, Any]]:
+        """The shortest downstream path from `source` to `target`.
+
+        Returns:
+            dict: The nodes along the path and, for each hop, the links
+            (jobs) between its two nodes; None if `target` can't be
+            reached from `source`.
+
+        Raises:
+            KeyError: If either node isn't in the graph.
+        """
+        self._check(source)
+        self._check(target)
+        return self._results.get(('path', source, target), lambda: self._path(source, target))
+
+    def path_memoized(self, source: str, target: str) -> bool:
+        """Whether `path` has the result for these arguments at hand."""
+        return ('path', source, target) in self._results
+
+    def _path(self, source, target) -> Optional[Dict[str, Any]]:
+        adjacency = self.adjacency['down']
+        previous = {source: None}
+        queue = deque([source])
+        while queue and target not in previous:
+            current = queue.popleft()
+            for neighbour in adjacency.get(current, {}):
+                if neighbour not in previous:
+                    previous[neighbour] = current
+                    queue.append(neighbour)
+        if target not in previous:
+            return None
+
+        nodes = [target]
+        while previous[nodes[-1]] is not None:
+            nodes.append(previous[nodes[-1]])
+        nodes.reverse()
+        return {
+            'from': source,
+            'to': target,
+            'nodes': nodes,
+            'hops': [adjacency[a][b] for a, b in zip(nodes, nodes[1:])],
+        }
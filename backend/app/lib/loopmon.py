@@ -0,0 +1,135 @@
+import asyncio
+import bisect
+import collections
+import sys
+import threading
+import time
+import traceback
+from typing import Any, Deque, Dict, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the lag histogram buckets
+LAG_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, float('inf'))
+
+
+class LoopMonitor:
+    """Measures event loop scheduling lag and catches blocking callbacks.
+
+    A task sleeps for `interval` seconds at a time and records how much later
+    than requested it woke up; that lag is how long anything else scheduled on
+    the loop would have waited too.  Lags are kept in a fixed bucket
+    histogram, which is cheap enough to leave running in production.
+
+    With `debug` enabled a watchdog thread also pings the loop every
+    `block_threshold` seconds.  If the ping isn't answered in time the loop is
+    stuck in some callback, so the watchdog captures the loop thread's stack
+    and records it along with how long the stall lasted.
+
+    Args:
+        interval (float): Seconds between lag samples.
+        block_threshold (float): Stall length (seconds) treated as blocking.
+        debug (bool): Run the watchdog that captures blocking stacks.
+        max_blocking_events (int): How many recent blocking events to keep.
+    """
+
+    def __init__(self, interval: float = 0.5, block_threshold: float = 0.1,
+                 debug: bool = False, max_blocking_events: int = 20):
+        self.interval = interval
+        self.block_threshold = block_threshold
+        self.debug = debug
+        self.bucket_counts = [0] * len(LAG_BUCKETS)
+        self.samples = 0
+        self.lag_sum = 0.0
+        self.lag_max = 0.0
+        self.last_lag = 0.0
+        self.blocking_events: Deque[Dict[str, Any]] = collections.deque(maxlen=max_blocking_events)
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def record(self, lag: float) -> None:
+        lag = max(lag, 0.0)
+        self.bucket_counts[bisect.bisect_left(LAG_BUCKETS, lag)] += 1
+        self.samples += 1
+        self.lag_sum += lag
+        self.lag_max = max(self.lag_max, lag)
+        self.last_lag = lag
+
+    async def _sample(self) -> None:
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.record(time.perf_counter() - start - self.interval)
+
+    def _watch(self, loop: asyncio.AbstractEventLoop, loop_thread_id: int) -> None:
+        answered = threading.Event()
+        while not self._stop.is_set():
+            answered.clear()
+            sent = time.perf_counter()
+            try:
+                loop.call_soon_threadsafe(answered.set)
+            except RuntimeError:
+                return  # loop closed
+
+            if not answered.wait(self.block_threshold):
+                frame = sys._current_frames().get(loop_thread_id)
+                stack = traceback.format_stack(frame) if frame is not None else []
+                # Wait for the loop to come back so we know how long it was stuck
+                while not answered.wait(self.block_threshold) and not self._stop.is_set():
+                    pass
+                duration = time.perf_counter() - sent
+                self.blocking_events.append({
+                    'timestamp': time.time(),
+                    'duration_seconds': round(duration, 4),
+                    'stack': stack,
+                })
+                logger.warning(
+                    f"Event loop blocked for {duration * 1000:.0f}ms in:\n{''.join(stack[-5:])}"
+                )
+
+            self._stop.wait(self.block_threshold)
+
+    def start(self) -> None:
+        """Start sampling on the running loop (and the watchdog in debug mode)."""
+        if self._task is not None:
+            return
+        loop = asyncio.get_running_loop()
+        self._stop.clear()
+        self._task = loop.create_task(self._sample())
+        if self.debug:
+            self._watchdog = threading.Thread(
+                target=self._watch, args=(loop, threading.get_ident()),
+                name='loop-monitor-watchdog', daemon=True
+            )
+            self._watchdog.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self._watchdog = None
+
+    def get_status(self) -> Dict[str, Any]:
+        cumulative = 0
+        buckets: List[Dict[str, Any]] = []
+        for bound, count in zip(LAG_BUCKETS, self.bucket_counts):
+            cumulative += count
+            buckets.append({'le': 'inf' if bound == float('inf') else bound, 'count': cumulative})
+
+        return {
+            'running': self._task is not None,
+            'interval_seconds': self.interval,
+            'samples': self.samples,
+            'lag_seconds': {
+                'last': round(self.last_lag, 6),
+                'mean': round(self.lag_sum / self.samples, 6) if self.samples else 0.0,
+                'max': round(self.lag_max, 6),
+            },
+            'histogram': buckets,
+            'debug': self.debug,
+            'block_threshold_seconds': self.block_threshold,
+            'blocking_events': list(self.blocking_events),
+        }
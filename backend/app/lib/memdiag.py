@@ -0,0 +1,194 @@
+import asyncio
+import collections
+import os
+import sys
+import time
+import tracemalloc
+import types
+from typing import Any, Deque, Dict, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Leaf objects that hold no references worth following
+_ATOMIC = (str, bytes, bytearray, int, float, bool, complex, type(None))
+# Shared objects that would pull in half the interpreter if followed
+_SHARED = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType, types.MethodType)
+
+
+def rss_bytes() -> Optional[int]:
+    """Resident set size of this process, or None where /proc isn't available."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def deep_size(obj: Any) -> int:
+    """Approximate memory held by `obj` and everything it references.
+
+    Objects referenced more than once are counted once, classes, modules
+    and functions aren't followed.  Good enough to compare cache entries, not
+    an exact accounting.
+    """
+    seen = set()
+    stack = [obj]
+    total = 0
+    while stack:
+        current = stack.pop()
+        if id(current) in seen or isinstance(current, _SHARED):
+            continue
+        seen.add(id(current))
+        total += sys.getsizeof(current)
+        if isinstance(current, _ATOMIC):
+            continue
+        if isinstance(current, dict):
+            stack.extend(current.keys())
+            stack.extend(current.values())
+        elif isinstance(current, (list, tuple, set, frozenset, collections.deque)):
+            stack.extend(current)
+        else:
+            attributes = getattr(current, '__dict__', None)
+            if attributes is not None:
+                stack.append(attributes)
+            for cls in type(current).__mro__:
+                for slot in getattr(cls, '__slots__', ()):
+                    if slot != '__dict__' and hasattr(current, slot):
+                        stack.append(getattr(current, slot))
+    return total
+
+
+class MemoryDiagnostics:
+    """Tracks process memory over time to catch slow leaks.
+
+    RSS is sampled every `sample_interval` seconds.  After each refresh cycle
+    (signalled with `refresh_completed`) a tracemalloc snapshot is taken and
+    diffed against the previous cycle's, and a warning is logged if RSS or
+    traced memory grew by more than `growth_threshold` bytes since then.
+    tracemalloc slows allocations down noticeably, so this is opt-in.
+
+    Args:
+        sample_interval (float): Seconds between RSS samples.
+        growth_threshold (int): Growth in bytes between cycles that is
+            logged as a warning.
+        frames (int): Stack frames tracemalloc keeps per allocation.
+        top (int): Number of biggest growth sites kept per cycle.
+        history_size (int): RSS samples and cycles kept.
+    """
+
+    def __init__(self, sample_interval: float = 60.0, growth_threshold: int = 50 * 1024 * 1024,
+                 frames: int = 10, top: int = 10, history_size: int = 120):
+        self.sample_interval = sample_interval
+        self.growth_threshold = growth_threshold
+        self.frames = frames
+        self.top = top
+        self.rss_samples: Deque[Dict[str, Any]] = collections.deque(maxlen=history_size)
+        self.cycles: Deque[Dict[str, Any]] = collections.deque(maxlen=history_size)
+        self._snapshot: Optional[tracemalloc.Snapshot] = None
+        self._cycle_rss: Optional[int] = None
+        self._cycle_done: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        # Whether start() started tracemalloc, rather than it already
+        # tracing (e.g. with PYTHONTRACEMALLOC set)
+        self._started_tracing = False
+
+    def start(self) -> None:
+        """Start tracemalloc, unless it's already tracing, and the sampling
+        task on the running loop."""
+        if self._task is not None:
+            return
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self._started_tracing = True
+        self._cycle_done = asyncio.Event()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+        self._snapshot = None
+
+    def refresh_completed(self) -> None:
+        """Note that a refresh cycle finished; it is diffed in the background."""
+        if self._cycle_done is not None:
+            self._cycle_done.set()
+
+    async def _run(self) -> None:
+        while True:
+            self.rss_samples.append({'timestamp': time.time(), 'rss_bytes': rss_bytes()})
+            try:
+                await asyncio.wait_for(self._cycle_done.wait(), self.sample_interval)
+            except asyncio.TimeoutError:
+                continue
+            self._cycle_done.clear()
+            try:
+                # Snapshotting walks every traced allocation, keep it off the loop
+                await asyncio.to_thread(self.check_cycle)
+            except Exception as e:
+                logger.error(f"Memory diagnostics cycle check failed: {e}")
+
+    def check_cycle(self) -> Dict[str, Any]:
+        """Snapshot memory now and compare it with the previous cycle."""
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        ))
+        rss = rss_bytes()
+        traced = sum(stat.size for stat in snapshot.statistics('filename'))
+        cycle = {
+            'timestamp': time.time(),
+            'rss_bytes': rss,
+            'traced_bytes': traced,
+            'rss_growth_bytes': None,
+            'traced_growth_bytes': None,
+            'top_growth': [],
+        }
+
+        if self._snapshot is not None:
+            differences = snapshot.compare_to(self._snapshot, 'lineno')
+            cycle['traced_growth_bytes'] = sum(d.size_diff for d in differences)
+            cycle['top_growth'] = [
+                {
+                    'location': f"{d.traceback[0].filename}:{d.traceback[0].lineno}",
+                    'size_diff_bytes': d.size_diff,
+                    'count_diff': d.count_diff,
+                }
+                for d in differences[:self.top] if d.size_diff > 0
+            ]
+            if rss is not None and self._cycle_rss is not None:
+                cycle['rss_growth_bytes'] = rss - self._cycle_rss
+
+            growth = max(cycle['traced_growth_bytes'], cycle['rss_growth_bytes'] or 0)
+            if growth > self.growth_threshold:
+                sites = '\n'.join(f"  {g['location']}: +{g['size_diff_bytes']} bytes" for g in cycle['top_growth'][:5])
+                logger.warning(
+                    f"Memory grew by {growth / 1e6:.1f}MB since the last refresh cycle, largest growth:\n{sites}"
+                )
+
+        self._snapshot = snapshot
+        self._cycle_rss = rss
+        self.cycles.append(cycle)
+        return cycle
+
+    def get_status(self, objects: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Current memory figures, plus the deep size of each of `objects`
+        (e.g. cache entries) by name."""
+        current, peak = tracemalloc.get_traced_memory()
+        return {
+            'running': self._task is not None,
+            'rss_bytes': rss_bytes(),
+            'rss_samples': list(self.rss_samples),
+            'tracemalloc': {
+                'tracing': tracemalloc.is_tracing(),
+                'current_bytes': current,
+                'peak_bytes': peak,
+            },
+            'growth_threshold_bytes': self.growth_threshold,
+            'cycles': list(self.cycles),
+            'objects': {name: deep_size(obj) for name, obj in (objects or {}).items()},
+        }
@@ -0,0 +1,43 @@
+import collections
+from typing import Any, Callable, Hashable
+
+
+class Memo:
+    """Least recently used results of queries on one graph index.
+
+    An index is only ever queried for the graph version it was built from,
+    so results never need invalidating, only bounding.
+
+    Args:
+        size (int): Results kept.
+    """
+    __slots__ = ('_results', '_size')
+
+    def __init__(self, size: int = 256):
+        self._results: collections.OrderedDict = collections.OrderedDict()
+        self._size = size
+
+    def get(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """The result for `key`, calling `compute` for it if not kept."""
+        try:
+            result = self._results[key]
+        except KeyError:
+            result = self._results[key] = compute()
+            if len(self._results) > self._size:
+                self._results.popitem(last=False)
+        else:
+            self._results.move_to_end(key)
+        return result
+
+    def peek(self, key: Hashable) -> Any:
+        """The result kept for `key`, or None."""
+        result = self._results.get(key)
+        if result is not None:
+            self._results.move_to_end(key)
+        return result
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._results
+
+    def __len__(self):
+        return len(self._results)
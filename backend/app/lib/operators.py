@@ -0,0 +1,88 @@
+import re
+from typing import Callable, Dict, List, Optional, Pattern, Set, Tuple
+
+
+class OperatorRegistry:
+    """Maps Teraslice `_op` names to the functions that parse them.
+
+    Exact names are looked up first, then patterns in the order they were
+    registered.  Results are memoized per `_op` name, unknown names included,
+    so each job costs a dict lookup however many patterns there are.
+
+    Handlers are called once per job as
+
+        handler(job_info, op_type, op, fields, connection)
+
+    with the JobInfo being built, the operation's `_op` name, the operation
+    itself, the dict its settings live in (its API definition, the operation
+    itself when it has no API, or an empty dict when the referenced API
+    doesn't exist) and its connection name ('default' when unspecified).
+
+    Deployments with in-house operators can register handlers for them
+    without changing the built in ones, e.g.:
+
+        from app.lib.ts import SOURCE_OPERATORS
+
+        @SOURCE_OPERATORS.register('hdfs_reader')
+        def hdfs_reader(job_info, op_type, op, fields, connection):
+            return job_info.node(f"{connection}:{fields.get('path')}", 'FILE')
+
+    and list the module in the OPERATOR_PLUGINS setting.
+
+    Args:
+        kind (str): What the handlers parse, e.g. 'source', for messages.
+    """
+
+    def __init__(self, kind: str):
+        self.kind = kind
+        self._exact: Dict[str, Callable] = {}
+        self._patterns: List[Tuple[Pattern, Callable]] = []
+        # `_op` name -> handler or None, filled in on first lookup
+        self.handlers: Dict[str, Optional[Callable]] = _Resolved(self._lookup)
+        # Unknown `_op` names that have already been warned about
+        self.unknown: Set[str] = set()
+
+    def register(self, *names: str, pattern: Optional[str] = None) -> Callable:
+        """Decorator registering a handler for exact `_op` names and/or a
+        regular expression searched for in the `_op` name.  Registering a
+        name again replaces its handler."""
+        def decorator(handler: Callable) -> Callable:
+            for name in names:
+                self._exact[name] = handler
+            if pattern is not None:
+                self._patterns.append((re.compile(pattern), handler))
+            self.handlers.clear()
+            self.unknown.clear()
+            return handler
+        return decorator
+
+    def resolve(self, op_type: str) -> Optional[Callable]:
+        """The handler for `op_type`, or None if nothing handles it."""
+        return self.handlers[op_type]
+
+    def _lookup(self, op_type: str) -> Optional[Callable]:
+        handler = self._exact.get(op_type)
+        if handler is None:
+            for compiled, candidate in self._patterns:
+                if compiled.search(op_type):
+                    return candidate
+        return handler
+
+    def first_unknown(self, op_type: str) -> bool:
+        """Note that `op_type` has no handler; True the first time only."""
+        if op_type in self.unknown:
+            return False
+        self.unknown.add(op_type)
+        return True
+
+
+class _Resolved(dict):
+    """Memo of `lookup` results; hits are a plain dict subscript."""
+
+    def __init__(self, lookup: Callable):
+        super().__init__()
+        self._lookup = lookup
+
+    def __missing__(self, key):
+        value = self[key] = self._lookup(key)
+        return value
@@ -0,0 +1,58 @@
+import time
+from typing import Any, Dict, Optional, Set, Tuple
+import logging
+
+# Report for the most recently parsed set of jobs, served by /api/parse_warnings
+latest: Dict[str, Any] = {'computed_at': None, 'jobs_with_warnings': 0, 'warnings': []}
+
+
+class ParseWarnings:
+    """Warnings raised while parsing one set of jobs.
+
+    The same problem usually shows up in the same jobs on every refresh, so
+    rather than logging each one as it happens, warnings are collected per
+    operation and message, with the IDs of the jobs that raised them, and
+    logged once as a summary by `publish`.
+    """
+
+    def __init__(self):
+        self._warnings: Dict[Tuple[str, str], Set[str]] = {}
+
+    def add(self, job_id: Optional[str], operation: str, message: str) -> None:
+        self._warnings.setdefault((operation, message), set()).add(str(job_id))
+
+    def __len__(self) -> int:
+        return len(self._warnings)
+
+    def report(self) -> Dict[str, Any]:
+        warnings = [
+            {
+                'operation': operation,
+                'message': message,
+                'jobs': len(job_ids),
+                'job_ids': sorted(job_ids),
+            }
+            for (operation, message), job_ids in self._warnings.items()
+        ]
+        warnings.sort(key=lambda w: (-w['jobs'], w['operation'], w['message']))
+        return {
+            'computed_at': time.time(),
+            'jobs_with_warnings': len(set().union(*self._warnings.values())),
+            'warnings': warnings,
+        }
+
+
+def publish(warnings: ParseWarnings, logger: logging.Logger, limit: int = 10) -> Dict[str, Any]:
+    """Make `warnings` the latest report and log a one line summary of it."""
+    global latest
+    previous = {(w['operation'], w['message']) for w in latest['warnings']}
+    report = warnings.report()
+    if report['warnings']:
+        new = sum(1 for w in report['warnings'] if (w['operation'], w['message']) not in previous)
+        summary = '; '.join(f"{w['message']} ({w['jobs']} jobs)" for w in report['warnings'][:limit])
+        if len(report['warnings']) > limit:
+            summary += f"; and {len(report['warnings']) - limit} more"
+        logger.warning("%d jobs have parse warnings, %d distinct (%d new): %s",
+                       report['jobs_with_warnings'], len(report['warnings']), new, summary)
+    latest = report
+    return report
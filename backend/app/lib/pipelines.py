@@ -0,0 +1,172 @@
+"""
+Pipelines: the weakly connected components of the pipeline graph.
+
+Jobs that share topics (or indices, paths...) belong to the same pipeline,
+named after its smallest node id, so the id of a pipeline doesn't change
+from refresh to refresh unless the pipeline itself does.  A
+`PipelineIndex`, built the first time pipelines are asked for in a graph
+version, labels the nodes and jobs, summarizes each pipeline and finds the
+loops (strongly connected components) within them.
+"""
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence
+
+from pydantic_core import to_json
+
+from .ts import StorageNode
+
+
+def label_pipelines(nodes: Sequence[StorageNode], links: Iterable[Dict[str, Any]]) -> Dict[str, str]:
+    """Find the pipelines with union-find.
+
+    Returns:
+        dict: Node id -> the id of the pipeline it belongs to.
+    """
+    ids = [node.id for node in nodes]
+    position = {node_id: i for i, node_id in enumerate(ids)}
+    parent = list(range(len(nodes)))
+
+    for link in links:
+        a = position[link['source']]
+        while parent[a] != a:
+            # Path halving
+            parent[a] = a = parent[parent[a]]
+        b = position[link['target']]
+        while parent[b] != b:
+            parent[b] = b = parent[parent[b]]
+        if a != b:
+            # The root is always the smallest id, which names the pipeline
+            if ids[a] < ids[b]:
+                parent[b] = a
+            else:
+                parent[a] = b
+
+    pipeline_of = {}
+    for root, node_id in enumerate(ids):
+        while parent[root] != root:
+            parent[root] = root = parent[parent[root]]
+        pipeline_of[node_id] = ids[root]
+    return pipeline_of
+
+
+def find_cycles(node_ids: Iterable[str], adjacency: Mapping[str, Iterable[str]]) -> List[List[str]]:
+    """The strongly connected components that contain a loop, with Tarjan's
+    algorithm (iteratively, pipelines can be longer than the recursion
+    limit).
+
+    Args:
+        node_ids: Every node, in the order components should be found.
+        adjacency: Node -> the nodes it links to.
+
+    Returns:
+        list: Each loop's nodes, in the order they were first visited.
+    """
+    index: Dict[str, int] = {}
+    low: Dict[str, int] = {}
+    stack: List[str] = []
+    on_stack = set()
+    cycles = []
+
+    def visit(node):
+        index[node] = low[node] = len(index)
+        stack.append(node)
+        on_stack.add(node)
+        return node, iter(adjacency.get(node, ()))
+
+    for start in node_ids:
+        if start in index:
+            continue
+        work = [visit(start)]
+        while work:
+            node, neighbours = work[-1]
+            for neighbour in neighbours:
+                if neighbour not in index:
+                    work.append(visit(neighbour))
+                    break
+                if neighbour in on_stack:
+                    low[node] = min(low[node], index[neighbour])
+            else:
+                work.pop()
+                if work:
+                    caller = work[-1][0]
+                    low[caller] = min(low[caller], low[node])
+                if low[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    if len(component) > 1 or node in adjacency.get(node, ()):
+                        component.reverse()
+                        cycles.append(component)
+    return cycles
+
+
+class PipelineIndex:
+    """Per pipeline nodes, links and summary of a graph.
+
+    Args:
+        graph (dict): Graph data from `_process_jobs_to_graph`.
+    """
+
+    def __init__(self, graph: Dict[str, Any]):
+        # Node id -> pipeline id
+        self.pipeline_of = label_pipelines(graph['nodes'], graph['links'])
+        # Job id -> pipeline id, a job's links all start at its source node
+        self.pipeline_of_job: Dict[str, str] = {}
+        self.nodes: Dict[str, List[StorageNode]] = {}
+        self.links: Dict[str, List[Dict[str, Any]]] = {}
+        for node in graph['nodes']:
+            pipeline_id = self.pipeline_of[node.id]
+            self.nodes.setdefault(pipeline_id, []).append(node)
+            self.links.setdefault(pipeline_id, [])
+
+        adjacency: Dict[str, Dict[str, None]] = {}
+        for link in graph['links']:
+            pipeline_id = self.pipeline_of[link['source']]
+            self.links[pipeline_id].append(link)
+            self.pipeline_of_job[link['job_id']] = pipeline_id
+            adjacency.setdefault(link['source'], {})[link['target']] = None
+
+        cycles: Dict[str, List[List[str]]] = {}
+        for cycle in find_cycles(self.pipeline_of, adjacency):
+            cycles.setdefault(self.pipeline_of[cycle[0]], []).append(cycle)
+
+        self.summaries = [self._summarize(pipeline_id, cycles.get(pipeline_id, [])) for pipeline_id in self.nodes]
+        self._labels_json: Optional[bytes] = None
+
+    def _summarize(self, pipeline_id: str, cycles: List[List[str]]) -> Dict[str, Any]:
+        # A job has a link per destination, count each once
+        jobs = {link['job_id']: link for link in self.links[pipeline_id]}
+        statuses: Dict[str, int] = {}
+        for link in jobs.values():
+            statuses[link['status']] = statuses.get(link['status'], 0) + 1
+        return {
+            'pipeline_id': pipeline_id,
+            'nodes': len(self.nodes[pipeline_id]),
+            'jobs': len(jobs),
+            'workers': sum(link['workers'] for link in jobs.values()),
+            'statuses': statuses,
+            'cycles': cycles,
+        }
+
+    def labels_memoized(self) -> bool:
+        """Whether `labels_json` has already been encoded."""
+        return self._labels_json is not None
+
+    def labels_json(self) -> bytes:
+        """The pipeline id of every node and job (so of each of its links),
+        as `{"nodes": {node id: pipeline id}, "jobs": {job id: pipeline id}}`,
+        encoded once."""
+        if self._labels_json is None:
+            self._labels_json = to_json({'nodes': self.pipeline_of, 'jobs': self.pipeline_of_job})
+        return self._labels_json
+
+    def subgraph(self, pipeline_id: str) -> Dict[str, Any]:
+        """The nodes and links of one pipeline.
+
+        Raises:
+            KeyError: If there's no such pipeline.
+        """
+        return {'nodes': self.nodes[pipeline_id], 'links': self.links[pipeline_id]}
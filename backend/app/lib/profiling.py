@@ -0,0 +1,221 @@
+import contextvars
+import cProfile
+import io
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+MODES = ('cprofile', 'sample')
+
+_current_session: contextvars.ContextVar[Optional['ProfileSession']] = contextvars.ContextVar(
+    'profile_session', default=None
+)
+
+# cProfile can only have one active profiler at a time, and profiling is
+# meant for one-off investigations anyway
+_session_lock = threading.Lock()
+
+
+class ProfilerBusy(Exception):
+    pass
+
+
+def current_session() -> Optional['ProfileSession']:
+    """The session active in this context, if any.  A task started during a
+    session keeps a copy of its context after the session ends, and mustn't
+    keep profiling."""
+    session = _current_session.get()
+    return session if session is not None and session.active else None
+
+
+def _describe(filename: str, lineno: int, name: str) -> str:
+    if filename == '~':
+        return name  # built-in
+    return f"{name} ({filename}:{lineno})"
+
+
+class ProfileSession:
+    """Profiles the CPU-bound work done for one request.
+
+    Work is profiled explicitly via `run`, which is what the CPU executor
+    does for any function it's handed while a session is active.  The
+    sampler only looks at the thread doing that work; cProfile on Python
+    3.12+ also records other threads while enabled, so a busy server can add
+    some noise to a deterministic profile.
+
+    Args:
+        mode (str): `cprofile` for the deterministic profiler, or `sample`
+            for a low overhead sampling profiler.
+        sample_interval (float): Seconds between stack samples in `sample`
+            mode.
+    """
+
+    def __init__(self, mode: str = 'cprofile', sample_interval: float = 0.001):
+        if mode not in MODES:
+            raise ValueError(f"Unknown profiling mode '{mode}', expected one of {MODES}")
+        self.mode = mode
+        self.sample_interval = sample_interval
+        self.started = time.time()
+        self.profiled_seconds = 0.0
+        self.active = False
+        self._profile = cProfile.Profile() if mode == 'cprofile' else None
+        self._samples: Counter = Counter()  # stack (root first) -> count
+
+    @contextmanager
+    def activate(self):
+        """Make this the session used by `run` for the enclosed block."""
+        if not _session_lock.acquire(blocking=False):
+            raise ProfilerBusy("Another profiling session is running")
+        token = _current_session.set(self)
+        self.active = True
+        try:
+            yield self
+        finally:
+            self.active = False
+            _current_session.reset(token)
+            _session_lock.release()
+
+    def run(self, func, *args):
+        """Call `func(*args)` under the profiler in the current thread."""
+        start = time.perf_counter()
+        try:
+            if self._profile is not None:
+                return self._profile.runcall(func, *args)
+            return self._run_sampled(func, *args)
+        finally:
+            self.profiled_seconds += time.perf_counter() - start
+
+    def _run_sampled(self, func, *args):
+        target = threading.get_ident()
+        stop = threading.Event()
+
+        def sample():
+            while not stop.wait(self.sample_interval):
+                frame = sys._current_frames().get(target)
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+                    frame = frame.f_back
+                self._samples[tuple(reversed(stack))] += 1
+
+        sampler = threading.Thread(target=sample, name='profile-sampler', daemon=True)
+        sampler.start()
+        try:
+            return func(*args)
+        finally:
+            stop.set()
+            sampler.join()
+
+    def report(self, top: int = 30) -> Dict[str, Any]:
+        """Top functions and call tree for everything profiled so far."""
+        if self._profile is not None:
+            top_functions, call_tree = self._cprofile_report(top)
+        else:
+            top_functions, call_tree = self._sample_report(top)
+        return {
+            'mode': self.mode,
+            'started_at': self.started,
+            'profiled_seconds': round(self.profiled_seconds, 6),
+            'top_functions': top_functions,
+            'call_tree': call_tree,
+        }
+
+    def _cprofile_report(self, top: int) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        stats = pstats.Stats(self._profile).stats
+        top_functions = [
+            {
+                'function': _describe(*func),
+                'calls': nc,
+                'self_seconds': round(tt, 6),
+                'cumulative_seconds': round(ct, 6),
+            }
+            for func, (cc, nc, tt, ct, callers) in sorted(
+                stats.items(), key=lambda item: item[1][3], reverse=True
+            )[:top]
+        ]
+
+        callees: Dict[Any, Dict[Any, float]] = {}
+        for func, (cc, nc, tt, ct, callers) in stats.items():
+            for caller, caller_stats in callers.items():
+                callees.setdefault(caller, {})[func] = caller_stats[3]
+        roots = [func for func, value in stats.items() if not value[4]]
+        total = sum(stats[root][3] for root in roots) or 1.0
+
+        def build(func, seconds, path, depth):
+            node = {'function': _describe(*func), 'seconds': round(seconds, 6), 'children': []}
+            if depth >= 20:
+                return node
+            for child, child_seconds in sorted(callees.get(func, {}).items(), key=lambda c: c[1], reverse=True):
+                # Skip recursion and anything under 1% of the profile
+                if child in path or child_seconds < total * 0.01:
+                    continue
+                node['children'].append(build(child, child_seconds, path | {child}, depth + 1))
+            return node
+
+        call_tree = [build(root, stats[root][3], {root}, 0) for root in roots if stats[root][3] >= total * 0.01]
+        return top_functions, call_tree
+
+    def _sample_report(self, top: int) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        total = sum(self._samples.values()) or 1
+        self_samples: Counter = Counter()
+        total_samples: Counter = Counter()
+        tree: Dict[str, Any] = {'children': {}}
+        for stack, count in self._samples.items():
+            if not stack:
+                continue
+            self_samples[stack[-1]] += count
+            for func in set(stack):
+                total_samples[func] += count
+            node = tree
+            for func in stack:
+                node = node['children'].setdefault(func, {'samples': 0, 'children': {}})
+                node['samples'] += count
+
+        top_functions = [
+            {
+                'function': _describe(*func),
+                'self_samples': self_samples[func],
+                'total_samples': count,
+                'total_percent': round(100 * count / total, 2),
+            }
+            for func, count in total_samples.most_common(top)
+        ]
+
+        def convert(children):
+            return [
+                {
+                    'function': _describe(*func),
+                    'samples': node['samples'],
+                    'children': convert(node['children']),
+                }
+                for func, node in sorted(children.items(), key=lambda c: c[1]['samples'], reverse=True)
+                if node['samples'] >= total * 0.01
+            ]
+
+        return top_functions, convert(tree['children'])
+
+    def save(self, directory) -> Path:
+        """Write the raw profile to `directory`: a pstats dump (`.prof`, for
+        snakeviz or `python -m pstats`) or, for sampling, collapsed stacks
+        (`.folded`, for flamegraph tools)."""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(self.started))
+        if self._profile is not None:
+            path = directory / f"profile-{stamp}.prof"
+            self._profile.dump_stats(path)
+        else:
+            path = directory / f"profile-{stamp}.folded"
+            out = io.StringIO()
+            for stack, count in self._samples.items():
+                out.write(';'.join(f"{name} ({Path(filename).name}:{lineno})"
+                                   for filename, lineno, name in stack))
+                out.write(f" {count}\n")
+            path.write_text(out.getvalue())
+        return path
@@ -0,0 +1,109 @@
+"""
+The parts of a Teraslice v3 job document, as returned by `/jobs`, that the
+graph and pipeline health are built from, and the serialized graph itself.
+
+`decode_jobs` checks a `/jobs` response body against this schema straight
+from the bytes, with msgspec, and decodes the full documents (which
+`/api/jobs` serves as-is and operator handlers read freely).  A response that
+doesn't match raises `JobSchemaError` naming the offending field, rather
+than a `KeyError` somewhere in the middle of building the graph.
+
+`encode_graph` and `decode_graph` serialize the graph and read it back.
+"""
+from typing import Annotated, Any, Dict, List, Optional, TypedDict
+
+import msgspec
+from pydantic import TypeAdapter
+
+from .ts import StorageNode
+
+
+class JobSchemaError(ValueError):
+    """A `/jobs` response that doesn't match the expected job schema."""
+
+
+class Execution(msgspec.Struct):
+    status: str = msgspec.field(name='_status')
+
+
+class Operation(msgspec.Struct):
+    op: str = msgspec.field(name='_op')
+    api_name: Optional[str] = msgspec.field(name='_api_name', default=None)
+    routing: Optional[Dict[str, str]] = None
+
+
+class Api(msgspec.Struct):
+    name: str = msgspec.field(name='_name')
+
+
+class Job(msgspec.Struct):
+    job_id: str
+    name: str
+    workers: int
+    ex: Execution
+    # The first and last operations are the job's source and destination
+    operations: Annotated[List[Operation], msgspec.Meta(min_length=1)]
+    apis: List[Api] = []
+
+
+# Unknown fields are skipped without being decoded, which is most of each
+# document, so checking is a fraction of the cost of decoding
+_validator = msgspec.json.Decoder(List[Job])
+_decoder = msgspec.json.Decoder()
+
+
+def decode_jobs(body: bytes, validate: bool = True) -> List[Dict[str, Any]]:
+    """Decode a `/jobs` response body.
+
+    Args:
+        body (bytes): The response body.
+        validate (bool): Check the jobs against the schema first.  Only
+            responses including the execution status (`ex=_status`) can
+            match it.
+
+    Returns:
+        list: The jobs, as plain dicts.
+
+    Raises:
+        JobSchemaError: If `validate` is set and the jobs don't match the
+            schema, or the body isn't valid JSON.
+    """
+    try:
+        if validate:
+            _validator.decode(body)
+        return _decoder.decode(body)
+    except msgspec.ValidationError as e:
+        raise JobSchemaError(f"Teraslice /jobs response doesn't match the expected job schema: {e}") from e
+    except msgspec.DecodeError as e:
+        raise JobSchemaError(f"Teraslice /jobs response isn't valid JSON: {e}") from e
+
+
+class Graph(msgspec.Struct):
+    nodes: List[StorageNode]
+    links: List[Dict[str, Any]]
+
+
+_graph_decoder = msgspec.json.Decoder(Graph)
+
+
+class _GraphDict(TypedDict):
+    nodes: List[StorageNode]
+    links: List[Dict[str, Any]]
+
+
+# Serializes StorageNodes from their schema, several times faster than
+# to_json's generic dataclass handling
+_graph_adapter = TypeAdapter(_GraphDict)
+
+
+def encode_graph(graph: Dict[str, Any]) -> bytes:
+    """Serialize a pipeline graph, as `_process_jobs_to_graph` returns it,
+    to JSON."""
+    return _graph_adapter.dump_json(graph)
+
+
+def decode_graph(payload: bytes) -> Dict[str, Any]:
+    """Decode a serialized pipeline graph (e.g. a published snapshot) back
+    into the form `_process_jobs_to_graph` returns."""
+    graph = _graph_decoder.decode(payload)
+    return {'nodes': graph.nodes, 'links': graph.links}
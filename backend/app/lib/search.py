@@ -0,0 +1,148 @@
+"""
+Search over the pipeline graph's nodes and jobs, for autocomplete.
+
+A `SearchIndex` is built once per graph version from the searchable terms:
+node ids, their topic/index/path part (the id after the connection) and job
+names and ids, all lowercased.  Terms are kept sorted, so the terms starting
+with the query are a contiguous range found by bisection, and a trigram
+index (every three byte sequence of each term, as sorted NumPy arrays) narrows
+substring matches down to the few terms sharing the query's trigrams before
+they're checked.
+"""
+import bisect
+from typing import Any, Dict, List
+
+import numpy as np
+
+# Prefix matches come first, so this sorts after any term that starts with
+# the query
+_PREFIX_END = '\U0010ffff'
+# Substring candidates are checked against the query once there are no more
+# than this many
+_CHECK_DIRECTLY = 256
+
+
+class SearchIndex:
+    """Prefix and substring search over a graph's nodes and jobs.
+
+    Args:
+        graph (dict): Graph data from `_process_jobs_to_graph`.
+    """
+
+    def __init__(self, graph: Dict[str, Any]):
+        # What the results describe, one per node and one per job
+        self.entries: List[Dict[str, Any]] = []
+        term_entries: Dict[str, List[int]] = {}
+        # Terms substring matches are looked for in.  A node's name is part
+        # of its id, so matching the id is enough.
+        full_terms = set()
+
+        def add(term, position, full=True):
+            term = term.lower()
+            positions = term_entries.setdefault(term, [])
+            if not positions or positions[-1] != position:
+                positions.append(position)
+            if full:
+                full_terms.add(term)
+
+        for node in graph['nodes']:
+            position = len(self.entries)
+            self.entries.append({'type': 'node', 'id': node.id, 'connector_type': node.connector_type})
+            add(node.id, position)
+            name = node.id.partition(':')[2]
+            if name:
+                add(name, position, full=False)
+        jobs = {}
+        for link in graph['links']:
+            jobs.setdefault(link['job_id'], link)
+        for job_id, link in jobs.items():
+            position = len(self.entries)
+            self.entries.append({'type': 'job', 'id': job_id, 'name': link['name'], 'status': link['status']})
+            add(job_id, position)
+            add(link['name'], position)
+
+        self.terms = sorted(term_entries)
+        self.term_entries = [term_entries[term] for term in self.terms]
+        self._build_trigrams([i for i, term in enumerate(self.terms) if term in full_terms])
+
+    def _build_trigrams(self, term_ids: List[int]):
+        # The terms' bytes end to end, each followed by a zero byte so that
+        # trigrams spanning two terms can be told apart and dropped
+        data = np.frombuffer(b'\0'.join(self.terms[i].encode() for i in term_ids) + b'\0', dtype=np.uint8)
+        lengths = np.fromiter((len(self.terms[i].encode()) + 1 for i in term_ids), dtype=np.int64, count=len(term_ids))
+        owners = np.repeat(np.asarray(term_ids, dtype=np.int32), lengths)
+        first, second, third = data[:-2].astype(np.int32), data[1:-1].astype(np.int32), data[2:].astype(np.int32)
+        valid = (first != 0) & (second != 0) & (third != 0)
+        codes = (first << 16 | second << 8 | third)[valid]
+        owners = owners[:-2][valid]
+
+        # Postings: for each trigram, the distinct ids of the terms containing
+        # it in term order, end to end.  Sorting (trigram, term id) pairs
+        # packed into one int64 is quicker than a stable argsort.
+        pairs = codes.astype(np.int64) << 32 | owners
+        pairs.sort()
+        keep = np.ones(len(pairs), dtype=bool)
+        keep[1:] = pairs[1:] != pairs[:-1]
+        pairs = pairs[keep]
+        codes = (pairs >> 32).astype(np.int32)
+        self._postings = (pairs & 0xffffffff).astype(np.int32)
+        first_of_trigram = np.ones(len(codes), dtype=bool)
+        first_of_trigram[1:] = codes[1:] != codes[:-1]
+        starts = np.flatnonzero(first_of_trigram)
+        self._trigrams = codes[starts]
+        self._offsets = np.append(starts, len(codes))
+
+    def _posting(self, code: int) -> np.ndarray:
+        i = np.searchsorted(self._trigrams, code)
+        if i == len(self._trigrams) or self._trigrams[i] != code:
+            return self._postings[:0]
+        return self._postings[self._offsets[i]:self._offsets[i + 1]]
+
+    def _containing(self, q: str) -> np.ndarray:
+        """Ids of the terms that might contain `q` (at least three bytes),
+        in term order."""
+        data = q.encode()
+        codes = {data[i] << 16 | data[i + 1] << 8 | data[i + 2] for i in range(len(data) - 2)}
+        postings = sorted((self._posting(code) for code in codes), key=len)
+        candidates = postings[0]
+        for posting in postings[1:]:
+            # Few enough to check directly, the rest of the (longer)
+            # postings wouldn't save any time
+            if len(candidates) <= _CHECK_DIRECTLY:
+                break
+            # Binary search the candidates in the posting, which costs
+            # nothing like a pass over a long posting would
+            found = np.searchsorted(posting, candidates)
+            found[found == len(posting)] = 0
+            candidates = candidates[posting[found] == candidates]
+        return candidates
+
+    def search(self, q: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """Nodes and jobs with a term starting with `q`, alphabetically by
+        term, then those with a term containing it, ignoring case.  Queries
+        shorter than three bytes only match prefixes.
+
+        Returns:
+            list: Up to `limit` entries, each with how it `matched`.
+        """
+        q = q.lower()
+        results: Dict[int, Dict[str, Any]] = {}
+
+        def collect(term_ids, matched):
+            for term_id in term_ids:
+                for position in self.term_entries[term_id]:
+                    if position not in results:
+                        results[position] = {**self.entries[position], 'matched': matched}
+                        if len(results) == limit:
+                            return True
+            return False
+
+        start = bisect.bisect_left(self.terms, q)
+        end = bisect.bisect_left(self.terms, q + _PREFIX_END, start)
+        if collect(range(start, end), 'prefix') or len(q.encode()) < 3:
+            return list(results.values())
+
+        terms = self.terms
+        collect((term_id for term_id in self._containing(q).tolist()
+                 if not start <= term_id < end and q in terms[term_id]), 'substring')
+        return list(results.values())
@@ -0,0 +1,140 @@
+import fcntl
+import mmap
+import os
+import struct
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Every snapshot file starts with: magic, version, publish timestamp, payload
+# length.  The serialized payload follows immediately after.
+MAGIC = b'T3DSNAP1'
+HEADER = struct.Struct('>8sQdQ')
+
+
+@dataclass
+class Snapshot:
+    name: str
+    version: int
+    timestamp: float
+    payload: memoryview
+
+    def age(self) -> float:
+        return time.time() - self.timestamp
+
+
+class SnapshotStore:
+    """Versioned, memory-mapped snapshots of serialized payloads.
+
+    A single writer publishes snapshots by writing a complete file next to the
+    live one and atomically renaming it into place.  Readers memory-map the
+    file read-only and hand out a `memoryview` of the payload, so any number of
+    worker processes on the host share the same page cache pages instead of
+    each holding a decoded copy.  Because a publish replaces the file rather
+    than rewriting it, a mapping a reader is still serving from stays intact.
+
+    Put `directory` on tmpfs (e.g. `/dev/shm/teraslice-3d`) to keep snapshots
+    entirely in memory.
+
+    Args:
+        directory (Path): Where snapshot files live.
+    """
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # name -> ((st_ino, st_mtime_ns), Snapshot) for the current mapping
+        self._mapped: Dict[str, Tuple[Tuple[int, int], Snapshot]] = {}
+
+    def path(self, name: str) -> Path:
+        return self.directory / f"{name}.snap"
+
+    def publish(self, name: str, payload: bytes) -> int:
+        """Atomically replace snapshot `name` with `payload` and return the
+        new version number."""
+        current = self.read(name)
+        version = current.version + 1 if current is not None else 1
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=f".{name}.", suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(HEADER.pack(MAGIC, version, time.time(), len(payload)))
+                f.write(payload)
+            os.replace(tmp_path, self.path(name))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+        logger.debug(f"Published snapshot '{name}' version {version} ({len(payload)} bytes)")
+        return version
+
+    def read(self, name: str) -> Optional[Snapshot]:
+        """Return the latest snapshot for `name`, or None if none has been
+        published.  The file is only re-mapped when it has been replaced."""
+        path = self.path(name)
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            self._mapped.pop(name, None)
+            return None
+
+        identity = (st.st_ino, st.st_mtime_ns)
+        mapped = self._mapped.get(name)
+        if mapped is not None and mapped[0] == identity:
+            return mapped[1]
+
+        with open(path, 'rb') as f:
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, timestamp, length = HEADER.unpack_from(mapping)
+        if magic != MAGIC or HEADER.size + length > len(mapping):
+            raise ValueError(f"Corrupt snapshot file: {path}")
+
+        # The previous mapping is released once nothing references its views
+        snapshot = Snapshot(
+            name=name,
+            version=version,
+            timestamp=timestamp,
+            payload=memoryview(mapping)[HEADER.size:HEADER.size + length],
+        )
+        self._mapped[name] = (identity, snapshot)
+        return snapshot
+
+
+class LeaderLock:
+    """Non-blocking exclusive file lock used to elect one worker on a host.
+
+    The OS drops the lock when the holding process exits, so a follower
+    retrying `try_acquire` takes over if the leader dies.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._fd: Optional[int] = None
+
+    @property
+    def held(self) -> bool:
+        return self._fd is not None
+
+    def try_acquire(self) -> bool:
+        if self._fd is not None:
+            return True
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        self._fd = fd
+        return True
+
+    def release(self) -> None:
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
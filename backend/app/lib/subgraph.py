@@ -0,0 +1,167 @@
+"""
+Filtered views of the pipeline graph, so that clients interested in a few
+topics don't have to download the whole graph and filter it themselves.
+
+A `SubgraphIndex` is built once per graph version and holds what filtering
+needs up front: nodes by connector type, links by status and each node's
+links.  Filtered graphs are memoized as JSON per filter.
+"""
+import re
+from collections import deque
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import re2
+
+from .memo import Memo
+from .schema import encode_graph
+
+# Regular expressions run on the CPU executor, so they're matched with RE2,
+# which takes time linear in the text matched whatever the pattern, rather
+# than `re`, which can backtrack for hours on patterns like `(x|x)*y`
+_MAX_PATTERN_LENGTH = 100
+_PATTERN_OPTIONS = re2.Options()
+_PATTERN_OPTIONS.case_sensitive = False
+_PATTERN_OPTIONS.log_errors = False
+
+
+class GraphFilter(NamedTuple):
+    """What to keep of the graph, see `SubgraphIndex.subgraph`."""
+    connector_types: Tuple[str, ...] = ()
+    statuses: Tuple[str, ...] = ()
+    q: Optional[str] = None
+    regex: bool = False
+    depth: int = 0
+
+    def pattern(self) -> Optional[Any]:
+        """`q` compiled with RE2, ignoring case, if `regex` is set.
+
+        Raises:
+            re.error: If `q` is longer than 100 characters or isn't a valid
+                RE2 pattern (which has no backreferences or lookarounds).
+        """
+        if not self.regex:
+            return None
+        if len(self.q) > _MAX_PATTERN_LENGTH:
+            raise re.error(f"longer than {_MAX_PATTERN_LENGTH} characters")
+        try:
+            return re2.compile(self.q, _PATTERN_OPTIONS)
+        except re2.error as e:
+            message = e.args[0] if e.args else 'invalid pattern'
+            raise re.error(message.decode() if isinstance(message, bytes) else message) from None
+
+
+class SubgraphIndex:
+    """Indexes of a graph from `_process_jobs_to_graph` for filtering it.
+
+    Args:
+        graph (dict): The graph's nodes and links.
+        cache_size (int): Filtered graphs kept.  They can be as big as the
+            graph itself, so not many.
+    """
+
+    def __init__(self, graph: Dict[str, Any], cache_size: int = 16):
+        self.nodes = graph['nodes']
+        self.links = graph['links']
+        position = {node.id: i for i, node in enumerate(self.nodes)}
+        self.by_type: Dict[str, List[int]] = {}
+        for i, node in enumerate(self.nodes):
+            self.by_type.setdefault(node.connector_type, []).append(i)
+        self.by_status: Dict[str, List[int]] = {}
+        # Lowercased once for substring matches, rather than per query
+        self.node_text = [node.id.lower() for node in self.nodes]
+        self.link_text = [f"{link['name']}\0{link['job_id']}".lower() for link in self.links]
+        # node -> (link, node at its other end) for each of its links
+        self.neighbours: List[List[Tuple[int, int]]] = [[] for _ in self.nodes]
+        self.ends: List[Tuple[int, int]] = []
+        for i, link in enumerate(self.links):
+            self.by_status.setdefault(link['status'], []).append(i)
+            source, target = position[link['source']], position[link['target']]
+            self.ends.append((source, target))
+            self.neighbours[source].append((i, target))
+            self.neighbours[target].append((i, source))
+        self._results = Memo(cache_size)
+
+    def memoized(self, graph_filter: GraphFilter) -> Optional[bytes]:
+        """The filtered graph's JSON if it has already been computed."""
+        return self._results.peek(graph_filter)
+
+    def subgraph_json(self, graph_filter: GraphFilter) -> bytes:
+        """`subgraph` serialized, memoized per filter."""
+        return self._results.get(graph_filter, lambda: encode_graph(self.subgraph(graph_filter)))
+
+    def subgraph(self, graph_filter: GraphFilter) -> Dict[str, Any]:
+        """The part of the graph `graph_filter` selects.
+
+        Nodes match when they're one of `connector_types` (any type when
+        empty) and their id contains `q` (or matches it as an RE2 regular
+        expression, when `regex` is set).  Jobs whose name or id matches
+        `q` match both of their nodes, as in the frontend's search.  Nodes up
+        to `depth` links away from a matching node are included too.
+
+        Only jobs with one of `statuses` are kept (any status when empty),
+        along with the nodes that have one of them.  Of those, the result
+        holds the included nodes and the jobs between them, in graph order.
+
+        Raises:
+            re.error: If `q` isn't a valid regular expression.
+        """
+        if graph_filter.statuses:
+            links = sorted(i for status in set(graph_filter.statuses) for i in self.by_status.get(status, ()))
+            kept = set(links)
+        else:
+            links = range(len(self.links))
+            kept = None
+
+        if graph_filter.connector_types:
+            candidates = sorted(i for connector_type in set(graph_filter.connector_types)
+                                for i in self.by_type.get(connector_type, ()))
+            allowed = set(candidates)
+        else:
+            candidates = range(len(self.nodes))
+            allowed = None
+
+        if graph_filter.q:
+            pattern = graph_filter.pattern()
+            if pattern is None:
+                needle = graph_filter.q.lower()
+                node_text, link_text = self.node_text, self.link_text
+                included = {i for i in candidates if needle in node_text[i]}
+                matched_links = [i for i in links if needle in link_text[i]]
+            else:
+                search = pattern.search
+                included = {i for i in candidates if search(self.nodes[i].id)}
+                matched_links = [i for i in links
+                                 if search(self.links[i]['name']) or search(self.links[i]['job_id'])]
+            for i in matched_links:
+                included.update(end for end in self.ends[i] if allowed is None or end in allowed)
+        else:
+            included = set(candidates)
+
+        if graph_filter.depth:
+            included = self._expand(included, graph_filter.depth, kept)
+
+        if kept is not None:
+            # Nodes none of whose jobs have the statuses asked for go
+            included = {i for i in included
+                        if any(link in kept for link, _ in self.neighbours[i])}
+
+        return {
+            'nodes': [self.nodes[i] for i in sorted(included)],
+            'links': [self.links[i] for i in links
+                      if self.ends[i][0] in included and self.ends[i][1] in included],
+        }
+
+    def _expand(self, seeds, depth, kept):
+        """Nodes within `depth` links (in either direction) of `seeds`."""
+        distances = dict.fromkeys(seeds, 0)
+        queue = deque(seeds)
+        while queue:
+            current = queue.popleft()
+            distance = distances[current]
+            if distance >= depth:
+                continue
+            for link, neighbour in self.neighbours[current]:
+                if neighbour not in distances and (kept is None or link in kept):
+                    distances[neighbour] = distance + 1
+                    queue.append(neighbour)
+        return set(distances)
@@ -0,0 +1,167 @@
+import contextvars
+import heapq
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+_current_trace: contextvars.ContextVar[Optional['RequestTrace']] = contextvars.ContextVar(
+    'request_trace', default=None
+)
+
+
+class RequestTrace:
+    """Phase timings collected while handling one request.
+
+    Spans with the same name are summed, so a phase that runs several times
+    (or in several threads) shows up once with its total duration.
+    """
+
+    def __init__(self, method: str, path: str):
+        self.method = method
+        self.path = path
+        self.route: Optional[str] = None
+        self.status: Optional[int] = None
+        self.start = time.perf_counter()
+        self.timestamp = time.time()
+        self.duration: Optional[float] = None
+        self.phases: Dict[str, float] = {}
+        self.descriptions: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, duration: float) -> None:
+        # Tasks spawned during the request (e.g. background refreshes)
+        # inherit the context, but shouldn't add to a finished trace
+        if self.duration is not None:
+            return
+        with self._lock:
+            self.phases[name] = self.phases.get(name, 0.0) + duration
+
+    def describe(self, name: str, description: str) -> None:
+        if self.duration is None:
+            self.descriptions[name] = description
+
+    def finish(self) -> None:
+        self.duration = time.perf_counter() - self.start
+
+    def server_timing(self) -> str:
+        """Render phases as a `Server-Timing` header value (durations in ms)."""
+        entries = []
+        names = list(self.phases) + [n for n in self.descriptions if n not in self.phases]
+        for name in names:
+            entry = name
+            if name in self.descriptions:
+                entry += f';desc="{self.descriptions[name]}"'
+            if name in self.phases:
+                entry += f';dur={self.phases[name] * 1000:.2f}'
+            entries.append(entry)
+        entries.append(f'total;dur={(time.perf_counter() - self.start) * 1000:.2f}')
+        return ', '.join(entries)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'method': self.method,
+            'path': self.path,
+            'route': self.route,
+            'status': self.status,
+            'timestamp': self.timestamp,
+            'duration_ms': round((self.duration or 0) * 1000, 3),
+            'phases_ms': {name: round(d * 1000, 3) for name, d in self.phases.items()},
+            'descriptions': dict(self.descriptions),
+        }
+
+
+def current_trace() -> Optional[RequestTrace]:
+    return _current_trace.get()
+
+
+@contextmanager
+def span(name: str):
+    """Time the enclosed block as phase `name` of the current request.
+    Does nothing outside of a traced request."""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add(name, time.perf_counter() - start)
+
+
+def describe(name: str, description: str) -> None:
+    """Attach a short description (e.g. cache `hit`/`miss`) to phase `name`."""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.describe(name, description)
+
+
+class TraceBuffer:
+    """Keeps the slowest `size` traces for each route."""
+
+    def __init__(self, size: int = 20):
+        self.size = size
+        self._heaps: Dict[str, List] = {}
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    def record(self, trace: RequestTrace) -> None:
+        if self.size <= 0:
+            return
+        route = trace.route or 'other'
+        item = (trace.duration, next(self._counter), trace)
+        with self._lock:
+            heap = self._heaps.setdefault(route, [])
+            if len(heap) < self.size:
+                heapq.heappush(heap, item)
+            elif item[0] > heap[0][0]:
+                heapq.heapreplace(heap, item)
+
+    def slowest(self, route: Optional[str] = None) -> Dict[str, List[Dict[str, Any]]]:
+        with self._lock:
+            routes = [route] if route is not None else list(self._heaps)
+            return {
+                r: [t.to_dict() for _, _, t in sorted(self._heaps.get(r, []), reverse=True)]
+                for r in routes
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._heaps.clear()
+
+
+class ServerTimingMiddleware:
+    """ASGI middleware that traces each request's phases and reports them
+    in a `Server-Timing` response header (visible in browser devtools).
+    Finished traces are offered to `buffer` when one is given."""
+
+    def __init__(self, app, buffer: Optional[TraceBuffer] = None):
+        self.app = app
+        self.buffer = buffer
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        trace = RequestTrace(scope['method'], scope['path'])
+        token = _current_trace.set(trace)
+
+        async def send_with_timing(message):
+            if message['type'] == 'http.response.start':
+                trace.status = message['status']
+                headers = list(message.get('headers', []))
+                headers.append((b'server-timing', trace.server_timing().encode('latin-1')))
+                message = {**message, 'headers': headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_trace.reset(token)
+            trace.finish()
+            trace.route = getattr(scope.get('route'), 'path', None)
+            if self.buffer is not None:
+                self.buffer.record(trace)
@@ -1,15 +1,59 @@
-from pydantic import BaseModel
+import sys
+from dataclasses import dataclass
 from typing import Literal
 
-class StorageNode(BaseModel):
+from .operators import OperatorRegistry
+
+ConnectorType = Literal['KAFKA', 'ES', 'FILE', 'S3', 'DATA_GENERATOR', 'NOOP', 'STDOUT', 'OTHER']
+
+
+@dataclass(frozen=True, slots=True)
+class StorageNode:
+    """A topic, index, path etc. that jobs read from or write to.
+
+    One of these is needed for every source and destination of every job on
+    each graph build, so it's a small immutable slotted object rather than a
+    model.  Serializes (e.g. with `pydantic_core.to_json`) as
+    `{"id": ..., "connector_type": ...}`.
+    """
     id: str
-    connector_type: Literal['KAFKA', 'ES', 'FILE', 'S3', 'DATA_GENERATOR', 'NOOP', 'STDOUT', 'OTHER']
+    connector_type: ConnectorType
 
     # we make this object hashable so that we can deduplicate a list of them later
     def __hash__(self):
         return hash(self.id)
 
 
+def node_connection(node_id):
+    """Connector cluster of a node id like `kafka_cluster1:topic1`."""
+    return node_id.split(':', 1)[0] if ':' in node_id else node_id
+
+
+class NodeTable:
+    """Interns the StorageNodes of one graph build.
+
+    The same topic or index shows up in many jobs, asking the table for a
+    node returns the existing one (and its id string) rather than a copy.
+    """
+    __slots__ = ('_nodes',)
+
+    def __init__(self):
+        self._nodes = {}
+
+    def node(self, id, connector_type):
+        key = (id, connector_type)
+        node = self._nodes.get(key)
+        if node is None:
+            node = self._nodes[key] = StorageNode(id, connector_type)
+        return node
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def __iter__(self):
+        return iter(self._nodes.values())
+
+
 class JobInfo:
     """ Given a Teraslice job, this class will inspect the first and last
     operators, which are assumed to be the source and destination nodes
@@ -19,6 +63,9 @@ class JobInfo:
     Args:
         job (dictionary): Python dictionary of Teraslice Job
         logger (Logging): Logger to be used
+        warnings (ParseWarnings): Collects parse warnings instead of logging
+            them one by one, when given
+        nodes (NodeTable): Interns the nodes created, when given
 
     Properties:
     * `source_node` - `<CONNECTOR>:<TOPIC|INDEX>`
@@ -26,13 +73,35 @@ class JobInfo:
     * `source_type` - `KAFKA|ES|FILE|S3|DATA_GENERATOR|OTHER`
     * `destination_nodes` - an array of one or more `destination_node` strings
     * `destination_type` - `KAFKA|ES|FILE|S3|NOOP|STDOUT|OTHER`
+
+    Operations are parsed by the handlers registered in `SOURCE_OPERATORS`
+    and `DESTINATION_OPERATORS`.
     """
-    def __init__(self, job, logger):
+    def __init__(self, job, logger, warnings=None, nodes=None):
         self.job = job
         self.logger = logger
+        self.warnings = warnings
+        self.nodes = nodes
+        # `_name` -> api, the first definition wins as with a linear search
+        self._apis = {}
+        for api in job.get('apis', []):
+            self._apis.setdefault(api.get('_name'), api)
         self.source = self.process_source_node()
         self.destinations = self.process_destination_nodes()
 
+    def node(self, id, connector_type):
+        """A StorageNode, shared with the rest of the build if interning."""
+        if self.nodes is None:
+            return StorageNode(id, connector_type)
+        return self.nodes.node(id, connector_type)
+
+    def warn(self, op_type, message):
+        """Report a problem parsing this job's `op_type` operation."""
+        if self.warnings is not None:
+            self.warnings.add(self.job.get('job_id'), op_type, message)
+        else:
+            self.logger.warning(message)
+
     def _get_api_for_operation(self, op):
         """
         Find the API definition referenced by an operation.
@@ -50,11 +119,33 @@ class JobInfo:
         if api_name is None:
             return None
 
-        for api in self.job.get('apis', []):
-            if api.get('_name') == api_name:
-                return api
+        return self._apis.get(api_name)
 
-        return None
+    def _resolve_operation(self, op):
+        """
+        Find where an operation's settings live, and its connection, in one
+        lookup so that reading several fields doesn't search the APIs for each.
+
+        Args:
+            op: The operation dictionary
+
+        Returns:
+            A (fields, connection) tuple, `fields` being the API definition,
+            the operation itself for a bare operation, or an empty dict when
+            the referenced API doesn't exist
+        """
+        api = self._get_api_for_operation(op)
+        if api is not None:
+            fields = api
+            connection = api.get('_connection')
+        elif '_api_name' in op:
+            # An API was referenced but not found; do not fall back to the op.
+            return {}, 'default'
+        else:
+            fields = op
+            connection = op.get('connection')
+        # A handful of connection names are repeated across every job
+        return fields, sys.intern(connection) if connection else 'default'
 
     def _get_field_from_operation_or_api(self, op, op_field, api_field=None):
         """
@@ -83,201 +174,218 @@ class JobInfo:
         if api_field is None:
             api_field = op_field
 
-        api = self._get_api_for_operation(op)
-        if api is not None:
-            return api.get(api_field)
-
+        fields, _ = self._resolve_operation(op)
         # No API declared - read directly from the operation (v3 still allows
         # bare operations, and this keeps default-connection handling working).
-        if '_api_name' in op:
-            # An API was referenced but not found; do not fall back to the op.
-            return None
-
-        return op.get(op_field)
+        return fields.get(op_field if fields is op else api_field)
 
     def _get_connection(self, op):
         """Resolve the connection name for an operation, defaulting to
         'default' when unspecified (Teraslice's implicit connection name)."""
-        connection = self._get_field_from_operation_or_api(
-            op, 'connection', '_connection'
+        return self._resolve_operation(op)[1]
+
+    def _unhandled(self, registry, op_type, connection):
+        message = f"UNHANDLED {registry.kind.upper()} OPERATION: {op_type}"
+        # The per-build collector records every job, logged on their own each
+        # unknown operation is only worth one warning per process
+        if self.warnings is not None or registry.first_unknown(op_type):
+            self.warn(op_type, message)
+        return self.node(
+            id=f"{connection}:{op_type}",
+            connector_type='OTHER'
         )
-        return connection if connection else 'default'
 
     def process_source_node(self):
-        source = None
         op = self.job['operations'][0]
         op_type = op.get('_op', '')
-
-        if op_type == 'kafka_reader':
-            topic = self._get_field_from_operation_or_api(op, 'topic')
-
-            if topic:
-                source = StorageNode(
-                    # if connection is not specified, Teraslice assumes 'default'
-                    id=f"{self._get_connection(op)}:{topic}",
-                    connector_type='KAFKA'
-                )
-            else:
-                self.logger.warning(f"kafka_reader missing topic: {op}")
-        elif op_type == 'data_generator':
-            # source_node -> data_generator
-            source = StorageNode(
-                id="data_generator",
-                connector_type='DATA_GENERATOR'
-            )
-        elif op_type in ('file_reader', 'file_assets') or 'file' in op_type:
-            path = self._get_field_from_operation_or_api(op, 'path')
-            node_id = f"{self._get_connection(op)}:{path}" if path else f"{self._get_connection(op)}:{op_type}"
-            source = StorageNode(
-                id=node_id,
-                connector_type='FILE'
-            )
-        elif op_type in ('s3_reader',) or 's3' in op_type:
-            bucket = self._get_field_from_operation_or_api(op, 'bucket')
-            prefix = self._get_field_from_operation_or_api(op, 'prefix') or self._get_field_from_operation_or_api(op, 'path')
-            if bucket and prefix:
-                node_id = f"{self._get_connection(op)}:{bucket}/{prefix}"
-            elif bucket:
-                node_id = f"{self._get_connection(op)}:{bucket}"
-            else:
-                node_id = f"{self._get_connection(op)}:{op_type}"
-            source = StorageNode(
-                id=node_id,
-                connector_type='S3'
-            )
-        else:
-            self.logger.warning(f"UNHANDLED SOURCE OPERATION: {op_type}")
-            source = StorageNode(
-                id=f"{self._get_connection(op)}:{op_type}",
-                connector_type='OTHER'
-            )
-
-        return source
+        fields, connection = self._resolve_operation(op)
+        handler = SOURCE_OPERATORS.handlers[op_type]
+        if handler is None:
+            return self._unhandled(SOURCE_OPERATORS, op_type, connection)
+        return handler(self, op_type, op, fields, connection)
 
     def process_destination_nodes(self):
-        destinations = []
         op = self.job['operations'][-1]
         op_type = op.get('_op', '')
+        fields, connection = self._resolve_operation(op)
+        handler = DESTINATION_OPERATORS.handlers[op_type]
+        if handler is None:
+            return [self._unhandled(DESTINATION_OPERATORS, op_type, connection)]
+        return handler(self, op_type, op, fields, connection)
+
+
+# Handlers are called as `handler(job_info, op_type, op, fields, connection)`,
+# see `OperatorRegistry`.  Source handlers return the job's source
+# StorageNode (or None), destination handlers a list of StorageNodes.
+SOURCE_OPERATORS = OperatorRegistry('source')
+DESTINATION_OPERATORS = OperatorRegistry('destination')
+
+
+def _file_node(job_info, op_type, fields, connection):
+    path = fields.get('path')
+    node_id = f"{connection}:{path}" if path else f"{connection}:{op_type}"
+    return job_info.node(
+        id=node_id,
+        connector_type='FILE'
+    )
+
+
+def _s3_node(job_info, op_type, fields, connection):
+    bucket = fields.get('bucket')
+    prefix = fields.get('prefix') or fields.get('path')
+    if bucket and prefix:
+        node_id = f"{connection}:{bucket}/{prefix}"
+    elif bucket:
+        node_id = f"{connection}:{bucket}"
+    else:
+        node_id = f"{connection}:{op_type}"
+    return job_info.node(
+        id=node_id,
+        connector_type='S3'
+    )
+
+
+@SOURCE_OPERATORS.register('kafka_reader')
+def _kafka_reader(job_info, op_type, op, fields, connection):
+    topic = fields.get('topic')
+    if not topic:
+        job_info.warn(op_type, f"kafka_reader missing topic: {op}")
+        return None
+    return job_info.node(
+        # if connection is not specified, Teraslice assumes 'default'
+        id=f"{connection}:{topic}",
+        connector_type='KAFKA'
+    )
+
+
+@SOURCE_OPERATORS.register('data_generator')
+def _data_generator(job_info, op_type, op, fields, connection):
+    return job_info.node(
+        id="data_generator",
+        connector_type='DATA_GENERATOR'
+    )
+
+
+@SOURCE_OPERATORS.register('file_reader', 'file_assets', pattern='file')
+def _file_reader(job_info, op_type, op, fields, connection):
+    return _file_node(job_info, op_type, fields, connection)
+
+
+@SOURCE_OPERATORS.register('s3_reader', pattern='s3')
+def _s3_reader(job_info, op_type, op, fields, connection):
+    return _s3_node(job_info, op_type, fields, connection)
+
+
+@DESTINATION_OPERATORS.register('kafka_sender')
+def _kafka_sender(job_info, op_type, op, fields, connection):
+    topic = fields.get('topic')
+    if not topic:
+        job_info.warn(op_type, f"kafka_sender missing topic: {op}")
+        return []
+    return [
+        job_info.node(
+            # kafka_cluster1:topic1
+            id=f"{connection}:{topic}",
+            connector_type='KAFKA'
+        )
+    ]
+
+
+@DESTINATION_OPERATORS.register('elasticsearch_bulk')
+def _elasticsearch_bulk(job_info, op_type, op, fields, connection):
+    index = fields.get('index')
+    if not index:
+        job_info.warn(op_type, f"elasticsearch_bulk missing index: {op}")
+        return []
+    return [
+        job_info.node(
+            # es_cluster1:index1
+            id=f"{connection}:{index}",
+            connector_type='ES'
+        )
+    ]
 
-        if op_type == 'kafka_sender':
-            topic = self._get_field_from_operation_or_api(op, 'topic')
 
-            if topic:
-                destinations.append(
-                    StorageNode(
-                        # kafka_cluster1:topic1
-                        id=f"{self._get_connection(op)}:{topic}",
-                        connector_type='KAFKA'
-                    )
-                )
-            else:
-                self.logger.warning(f"kafka_sender missing topic: {op}")
-        elif op_type == 'elasticsearch_bulk':
-            index = self._get_field_from_operation_or_api(op, 'index')
-
-            if index:
-                destinations.append(
-                    StorageNode(
-                        # es_cluster1:index1
-                        id=f"{self._get_connection(op)}:{index}",
-                        connector_type='ES'
-                    )
-                )
-            else:
-                self.logger.warning(f"elasticsearch_bulk missing index: {op}")
-        elif op_type == 'routed_sender':
-            destination_type = None
-
-            # find the API used by the routed sender (referenced via _api_name
-            # in Teraslice v3)
-            routed_sender_api = self._get_api_for_operation(op)
-
-            if routed_sender_api is None:
-                self.logger.warning(f"routed_sender missing api: {op}")
-                return destinations
-
-            if 'index' in routed_sender_api:
-                destination_type = 'ES'
-            elif 'topic' in routed_sender_api:
-                destination_type = 'KAFKA'
-
-            # suffix is the last part of the destination topic or index
-            # prefix is the beginning part of the destination kafka topic or
-            # elasticsearch index, it comes from the matching api's index or
-            # topic value. For routed_sender the connection is supplied by the
-            # routing map values rather than the api's _connection.
-            for suffix, connection in op.get('routing', {}).items():
-                if destination_type == 'ES':
-                    destinations.append(
-                        StorageNode(
-                            # es_cluster1:index1-**
-                            id=f"{connection}:{routed_sender_api['index']}-{suffix}",
-                            connector_type=destination_type
-                        )
-                    )
-                elif destination_type == 'KAFKA':
-                    destinations.append(
-                        StorageNode(
-                            # kafka_cluster1:topic1-**
-                            id=f"{connection}:{routed_sender_api['topic']}-{suffix}",
-                            connector_type=destination_type
-                        )
-                    )
-                else:
-                    self.logger.warning('UNKNOWN!!!!')
-        elif op_type in ('file_exporter', 'file_sender', 'file_writer') or 'file' in op_type:
-            path = self._get_field_from_operation_or_api(op, 'path')
-            node_id = f"{self._get_connection(op)}:{path}" if path else f"{self._get_connection(op)}:{op_type}"
-            destinations.append(
-                StorageNode(
-                    id=node_id,
-                    connector_type='FILE'
-                )
-            )
-        elif op_type in ('s3_exporter', 's3_sender') or 's3' in op_type:
-            bucket = self._get_field_from_operation_or_api(op, 'bucket')
-            prefix = self._get_field_from_operation_or_api(op, 'prefix') or self._get_field_from_operation_or_api(op, 'path')
-            if bucket and prefix:
-                node_id = f"{self._get_connection(op)}:{bucket}/{prefix}"
-            elif bucket:
-                node_id = f"{self._get_connection(op)}:{bucket}"
-            else:
-                node_id = f"{self._get_connection(op)}:{op_type}"
-            destinations.append(
-                StorageNode(
-                    id=node_id,
-                    connector_type='S3'
-                )
-            )
-        elif op_type == 'noop':
-            destinations.append(
-                StorageNode(
-                    id="noop",
-                    connector_type='NOOP'
-                )
-            )
-        elif op_type == 'stdout':
+@DESTINATION_OPERATORS.register('routed_sender')
+def _routed_sender(job_info, op_type, op, fields, connection):
+    destinations = []
+    destination_type = None
+
+    # find the API used by the routed sender (referenced via _api_name
+    # in Teraslice v3)
+    routed_sender_api = job_info._get_api_for_operation(op)
+
+    if routed_sender_api is None:
+        job_info.warn(op_type, f"routed_sender missing api: {op}")
+        return destinations
+
+    if 'index' in routed_sender_api:
+        destination_type = 'ES'
+    elif 'topic' in routed_sender_api:
+        destination_type = 'KAFKA'
+
+    # suffix is the last part of the destination topic or index
+    # prefix is the beginning part of the destination kafka topic or
+    # elasticsearch index, it comes from the matching api's index or
+    # topic value. For routed_sender the connection is supplied by the
+    # routing map values rather than the api's _connection.
+    for suffix, connection in op.get('routing', {}).items():
+        if destination_type == 'ES':
             destinations.append(
-                StorageNode(
-                    id="stdout",
-                    connector_type='STDOUT'
+                job_info.node(
+                    # es_cluster1:index1-**
+                    id=f"{connection}:{routed_sender_api['index']}-{suffix}",
+                    connector_type=destination_type
                 )
             )
-        elif op_type == 'count_by_field':
+        elif destination_type == 'KAFKA':
             destinations.append(
-                StorageNode(
-                    id=f"{self._get_connection(op)}:count_by_field",
-                    connector_type='OTHER'
+                job_info.node(
+                    # kafka_cluster1:topic1-**
+                    id=f"{connection}:{routed_sender_api['topic']}-{suffix}",
+                    connector_type=destination_type
                 )
             )
         else:
-            self.logger.warning(f"UNHANDLED DESTINATION OPERATION: {op_type}")
-            destinations.append(
-                StorageNode(
-                    id=f"{self._get_connection(op)}:{op_type}",
-                    connector_type='OTHER'
-                )
-            )
+            job_info.warn(op_type, 'UNKNOWN!!!!')
+    return destinations
+
+
+@DESTINATION_OPERATORS.register('file_exporter', 'file_sender', 'file_writer', pattern='file')
+def _file_sender(job_info, op_type, op, fields, connection):
+    return [_file_node(job_info, op_type, fields, connection)]
 
-        return destinations
 
+@DESTINATION_OPERATORS.register('s3_exporter', 's3_sender', pattern='s3')
+def _s3_sender(job_info, op_type, op, fields, connection):
+    return [_s3_node(job_info, op_type, fields, connection)]
+
+
+@DESTINATION_OPERATORS.register('noop')
+def _noop(job_info, op_type, op, fields, connection):
+    return [
+        job_info.node(
+            id="noop",
+            connector_type='NOOP'
+        )
+    ]
+
+
+@DESTINATION_OPERATORS.register('stdout')
+def _stdout(job_info, op_type, op, fields, connection):
+    return [
+        job_info.node(
+            id="stdout",
+            connector_type='STDOUT'
+        )
+    ]
+
+
+@DESTINATION_OPERATORS.register('count_by_field')
+def _count_by_field(job_info, op_type, op, fields, connection):
+    return [
+        job_info.node(
+            id=f"{connection}:count_by_field",
+            connector_type='OTHER'
+        )
+    ]
@@ -1,184 +1,437 @@
+import asyncio
+import itertools
 import logging
 import os
-import pprint
-import ssl
+import re
+import secrets
 import tomllib
 
-import httpx
-
-from fastapi import FastAPI
-from fastapi.responses import JSONResponse
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, Response
 from fastapi.staticfiles import StaticFiles
 
 from pathlib import Path
-from pydantic_settings import BaseSettings, SettingsConfigDict
-
-from .lib.ts import JobInfo
+from typing import Literal
+
+from . import core
+from .core import (
+    DEFAULT_JOBS_PARAMS, PARSE_WARNINGS_SNAPSHOT, PIPELINE_GRAPH_SNAPSHOT, PIPELINE_HEALTH_SNAPSHOT, GraphBuild,
+    _build_pipeline_graph, _fetch_jobs, _fetch_jobs_from_api, _jobs_cache_key, _publish_reports, _refresh_snapshots,
+    _run_cpu_bound, _serialize_graph, settings,
+)
+from .lib.backends import create_backend
 from .lib.cache import CacheManager
+from .lib import columnar, health, lineage, parse_warnings, pipelines, profiling, schema, search, subgraph
+from .lib.loopmon import LoopMonitor
+from .lib.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, REGISTRY, RequestMetricsMiddleware
+from .lib.tracing import ServerTimingMiddleware, TraceBuffer, describe, span
 
-# Get settings from Environment with Pydantic BaseSettings
-class Settings(BaseSettings):
-    teraslice_url: str = "http://localhost:5678"
-    grafana_url: str | None = None
-    cacert_file: Path | None = None
-    cache_ttl: int = 300    # Default TTL for cache entries in seconds
-    refresh_interval: int = 90  # Default interval for refreshing cache entriesin seconds
-
-settings = Settings()
-
-# Setup logging
-log_level = os.getenv("LOG_LEVEL", "INFO").upper()
-logging.basicConfig(level=log_level)
 logger = logging.getLogger(__name__)
 
-if settings.cacert_file:
-    logger.info(f"Using custom CA certificate: {settings.cacert_file}")
-
-app = FastAPI()
-
 # Initialize cache manager
-cache = CacheManager(default_ttl=settings.cache_ttl)
-
-
-async def _fetch_jobs_from_api(size: None | int = 500, active: None | str = 'true', ex: None | str = '_status'):
-    """Fetch jobs from Teraslice API (internal function).
-
-    Args:
-        size (int): Number of jobs to fetch. Defaults to 500.
-        active (str): Filter for active jobs. Defaults to 'true'.
-        ex (str): Field to request from corresponding Execution. Defaults to '_status'.
-
-    Returns:
-        dict: The response from the Teraslice API.
-    """
-    url = settings.teraslice_url
-
-    params = {'size': size, 'active': active, 'ex': ex}
-
-    # Configure SSL verification - use custom CA cert if provided
-    if settings.cacert_file:
-        ssl_context = ssl.create_default_context(cafile=str(settings.cacert_file))
-        verify_ssl = ssl_context
-    else:
-        verify_ssl = True
-
-    try:
-        r = httpx.get(f'{url}/jobs', params=params, verify=verify_ssl)
-        r.raise_for_status()  # Raise exception for HTTP errors
-    except httpx.HTTPError as e:
-        logger.error(f"HTTP error occurred when connecting to {url}: {e}")
-        raise
-
-    return r.json()
+cache = CacheManager(
+    default_ttl=settings.cache_ttl,
+    backend=create_backend(settings.cache_backend_url),
+    lock_ttl=settings.cache_lock_ttl,
+)
+
+trace_buffer = TraceBuffer(settings.trace_buffer_size)
+
+loop_monitor = LoopMonitor(
+    interval=settings.loop_monitor_interval,
+    block_threshold=settings.loop_block_threshold,
+    debug=settings.loop_monitor_debug,
+)
+
+
+async def _snapshot_leader_loop():
+    """Wait to become the snapshot leader for this host, then keep the
+    snapshots refreshed.  Followers retry every refresh interval so one of
+    them takes over if the leader exits."""
+    while not core.snapshot_leader.try_acquire():
+        await asyncio.sleep(settings.refresh_interval)
+
+    logger.info(f"Worker {os.getpid()} is the snapshot leader for {settings.snapshot_dir}")
+    while True:
+        try:
+            await _refresh_snapshots()
+        except Exception as e:
+            logger.error(f"Snapshot refresh failed: {e}")
+        await asyncio.sleep(settings.refresh_interval)
 
-@app.get("/api/jobs", response_class=JSONResponse)
-async def get_jobs(size: None | int = 500, active: None | str = 'true', ex: None | str = '_status'):
-    """Fetch jobs from Teraslice API, using cache when possible.
 
-    Args:
-        size (int): Number of jobs to fetch. Defaults to 500.
-        active (str): Filter for active jobs. Defaults to 'true'.
-        ex (str): Field to request from corresponding Execution. Defaults to '_status'.
+def _read_snapshot(name: str, request: Request) -> Response | None:
+    """Serve a published snapshot's bytes as-is, if there is a recent one.
 
-    Returns:
-        JSONResponse: The response from the Teraslice API.
+    The gzip variant is served to clients that accept it, as long as it was
+    published alongside the same version of the plain snapshot.  Readers
+    serve whatever the refresher last wrote, however old, since they have
+    nowhere else to get data from.
     """
+    if core.snapshots is None:
+        return None
+    with span('snapshot'):
+        snapshot = core.snapshots.read(name)
+    if snapshot is None:
+        return None
+    if settings.snapshot_mode != 'reader' and snapshot.age() > settings.cache_ttl:
+        return None
+
+    headers = {'X-Snapshot-Version': str(snapshot.version)}
+    if 'gzip' in request.headers.get('accept-encoding', ''):
+        compressed = core.snapshots.read(f"{name}.gz")
+        if compressed is not None and compressed.version == snapshot.version:
+            headers['Content-Encoding'] = 'gzip'
+            headers['Vary'] = 'Accept-Encoding'
+            return Response(content=compressed.payload, media_type='application/json', headers=headers)
+
+    return Response(content=snapshot.payload, media_type='application/json', headers=headers)
+
+
+def _snapshot_unavailable(name: str) -> HTTPException:
+    return HTTPException(status_code=503, detail=f"No '{name}' snapshot has been published yet")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    loop_monitor.start()
+    if core.memory_diagnostics is not None:
+        core.memory_diagnostics.start()
+    leader_task = None
+    if core.snapshots is not None and settings.snapshot_mode == 'shared':
+        leader_task = asyncio.create_task(_snapshot_leader_loop())
+    yield
+    if leader_task is not None:
+        leader_task.cancel()
+        core.snapshot_leader.release()
+    if core.memory_diagnostics is not None:
+        core.memory_diagnostics.stop()
+    if cache.backend is not None:
+        await cache.backend.close()
+    loop_monitor.stop()
+
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(ServerTimingMiddleware, buffer=trace_buffer)
+app.add_middleware(RequestMetricsMiddleware)
+
+
+@app.exception_handler(schema.JobSchemaError)
+async def job_schema_error_handler(request: Request, exc: schema.JobSchemaError):
+    """Teraslice sent jobs we can't make sense of, that's a bad gateway."""
+    logger.error(str(exc))
+    return JSONResponse(status_code=502, content={'detail': str(exc)})
+
+
+async def _get_jobs_data(size: None | int = 500, active: None | str = 'true', ex: None | str = '_status'):
+    """Return decoded jobs data from the cache, fetching it if necessary."""
     # Create cache key based on parameters
-    cache_key = f"jobs_{size}_{active}_{ex}"
+    cache_key = _jobs_cache_key(size, active, ex)
     
     # Try to get from cache first
     cached_data = cache.get(cache_key)
     if cached_data is not None:
-        logger.debug(f"Serving jobs from cache for key: {cache_key}")
+        describe('jobs_cache', 'hit')
+        logger.debug("Serving jobs from cache for key: %s", cache_key)
         return cached_data
+    describe('jobs_cache', 'miss')
     
     # If not in cache, fetch fresh data
-    logger.debug(f"Fetching fresh jobs data for key: {cache_key}")
+    logger.debug("Fetching fresh jobs data for key: %s", cache_key)
     try:
-        data = await _fetch_jobs_from_api(size, active, ex)
-        cache.set(cache_key, data)
+        data = await cache.load(cache_key, lambda: _fetch_jobs(size, active, ex))
         
         # Schedule background refresh
         cache.schedule_refresh(
             cache_key, 
-            lambda: _fetch_jobs_from_api(size, active, ex), 
+            lambda: _fetch_jobs(size, active, ex), 
             settings.refresh_interval
         )
         
-        logger.debug(f"Jobs data fetched and cached for key: {cache_key}")
+        logger.debug("Jobs data fetched and cached for key: %s", cache_key)
         return data
     except Exception as e:
         logger.error(f"Failed to fetch jobs data: {e}")
         raise e
 
-def _process_jobs_to_graph(jobs_data):
-    """Process jobs data into graph format (nodes and links).
-    
+@app.get("/api/jobs", response_class=JSONResponse)
+async def get_jobs(request: Request, size: None | int = 500, active: None | str = 'true', ex: None | str = '_status'):
+    """Fetch jobs from Teraslice API, using cache when possible.
+
     Args:
-        jobs_data: Raw jobs data from Teraslice API
-        
+        size (int): Number of jobs to fetch. Defaults to 500.
+        active (str): Filter for active jobs. Defaults to 'true'.
+        ex (str): Field to request from corresponding Execution. Defaults to '_status'.
+
     Returns:
-        dict: Graph data with nodes and links
+        JSONResponse: The response from the Teraslice API.
     """
-    nodes = []
-    links = []    # {'source': '', 'target': ''}
-    
-    for job in jobs_data:
-        try:
-            base_teraslice = settings.teraslice_url.rstrip('/')
-            teraslice_url = f"{base_teraslice}/jobs/{job['job_id']}"
-            logger.debug(f"{job['name']} - {job['ex']['_status']} - {teraslice_url}")
-
-            job_info = JobInfo(job, logger)
-
-            nodes.append(job_info.source)
-
-            for destination in job_info.destinations:
-                nodes.append(destination)
-                link_dict = {
-                    'source': job_info.source.id,
-                    'target': destination.id,
-                    'job_id': job['job_id'],
-                    'name': job['name'],
-                    'url': teraslice_url,
-                    'workers': job['workers'],
-                    'status': job['ex']['_status']
-                }
-                if settings.grafana_url:
-                    base_grafana = settings.grafana_url.rstrip('/')
-                    link_dict['grafana_url'] = f"{base_grafana}/d/_ZjPQViiz/teraslice-job-detail?orgId=1&from=now-6h&to=now&var-job={job['job_id']}"
-                links.append(link_dict)
-        except Exception as e:
-            logger.error(f"Error processing job: {e}\nJob: {pprint.pformat(job)}")
-            raise e
+    cache_key = _jobs_cache_key(size, active, ex)
+    snapshot_response = _read_snapshot(cache_key, request)
+    if snapshot_response is not None:
+        return snapshot_response
+    if settings.snapshot_mode == 'reader':
+        raise _snapshot_unavailable(cache_key)
+
+    return await _get_jobs_data(size, active, ex)
+
+# The cache hands back the same jobs list until a refresh replaces it, so the
+# graph built from it is kept alongside and only rebuilt once per refresh.
+# `version` changes whenever the graph does, for the indexes derived from it.
+# Builds are numbered as they start, `generation` being the number of the
+# one remembered.
+_graph_memo = {'jobs_data': None, 'graph': None, 'graph_json': None, 'version': 0, 'generation': 0}
+_graph_generations = itertools.count(1)
+# id(jobs_data) -> graph build in progress for those jobs, which every
+# request wanting their graph waits on rather than building its own
+_graph_builds = {}
+
+
+def _remember_graph(jobs_data, build: GraphBuild, generation: int) -> bool:
+    """Make `build` of `jobs_data` the current graph and publish its reports,
+    unless a build started after it (so of newer jobs) already was.  Returns
+    whether it was remembered."""
+    if generation < _graph_memo['generation']:
+        logger.debug("Dropped graph build %d, build %d is newer", generation, _graph_memo['generation'])
+        return False
+    _graph_memo.update(jobs_data=jobs_data, graph=build.graph, graph_json=build.graph_json,
+                       version=_graph_memo['version'] + 1, generation=generation)
+    _publish_reports(build)
+    return True
+
+
+async def _get_pipeline_graph_json(jobs_data) -> bytes:
+    if _graph_memo['jobs_data'] is jobs_data:
+        describe('graph', 'memoized')
+        return _graph_memo['graph_json']
+
+    key = id(jobs_data)
+    task = _graph_builds.get(key)
+    if task is None:
+        task = _graph_builds[key] = asyncio.ensure_future(_build_and_remember_graph(jobs_data))
+
+        def forget(done):
+            if _graph_builds.get(key) is done:
+                del _graph_builds[key]
+
+        task.add_done_callback(forget)
+    else:
+        describe('graph', 'shared')
+    # One waiter giving up doesn't cancel the build for the others
+    return await asyncio.shield(task)
+
+async def _build_and_remember_graph(jobs_data) -> bytes:
+    generation = next(_graph_generations)
+    # Build and encode the graph on the CPU executor, hundreds of jobs take
+    # long enough to hold up other requests
+    build = await _run_cpu_bound(_build_pipeline_graph, jobs_data)
+    if _remember_graph(jobs_data, build, generation) and core.memory_diagnostics is not None:
+        core.memory_diagnostics.refresh_completed()
+    return build.graph_json
+
+
+# Snapshot version -> graph decoded from it, for workers serving snapshots
+_snapshot_graph = {'version': None, 'graph': None}
 
-    return {
-        'nodes': list(set(nodes)),
-        'links': links
-    }
+
+async def _current_graph():
+    """The current pipeline graph, and a version that changes with it.
+
+    Comes from the published snapshot when there is a recent one (so
+    workers agree with the graph they serve), otherwise from the graph memo.
+    """
+    if core.snapshots is not None:
+        snapshot = core.snapshots.read(PIPELINE_GRAPH_SNAPSHOT)
+        if snapshot is not None and (settings.snapshot_mode == 'reader' or snapshot.age() <= settings.cache_ttl):
+            if _snapshot_graph['version'] != snapshot.version:
+                graph = await _run_cpu_bound(schema.decode_graph, snapshot.payload)
+                _snapshot_graph.update(version=snapshot.version, graph=graph)
+            return ('snapshot', snapshot.version), _snapshot_graph['graph']
+        if settings.snapshot_mode == 'reader':
+            raise _snapshot_unavailable(PIPELINE_GRAPH_SNAPSHOT)
+
+    jobs_data = await _get_jobs_data(**DEFAULT_JOBS_PARAMS)
+    await _get_pipeline_graph_json(jobs_data)
+    return ('memo', _graph_memo['version']), _graph_memo['graph']
+
+
+# name -> (graph version, index) for indexes derived from the graph
+_graph_indexes = {}
+# (name, graph version) -> index build in progress, which every request
+# wanting that index waits on rather than building its own
+_index_builds = {}
+
+
+async def _graph_index(name: str, build):
+    """Return `build(graph)` for the current graph, building it at most once
+    per graph version."""
+    version, graph = await _current_graph()
+    cached = _graph_indexes.get(name)
+    if cached is not None and cached[0] == version:
+        describe(name, 'memoized')
+        return cached[1]
+
+    key = (name, version)
+    task = _index_builds.get(key)
+    if task is None:
+        task = _index_builds[key] = asyncio.ensure_future(_build_graph_index(name, version, build, graph))
+        task.add_done_callback(lambda done: _index_builds.pop(key, None))
+    else:
+        describe(name, 'shared')
+    # One waiter giving up doesn't cancel the build for the others
+    return await asyncio.shield(task)
+
+async def _build_graph_index(name: str, version, build, graph):
+    with span(name):
+        index = await _run_cpu_bound(build, graph)
+    _graph_indexes[name] = (version, index)
+    return index
+
+async def _query_index(memoized: bool, query, *args):
+    """Return `query(*args)`, a query on a graph index.  Its result is
+    computed on the CPU executor unless `memoized`, a query over a large
+    graph can take tens of milliseconds."""
+    if memoized:
+        describe('query', 'memoized')
+        return query(*args)
+    with span('query'):
+        return await _run_cpu_bound(query, *args)
+
+def _require_admin(request: Request) -> None:
+    """Reject the request unless it carries the configured admin token."""
+    token = request.headers.get('x-admin-token', '')
+    if not settings.admin_token or not secrets.compare_digest(token, settings.admin_token):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+
+async def _profile_pipeline_graph(mode: str, target: str, output: str):
+    """Build the pipeline graph once under the profiler, bypassing the graph
+    memo so the build is always measured.
+
+    Args:
+        mode (str): `cprofile` (deterministic) or `sample` (sampling).
+        target (str): `request` profiles the graph build from the jobs data a
+            normal request would use; `refresh` also fetches fresh jobs from
+            Teraslice (profiling the decode) and stores the results, like a
+            scheduled refresh.
+        output (str): `response` returns the report, `file` saves the raw
+            profile under PROFILE_DIR and returns its path with the report.
+
+    Returns:
+        dict: The profile report.
+    """
+    if target not in ('request', 'refresh') or output not in ('response', 'file'):
+        raise HTTPException(status_code=400, detail="X-Profile-Target must be request or refresh, "
+                                                    "X-Profile-Output must be response or file")
+    if output == 'file' and settings.profile_dir is None:
+        raise HTTPException(status_code=400, detail="PROFILE_DIR is not configured")
+    try:
+        session = profiling.ProfileSession(mode)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        with session.activate():
+            if target == 'refresh':
+                jobs_data = await _fetch_jobs_from_api(**DEFAULT_JOBS_PARAMS)
+                cache.set(_jobs_cache_key(**DEFAULT_JOBS_PARAMS), jobs_data)
+            else:
+                jobs_data = await _get_jobs_data(**DEFAULT_JOBS_PARAMS)
+            generation = next(_graph_generations)
+            build = await _run_cpu_bound(_build_pipeline_graph, jobs_data)
+            _remember_graph(jobs_data, build, generation)
+    except profiling.ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    report = session.report()
+    report.update(target=target, jobs=len(jobs_data), graph_bytes=len(build.graph_json))
+    if output == 'file':
+        report['saved_to'] = str(session.save(settings.profile_dir))
+        logger.info(f"Saved {mode} profile of /api/pipeline_graph to {report['saved_to']}")
+    return report
 
 @app.get("/api/pipeline_graph", response_class=JSONResponse)
-async def get_pipeline_graph():
+async def get_pipeline_graph(request: Request,
+                             connector_type: list[str] = Query([]),
+                             status: list[str] = Query([]),
+                             q: str | None = None,
+                             regex: bool = False,
+                             depth: int = Query(0, ge=0)):
     """Fetch the pipeline graph data by processing cached jobs data.
+
+    When PROFILING_ENABLED is set, an admin can send `X-Profile: cprofile` (or
+    `sample`) to get a profile of the graph build instead of the graph, see
+    `_profile_pipeline_graph`.
+
+    Args:
+        connector_type (list): Only match nodes of these types.
+        status (list): Only keep jobs with these statuses.
+        q (str): Only match nodes whose id, or jobs whose name or id,
+            contains this (ignoring case).
+        regex (bool): Treat `q` as an RE2 regular expression, of at most
+            100 characters.
+        depth (int): Include nodes up to this many links away from the
+            matched ones.
+
     Returns:
-        JSONResponse: The pipeline graph data.
+        JSONResponse: The pipeline graph data, or the part of it the filters
+        select (see `SubgraphIndex.subgraph`) when any are given.
     """
+    profile_mode = request.headers.get('x-profile')
+    if profile_mode and settings.profiling_enabled:
+        _require_admin(request)
+        return await _profile_pipeline_graph(
+            profile_mode,
+            request.headers.get('x-profile-target', 'request'),
+            request.headers.get('x-profile-output', 'response'),
+        )
+
+    graph_filter = subgraph.GraphFilter(
+        connector_types=tuple(sorted({value.upper() for value in connector_type})),
+        statuses=tuple(sorted(set(status))),
+        q=q or None,
+        regex=regex,
+        depth=depth,
+    )
+    if graph_filter.connector_types or graph_filter.statuses or graph_filter.q:
+        return await _filtered_pipeline_graph(graph_filter)
+
     # TODO: The size here is hard coded to an arbitrarily large number to try
     # and get all of the jobs, this is dumb but the Teraslice API doesn't tell
     # us how far to page.
+    snapshot_response = _read_snapshot(PIPELINE_GRAPH_SNAPSHOT, request)
+    if snapshot_response is not None:
+        return snapshot_response
+    if settings.snapshot_mode == 'reader':
+        raise _snapshot_unavailable(PIPELINE_GRAPH_SNAPSHOT)
+
     try:
         # Get jobs data (from cache or fresh fetch)
-        jobs_data = await get_jobs(size=500)
+        jobs_data = await _get_jobs_data(**DEFAULT_JOBS_PARAMS)
         
-        # Process jobs into graph format (this is fast)
-        graph_data = _process_jobs_to_graph(jobs_data)
+        graph_json = await _get_pipeline_graph_json(jobs_data)
         
         logger.debug("Pipeline graph data processed from cached jobs")
-        return graph_data
+        return Response(content=graph_json, media_type='application/json')
     except Exception as e:
         logger.error(f"Failed to generate pipeline graph data: {e}")
         raise e
 
+async def _filtered_pipeline_graph(graph_filter):
+    if graph_filter.regex:
+        try:
+            graph_filter.pattern()
+        except re.error as e:
+            raise HTTPException(status_code=400, detail=f"Invalid regular expression: {e}")
+
+    index = await _graph_index('subgraph', subgraph.SubgraphIndex)
+    graph_json = index.memoized(graph_filter)
+    if graph_json is None:
+        with span('filter'):
+            graph_json = await _run_cpu_bound(index.subgraph_json, graph_filter)
+    return Response(content=graph_json, media_type='application/json')
+
 def _read_app_version() -> str:
     """Determine the application version.
 
@@ -209,10 +462,204 @@ async def get_version():
     return {"version": APP_VERSION}
 
 
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Expose internal metrics in the Prometheus text format."""
+    return Response(content=REGISTRY.render(), media_type=METRICS_CONTENT_TYPE)
+
+
+@app.get("/api/pipeline_health", response_class=JSONResponse)
+async def get_pipeline_health(request: Request):
+    """Return pipeline health derived from the current pipeline graph: jobs
+    per status, workers per connector cluster, and Kafka topics that are only
+    written (dead ends) or only read (source-less)."""
+    snapshot_response = _read_snapshot(PIPELINE_HEALTH_SNAPSHOT, request)
+    if snapshot_response is not None:
+        return snapshot_response
+    if settings.snapshot_mode == 'reader':
+        raise _snapshot_unavailable(PIPELINE_HEALTH_SNAPSHOT)
+
+    # Make sure the graph (and so the health report) is built for the
+    # current jobs data
+    jobs_data = await _get_jobs_data(**DEFAULT_JOBS_PARAMS)
+    await _get_pipeline_graph_json(jobs_data)
+    return health.latest
+
+
+@app.get("/api/parse_warnings", response_class=JSONResponse)
+async def get_parse_warnings(request: Request):
+    """Return the warnings raised while parsing the current jobs (e.g.
+    unhandled operations), grouped by operation and message with the IDs of
+    the jobs affected."""
+    snapshot_response = _read_snapshot(PARSE_WARNINGS_SNAPSHOT, request)
+    if snapshot_response is not None:
+        return snapshot_response
+    if settings.snapshot_mode == 'reader':
+        raise _snapshot_unavailable(PARSE_WARNINGS_SNAPSHOT)
+
+    jobs_data = await _get_jobs_data(**DEFAULT_JOBS_PARAMS)
+    await _get_pipeline_graph_json(jobs_data)
+    return parse_warnings.latest
+
+
+@app.get("/api/aggregate", response_class=JSONResponse)
+async def get_aggregate(group_by: str, metric: str = 'jobs', where: list[str] = Query([]),
+                        limit: int = Query(100, ge=1)):
+    """Group the current graph's links and count or sum them, e.g. workers
+    per Kafka cluster or jobs per status per ES cluster.
+
+    Args:
+        group_by (str): Comma separated columns, see `columnar.COLUMNS`.
+        metric (str): `rows` (links), `jobs` (distinct jobs) or `workers`
+            (each job's workers once per group).
+        where (list): `column:value` filters, may be repeated.
+        limit (int): Number of groups returned, largest first.
+
+    Returns:
+        dict: The groups with their values, see `GraphTable.aggregate`.
+    """
+    filters = [tuple(condition.split(':', 1)) for condition in where]
+    if any(len(condition) != 2 for condition in filters):
+        raise HTTPException(status_code=400, detail="where takes column:value")
+
+    table = await _graph_index('aggregate_table', columnar.GraphTable)
+    query = (group_by.split(','), metric, filters, limit)
+    try:
+        return await _query_index(table.is_memoized(*query), table.aggregate, *query)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/api/lineage/{node_id:path}", response_class=JSONResponse)
+async def get_lineage(node_id: str, direction: lineage.Direction = 'down', depth: int | None = Query(None, ge=1)):
+    """Everything downstream of a node (what it feeds) or upstream of it
+    (what feeds it), e.g. the ES indices fed from a Kafka topic.
+
+    Args:
+        node_id (str): A node id, e.g. `kafka_cluster1:topic1`.
+        direction (str): `down` or `up`.
+        depth (int): Maximum number of hops, unlimited by default.
+
+    Returns:
+        dict: The reachable nodes with their distance, and the links
+        followed, see `LineageIndex.closure`.
+    """
+    index = await _graph_index('lineage', lineage.LineageIndex)
+    try:
+        return await _query_index(index.closure_memoized(node_id, direction, depth),
+                                  index.closure, node_id, direction, depth)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown node '{node_id}'")
+
+
+@app.get("/api/path", response_class=JSONResponse)
+async def get_path(source: str = Query(alias='from'), target: str = Query(alias='to')):
+    """The shortest downstream path between two nodes, with the jobs
+    making up each hop."""
+    index = await _graph_index('lineage', lineage.LineageIndex)
+    try:
+        path = await _query_index(index.path_memoized(source, target), index.path, source, target)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=f"Unknown node '{e.args[0]}'")
+    if path is None:
+        raise HTTPException(status_code=404, detail=f"No path from '{source}' to '{target}'")
+    return path
+
+
+@app.get("/api/pipelines", response_class=JSONResponse)
+async def get_pipelines():
+    """Summarize each pipeline (connected component of the graph): its
+    number of nodes and jobs, total workers, jobs per status and any loops
+    through its topics.
+
+    Returns:
+        dict: `pipelines`, in the order their first node appears in the graph.
+    """
+    index = await _graph_index('pipelines', pipelines.PipelineIndex)
+    return {'pipelines': index.summaries}
+
+
+@app.get("/api/pipeline_labels")
+async def get_pipeline_labels():
+    """The pipeline each node and job of the current graph belongs to, to
+    label `/api/pipeline_graph` with.  Pipelines are only worked out for
+    the graph when asked for, not as it's built.
+
+    Returns:
+        Response: JSON with `nodes` (node id -> pipeline id) and `jobs` (job
+        id -> pipeline id, that of each of the job's links).
+    """
+    index = await _graph_index('pipelines', pipelines.PipelineIndex)
+    labels_json = await _query_index(index.labels_memoized(), index.labels_json)
+    return Response(content=labels_json, media_type="application/json")
+
+
+@app.get("/api/pipelines/{pipeline_id:path}")
+async def get_pipeline(pipeline_id: str):
+    """The nodes and links of one pipeline, in the same form as
+    `/api/pipeline_graph`."""
+    index = await _graph_index('pipelines', pipelines.PipelineIndex)
+    try:
+        subgraph = index.subgraph(pipeline_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown pipeline '{pipeline_id}'")
+    # A pipeline can be most of the graph
+    graph_json = await _run_cpu_bound(_serialize_graph, subgraph)
+    return Response(content=graph_json, media_type="application/json")
+
+
+@app.get("/api/search", response_class=JSONResponse)
+async def get_search(q: str = Query(min_length=1), limit: int = Query(20, ge=1, le=1000)):
+    """Autocomplete over node ids, topic/index names, job names and job
+    ids: those starting with `q` first, then those containing it.
+
+    Returns:
+        dict: The matching nodes and jobs, see `SearchIndex.search`.
+    """
+    index = await _graph_index('search', search.SearchIndex)
+    return {'q': q, 'results': index.search(q, limit)}
+
+
 @app.get("/api/cache/status", response_class=JSONResponse)
-async def get_cache_status():
+async def get_cache_status(view: Literal['full', 'summary'] = 'full'):
+    """Return cache entries, per-key lookup counters and payload sizes, and
+    recent refresh attempts.  `view=summary` returns only the totals."""
+    if view == 'summary':
+        return cache.get_summary()
     return cache.get_status()
 
+@app.get("/api/debug/event_loop", response_class=JSONResponse)
+async def get_event_loop_status(request: Request):
+    """Return event loop lag statistics and any recently caught blocking
+    callbacks, with their stacks in debug mode.  Admin only."""
+    _require_admin(request)
+    return loop_monitor.get_status()
+
+@app.get("/api/debug/memory", response_class=JSONResponse)
+async def get_memory_status(request: Request):
+    """Return RSS samples, tracemalloc growth between refresh cycles, and the
+    approximate deep size of each cache entry.  Admin only, and enabled by
+    setting MEMORY_DIAGNOSTICS."""
+    _require_admin(request)
+    if core.memory_diagnostics is None:
+        raise HTTPException(status_code=404, detail="Memory diagnostics are disabled, set MEMORY_DIAGNOSTICS=true")
+    objects = {f"cache:{key}": entry.data for key, entry in list(cache.cache.items())}
+    objects['graph_memo'] = _graph_memo['graph_json']
+    status = await _run_cpu_bound(core.memory_diagnostics.get_status, objects)
+    status['refresh_tasks'] = len(cache._refresh_tasks)
+    return status
+
+@app.get("/api/debug/traces", response_class=JSONResponse)
+async def get_traces(request: Request, endpoint: str | None = None):
+    """Return the slowest recorded requests and their phase timings, for one
+    route template (e.g. `/api/pipeline_graph`) or all of them.  Admin only,
+    and enabled by setting TRACE_BUFFER_SIZE."""
+    _require_admin(request)
+    return {
+        'buffer_size': trace_buffer.size,
+        'traces': trace_buffer.slowest(endpoint),
+    }
+
 @app.post("/api/cache/clear", response_class=JSONResponse)
 async def clear_cache():
     """Clear all cached data and return status."""
@@ -0,0 +1,71 @@
+"""Standalone snapshot refresher.
+
+Runs the jobs fetch and pipeline graph build on a schedule and publishes the
+results as versioned snapshot files in `SNAPSHOT_DIR`, so that API replicas
+started with `SNAPSHOT_MODE=reader` can serve them without contacting
+Teraslice themselves.  Only one refresher holds the directory's leader lock at
+a time; extra instances wait as hot standbys.
+
+    SNAPSHOT_DIR=/shared/teraslice-3d TERASLICE_URL="http://teraslice.example.com" python -m app.refresher
+"""
+import argparse
+import asyncio
+import logging
+import sys
+
+from . import core
+
+logger = logging.getLogger(__name__)
+
+
+async def run(interval: float, once: bool = False) -> None:
+    """Publish snapshots every `interval` seconds (or a single time with
+    `once`) while holding the snapshot directory's leader lock."""
+    while not core.snapshot_leader.try_acquire():
+        logger.info(f"Another refresher holds {core.snapshot_leader.path}, waiting")
+        await asyncio.sleep(interval)
+
+    try:
+        while True:
+            try:
+                version = await core._refresh_snapshots()
+                logger.info(f"Published snapshot version {version} to {core.settings.snapshot_dir}")
+            except Exception as e:
+                if once:
+                    raise
+                logger.error(f"Snapshot refresh failed: {e}")
+
+            if once:
+                return
+            await asyncio.sleep(interval)
+    finally:
+        core.snapshot_leader.release()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog='python -m app.refresher',
+        description='Publish Teraslice job and pipeline graph snapshots for API replicas.'
+    )
+    parser.add_argument(
+        '--interval', type=float, default=core.settings.refresh_interval,
+        help='Seconds between refreshes (defaults to REFRESH_INTERVAL)'
+    )
+    parser.add_argument(
+        '--once', action='store_true',
+        help='Publish a single snapshot and exit'
+    )
+    args = parser.parse_args(argv)
+
+    if core.snapshots is None:
+        parser.error('SNAPSHOT_DIR must be set')
+
+    try:
+        asyncio.run(run(args.interval, args.once))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,2 @@
+"""Benchmarks for the jobs -> graph pipeline, run with `python -m benchmarks`
+from the backend directory."""
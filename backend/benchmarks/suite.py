@@ -0,0 +1,187 @@
+"""Time and peak memory of the jobs -> graph pipeline over synthetic job sets.
+
+    python -m benchmarks                      # compare against baseline.json
+    python -m benchmarks --sizes 100000       # a single, larger size
+    python -m benchmarks --save-baseline      # record a new baseline
+
+Each benchmark runs `--repeat` times and reports the fastest run; peak
+memory, and the number of allocations still held by the result, come from one
+extra run under tracemalloc, which is slow enough that it would skew the
+timings.  Exits non-zero if anything regressed past the
+tolerances relative to the baseline.
+"""
+import argparse
+import json
+import logging
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from app.lib.cache import CacheManager
+from app.lib.columnar import GraphTable
+from app.lib.schema import decode_jobs
+from app.lib.ts import JobInfo
+from app.core import _process_jobs_to_graph, _serialize_graph
+from tests.fixtures.synthetic_jobs import generate_jobs
+
+DEFAULT_BASELINE = Path(__file__).parent / 'baseline.json'
+DEFAULT_SIZES = [100, 1000, 10000]
+
+logger = logging.getLogger('benchmarks')
+
+
+def _job_info(jobs):
+    for job in jobs:
+        JobInfo(job, logger)
+
+
+def _with_shared_apis(jobs, count=30):
+    # Jobs built from shared templates often carry many APIs their first and
+    # last operations don't use, which is what makes API lookups add up.
+    # Routed senders are left out, building their nodes would swamp the
+    # lookups being measured.
+    padding = [{'_name': f"shared_api_{i}", '_connection': 'default', 'size': 1000} for i in range(count)]
+    return [{**job, 'apis': [*padding, *job['apis']]} for job in jobs
+            if job['operations'][-1]['_op'] != 'routed_sender']
+
+
+def _cache_round_trips(jobs):
+    # One refresh's worth of writes followed by a read per job, roughly what
+    # a burst of requests does against a warm cache
+    cache = CacheManager(default_ttl=300)
+    for i in range(100):
+        cache.set(f"jobs_{i}", jobs)
+    for i in range(len(jobs)):
+        cache.get(f"jobs_{i % 100}")
+
+
+def _aggregate(graph):
+    # Building the table plus a few cold dashboard queries on it
+    table = GraphTable(graph)
+    table.aggregate(['source_connection'], 'workers')
+    table.aggregate(['status', 'target_connection'], 'jobs', where=[('target_type', 'ES')])
+    table.aggregate(['source'], 'workers', limit=20)
+
+
+# name -> (setup(jobs) returning the benchmark's argument, benchmark(arg))
+BENCHMARKS: Dict[str, tuple] = {
+    'decode': (lambda jobs: json.dumps(jobs).encode(), decode_jobs),
+    'job_info': (lambda jobs: jobs, _job_info),
+    'job_info_apis': (_with_shared_apis, _job_info),
+    'process_graph': (lambda jobs: jobs, _process_jobs_to_graph),
+    'serialize': (_process_jobs_to_graph, _serialize_graph),
+    'cache': (lambda jobs: jobs, _cache_round_trips),
+    'aggregate': (_process_jobs_to_graph, _aggregate),
+}
+
+
+def measure(func: Callable, arg, repeat: int) -> Dict[str, float]:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(arg)
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        result = func(arg)
+        _, peak = tracemalloc.get_traced_memory()
+        # Allocations still alive, i.e. held by the result
+        retained_blocks = sum(stat.count for stat in tracemalloc.take_snapshot().statistics('filename'))
+    finally:
+        tracemalloc.stop()
+    del result
+
+    return {
+        'seconds': min(timings),
+        'median_seconds': statistics.median(timings),
+        'peak_bytes': peak,
+        'retained_blocks': retained_blocks,
+    }
+
+
+def run(sizes: List[int], names: List[str], repeat: int = 5, seed: int = 0) -> Dict[str, Dict[str, float]]:
+    """Run the named benchmarks at each size, keyed `<name>/<size>`."""
+    results = {}
+    for size in sizes:
+        jobs = generate_jobs(size, seed=seed)
+        for name in names:
+            setup, func = BENCHMARKS[name]
+            results[f"{name}/{size}"] = measure(func, setup(jobs), repeat)
+    return results
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]],
+            time_tolerance: float = 0.25, memory_tolerance: float = 0.10) -> List[str]:
+    """Return a description of each result that's worse than its baseline
+    by more than the tolerance (a fraction, 0.25 = 25% slower)."""
+    regressions = []
+    for key, result in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        if result['seconds'] > base['seconds'] * (1 + time_tolerance):
+            regressions.append(f"{key}: {result['seconds']:.4f}s vs {base['seconds']:.4f}s baseline")
+        if result['peak_bytes'] > base['peak_bytes'] * (1 + memory_tolerance):
+            regressions.append(f"{key}: peak {result['peak_bytes']} bytes vs {base['peak_bytes']} baseline")
+    return regressions
+
+
+def _format_row(key: str, result: Dict[str, float], base: Dict[str, float] | None) -> str:
+    row = (f"{key:<24} {result['seconds'] * 1000:>10.2f} ms {result['peak_bytes'] / 1e6:>10.2f} MB"
+           f" {result['retained_blocks']:>10} blocks")
+    if base is not None:
+        row += (f"   {result['seconds'] / base['seconds']:>5.2f}x time"
+                f" {result['peak_bytes'] / max(base['peak_bytes'], 1):>5.2f}x memory")
+    return row
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=lambda s: [int(n) for n in s.split(',')], default=DEFAULT_SIZES,
+                        help="Comma separated job counts (default: %(default)s)")
+    parser.add_argument('--only', action='append', choices=sorted(BENCHMARKS),
+                        help="Run only this benchmark, may be repeated")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--baseline', type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true',
+                        help="Write the results to the baseline file instead of comparing")
+    parser.add_argument('--time-tolerance', type=float, default=0.25)
+    parser.add_argument('--memory-tolerance', type=float, default=0.10)
+    args = parser.parse_args(argv)
+
+    logging.getLogger('app.core').setLevel(logging.WARNING)
+    results = run(args.sizes, args.only or list(BENCHMARKS), args.repeat, args.seed)
+
+    baseline: Dict[str, Any] = {}
+    if args.baseline.exists():
+        baseline = json.loads(args.baseline.read_text())
+
+    for key, result in results.items():
+        print(_format_row(key, result, None if args.save_baseline else baseline.get('results', {}).get(key)))
+
+    if args.save_baseline:
+        saved = baseline.get('results', {})
+        saved.update(results)
+        args.baseline.write_text(json.dumps({
+            'python': sys.version.split()[0],
+            'machine': platform.machine(),
+            'seed': args.seed,
+            'results': dict(sorted(saved.items())),
+        }, indent=2) + '\n')
+        print(f"Saved baseline to {args.baseline}")
+        return 0
+
+    if not baseline:
+        print(f"No baseline at {args.baseline}, run with --save-baseline to create one")
+        return 0
+    regressions = compare(results, baseline['results'], args.time_tolerance, args.memory_tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
@@ -0,0 +1,2 @@
+"""End-to-end load testing: a mock Teraslice server (`loadtest.mock_teraslice`)
+and a driver hammering the API (`loadtest.driver`)."""
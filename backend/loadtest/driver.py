@@ -0,0 +1,189 @@
+"""Load driver for the backend API.
+
+    python -m loadtest.driver --url http://localhost:8000 --clients 50 --duration 120
+
+Clears the backend cache, then measures three phases:
+
+* cold: every client's first request, all waiting on the same Teraslice fetch
+  (one per backend worker, the cache shares it between concurrent misses)
+* warm: requests served while the cache is fresh
+* refresh: requests started while a background refresh was in flight, as
+  reported by the backend's `/metrics`
+
+To see the refresh phase, run for longer than the backend's REFRESH_INTERVAL.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import time
+from dataclasses import dataclass
+from typing import Dict, List
+
+import httpx
+
+ENDPOINTS = ['/api/pipeline_graph', '/api/jobs']
+PHASES = ['cold', 'warm', 'refresh']
+REFRESH_GAUGE = 'teraslice3d_cache_refreshes_in_flight'
+
+
+@dataclass
+class Sample:
+    phase: str
+    endpoint: str
+    latency: float
+    ok: bool
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of `values`."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = min(len(ordered), max(1, math.ceil(pct / 100 * len(ordered))))
+    return ordered[rank - 1]
+
+
+def refreshes_in_flight(metrics_text: str) -> float:
+    """Sum the refresh in-flight gauge over all cache key families."""
+    total = 0.0
+    for line in metrics_text.splitlines():
+        if line.startswith(REFRESH_GAUGE):
+            total += float(line.rsplit(' ', 1)[1])
+    return total
+
+
+class LoadDriver:
+    """Drives concurrent clients against the API and collects per-phase
+    latencies.
+
+    Args:
+        client (httpx.AsyncClient): Client with `base_url` set to the backend.
+        clients (int): Number of concurrent simulated clients.
+        duration (float): Seconds to run after the cold phase.
+        endpoints (list): Endpoints each client cycles through.
+        poll_interval (float): Seconds between `/metrics` polls used to spot
+            refreshes in flight.
+        think_time (float): Seconds each client waits between requests.
+    """
+
+    def __init__(self, client: httpx.AsyncClient, clients: int = 20, duration: float = 30.0,
+                 endpoints: List[str] = ENDPOINTS, poll_interval: float = 0.2, think_time: float = 0.0):
+        self.client = client
+        self.clients = clients
+        self.duration = duration
+        self.endpoints = endpoints
+        self.poll_interval = poll_interval
+        self.think_time = think_time
+        self.samples: List[Sample] = []
+        self.phase_seconds = {phase: 0.0 for phase in PHASES}
+        self._refreshing = False
+
+    async def _request(self, phase: str, endpoint: str) -> None:
+        start = time.perf_counter()
+        try:
+            response = await self.client.get(endpoint)
+            ok = response.status_code == 200
+        except httpx.HTTPError:
+            ok = False
+        self.samples.append(Sample(phase, endpoint, time.perf_counter() - start, ok))
+
+    async def _watch_refreshes(self, stop: asyncio.Event) -> None:
+        last = time.perf_counter()
+        while not stop.is_set():
+            try:
+                response = await self.client.get('/metrics')
+                self._refreshing = refreshes_in_flight(response.text) > 0
+            except httpx.HTTPError:
+                pass
+            try:
+                await asyncio.wait_for(stop.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            now = time.perf_counter()
+            self.phase_seconds['refresh' if self._refreshing else 'warm'] += now - last
+            last = now
+
+    async def _client_loop(self, offset: int, deadline: float) -> None:
+        endpoints = itertools.islice(itertools.cycle(self.endpoints), offset, None)
+        while time.perf_counter() < deadline:
+            await self._request('refresh' if self._refreshing else 'warm', next(endpoints))
+            # Also yields to the other clients when responses come back
+            # without blocking (e.g. an in-process transport)
+            await asyncio.sleep(self.think_time)
+
+    async def run(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        await self.client.post('/api/cache/clear')
+
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            self._request('cold', self.endpoints[i % len(self.endpoints)]) for i in range(self.clients)
+        ))
+        self.phase_seconds['cold'] = time.perf_counter() - start
+
+        stop = asyncio.Event()
+        watcher = asyncio.create_task(self._watch_refreshes(stop))
+        deadline = time.perf_counter() + self.duration
+        await asyncio.gather(*(self._client_loop(i, deadline) for i in range(self.clients)))
+        stop.set()
+        await watcher
+        return self.report()
+
+    def report(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """Requests, errors, throughput and p50/p95/p99 latency (ms) per
+        phase and endpoint."""
+        report = {}
+        for phase in PHASES:
+            seconds = self.phase_seconds[phase]
+            for endpoint in self.endpoints:
+                samples = [s for s in self.samples if s.phase == phase and s.endpoint == endpoint]
+                if not samples:
+                    continue
+                latencies = [s.latency * 1000 for s in samples if s.ok]
+                report.setdefault(phase, {})[endpoint] = {
+                    'requests': len(samples),
+                    'errors': sum(1 for s in samples if not s.ok),
+                    'throughput_rps': round(len(samples) / seconds, 2) if seconds else 0.0,
+                    'p50_ms': round(percentile(latencies, 50), 2),
+                    'p95_ms': round(percentile(latencies, 95), 2),
+                    'p99_ms': round(percentile(latencies, 99), 2),
+                }
+        return report
+
+
+def format_report(report) -> str:
+    lines = [f"{'phase':<8} {'endpoint':<22} {'requests':>8} {'errors':>6} {'req/s':>8} "
+             f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"]
+    for phase, endpoints in report.items():
+        for endpoint, stats in endpoints.items():
+            lines.append(f"{phase:<8} {endpoint:<22} {stats['requests']:>8} {stats['errors']:>6} "
+                         f"{stats['throughput_rps']:>8} {stats['p50_ms']:>9} {stats['p95_ms']:>9} "
+                         f"{stats['p99_ms']:>9}")
+    return '\n'.join(lines)
+
+
+async def _run(args):
+    limits = httpx.Limits(max_connections=args.clients + 1)
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as client:
+        return await LoadDriver(client, clients=args.clients, duration=args.duration,
+                                think_time=args.think_time).run()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m loadtest.driver', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://localhost:8000', help="Backend base URL")
+    parser.add_argument('--clients', type=int, default=20)
+    parser.add_argument('--duration', type=float, default=30.0, help="Seconds to run after the cold phase")
+    parser.add_argument('--think-time', type=float, default=0.0, help="Seconds between a client's requests")
+    parser.add_argument('--timeout', type=float, default=60.0, help="Per-request timeout in seconds")
+    parser.add_argument('--json', action='store_true', help="Print the report as JSON")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(_run(args))
+    print(json.dumps(report, indent=2) if args.json else format_report(report))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""Mock Teraslice API serving `/jobs`, for load testing without a real cluster.
+
+    python -m loadtest.mock_teraslice --jobs 2000 --latency 15 --port 5678
+
+then point the backend at it with TERASLICE_URL=http://localhost:5678.
+"""
+import argparse
+import asyncio
+import gzip
+import json
+import random
+from pathlib import Path
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, Response
+
+from tests.fixtures.synthetic_jobs import STATUSES, generate_jobs
+
+
+class MockTeraslice:
+    """State behind the mock `/jobs` endpoint.
+
+    Args:
+        jobs (list): Jobs to serve.
+        latency (float): Seconds to wait before answering each request.
+        jitter (float): Up to this many extra seconds are added to `latency`
+            at random.
+        error_rate (float): Fraction of requests answered with a 500.
+        churn (float): Fraction of jobs changed before each response, half
+            by changing status and half by replacing the job with a new one.
+        seed (int): Seed for the latency, error and churn randomness.
+    """
+
+    def __init__(self, jobs, latency=0.0, jitter=0.0, error_rate=0.0, churn=0.0, seed=0):
+        self.jobs = list(jobs)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.churn = churn
+        self.rng = random.Random(seed)
+        self.requests = 0
+
+    def _apply_churn(self):
+        for _ in range(round(len(self.jobs) * self.churn)):
+            index = self.rng.randrange(len(self.jobs))
+            if self.rng.random() < 0.5:
+                job = dict(self.jobs[index])
+                job['ex'] = {'_status': self.rng.choice(STATUSES)}
+                self.jobs[index] = job
+            else:
+                self.jobs[index] = generate_jobs(1, seed=self.rng.getrandbits(32))[0]
+
+    async def get_jobs(self, size: int = 100):
+        self.requests += 1
+        await asyncio.sleep(self.latency + self.rng.uniform(0, self.jitter))
+        if self.rng.random() < self.error_rate:
+            return JSONResponse({'error': 'mock failure'}, status_code=500)
+        self._apply_churn()
+        return Response(content=json.dumps(self.jobs[:size]), media_type='application/json')
+
+
+def load_jobs(path: Path):
+    """Load a JSON list of jobs, optionally gzipped."""
+    data = path.read_bytes()
+    if path.suffix == '.gz':
+        data = gzip.decompress(data)
+    return json.loads(data)
+
+
+def create_app(mock: MockTeraslice) -> FastAPI:
+    app = FastAPI()
+    app.state.mock = mock
+    app.add_api_route('/jobs', mock.get_jobs, methods=['GET'])
+    return app
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m loadtest.mock_teraslice', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--jobs', type=int, default=1000, help="Number of synthetic jobs to serve")
+    parser.add_argument('--jobs-file', type=Path, help="Serve these jobs (JSON list, may be .gz) instead")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds per /jobs request")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Random extra latency, up to this many seconds")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of requests that fail")
+    parser.add_argument('--churn', type=float, default=0.0, help="Fraction of jobs changed per request")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5678)
+    args = parser.parse_args(argv)
+
+    import uvicorn
+
+    jobs = load_jobs(args.jobs_file) if args.jobs_file else generate_jobs(args.jobs, seed=args.seed)
+    mock = MockTeraslice(jobs, latency=args.latency, jitter=args.jitter,
+                         error_rate=args.error_rate, churn=args.churn, seed=args.seed)
+    uvicorn.run(create_app(mock), host=args.host, port=args.port, log_level='warning')
+
+
+if __name__ == '__main__':
+    main()
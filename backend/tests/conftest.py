@@ -0,0 +1,34 @@
+import json
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from app import core, main
+
+
+@pytest.fixture
+def client():
+    """A test client for the app, with the cache cleared before and after."""
+    main.cache.clear()
+    yield TestClient(main.app)
+    main.cache.clear()
+
+
+@pytest.fixture
+def serve_jobs(monkeypatch):
+    """Have Teraslice answer /jobs with the jobs passed to the function this
+    returns.  It returns the requests Teraslice receives, for counting
+    fetches."""
+    received = []
+
+    def serve(jobs):
+        def handler(request):
+            received.append(request)
+            return httpx.Response(200, content=json.dumps(jobs).encode())
+
+        monkeypatch.setattr(core, '_teraslice_client',
+                            lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+        return received
+
+    return serve
@@ -0,0 +1,106 @@
+"""
+Minimal in-process stand-in for a Redis server.
+
+Speaks just enough RESP2 (GET, SET with NX/PX, DEL, EVAL of the lock release
+script, PING) to exercise `RedisBackend` without a real Redis.
+"""
+import asyncio
+import time
+
+from app.lib.backends import RELEASE_LOCK_SCRIPT
+
+
+class FakeRedisServer:
+    def __init__(self):
+        self.data = {}      # key -> (value, expires_at or None)
+        self.commands = []  # every command received, for assertions
+        self.connections = 0  # connections accepted, for assertions
+        self._writers = set()
+        self._server = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, '127.0.0.1', 0)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    @property
+    def url(self):
+        return f"redis://127.0.0.1:{self.port}/0"
+
+    async def stop(self):
+        self.drop_connections()
+        self._server.close()
+        await self._server.wait_closed()
+
+    def drop_connections(self):
+        """Close every client connection, as a restarting server would."""
+        for writer in list(self._writers):
+            writer.close()
+
+    def _get(self, key):
+        item = self.data.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at is not None and time.time() > expires_at:
+            del self.data[key]
+            return None
+        return value
+
+    async def _read_command(self, reader):
+        line = await reader.readline()
+        if not line:
+            return None
+        count = int(line[1:-2])
+        args = []
+        for _ in range(count):
+            length = int((await reader.readline())[1:-2])
+            args.append((await reader.readexactly(length + 2))[:-2])
+        return args
+
+    def _execute(self, args):
+        command = args[0].decode().upper()
+        self.commands.append(command)
+        if command == 'PING':
+            return b'+PONG\r\n'
+        if command == 'GET':
+            value = self._get(args[1])
+            if value is None:
+                return b'$-1\r\n'
+            return b'$%d\r\n%s\r\n' % (len(value), value)
+        if command == 'SET':
+            key, value = args[1], args[2]
+            options = [a.decode().upper() for a in args[3:]]
+            expires_at = None
+            if 'PX' in options:
+                expires_at = time.time() + int(options[options.index('PX') + 1]) / 1000
+            if 'NX' in options and self._get(key) is not None:
+                return b'$-1\r\n'
+            self.data[key] = (value, expires_at)
+            return b'+OK\r\n'
+        if command == 'DEL':
+            removed = sum(1 for key in args[1:] if self.data.pop(key, None) is not None)
+            return b':%d\r\n' % removed
+        if command == 'EVAL' and args[1].decode() == RELEASE_LOCK_SCRIPT:
+            key, token = args[3], args[4]
+            if self._get(key) == token:
+                del self.data[key]
+                return b':1\r\n'
+            return b':0\r\n'
+        return b'-ERR unknown command\r\n'
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        self._writers.add(writer)
+        try:
+            while True:
+                args = await self._read_command(reader)
+                if args is None:
+                    break
+                writer.write(self._execute(args))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
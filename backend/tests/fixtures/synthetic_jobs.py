@@ -0,0 +1,157 @@
+"""
+Seeded generator of realistic Teraslice v3 jobs, for benchmarks and tests
+that need far more jobs than the hand-written fixtures in `teraslice_jobs.py`.
+
+Jobs are chained into multi-stage pipelines: most jobs read a Kafka topic
+written by an earlier job (several jobs often read the same topic), and end
+in Kafka, Elasticsearch, routed_sender (with large routing maps), file, S3 or
+noop/stdout destinations.  The same `seed` always produces the same jobs.
+"""
+import random
+import uuid
+
+KAFKA_CONNECTIONS = ['kafka_cluster1', 'kafka_cluster2', 'kafka_cluster3', 'kafka_cluster4']
+ES_CONNECTIONS = ['es_cluster1', 'es_cluster2', 'es_cluster3']
+S3_CONNECTIONS = ['s3_conn1', 's3_conn2']
+STATUSES = ['running', 'failing', 'paused', 'stopped', 'initializing']
+STATUS_WEIGHTS = [85, 4, 4, 5, 2]
+DATA_TYPES = ['netflow', 'dns', 'proxy', 'auth', 'firewall', 'email', 'dhcp', 'syslog', 'edr', 'vpn']
+PROCESSORS = ['filter_by_date', 'set_field', 'dedupe', 'data_window_to_array', 'extract_field',
+              'copy_field', 'drop_field', 'hash_field', 'geo_lookup', 'remove_empty_fields']
+
+# Weights for how a job sources its data.  Reading a topic some earlier job
+# writes is what strings jobs together into pipelines.
+SOURCE_KINDS = ['shared_topic', 'ingest_topic', 'file', 's3', 'data_generator']
+SOURCE_WEIGHTS = [70, 18, 5, 5, 2]
+
+DESTINATION_KINDS = ['kafka', 'elasticsearch', 'routed_kafka', 'routed_elasticsearch', 'file', 's3', 'noop', 'stdout']
+DESTINATION_WEIGHTS = [40, 30, 5, 5, 8, 8, 2, 2]
+
+
+class _JobBuilder:
+    def __init__(self, rng: random.Random, routing_size):
+        self.rng = rng
+        self.routing_size = routing_size
+        self.topics = []  # (connection, topic) written by jobs so far
+        self.ingest_count = 0
+
+    def _api(self, apis, name, **fields):
+        apis.append({'_name': name, **fields})
+        return name
+
+    def _topic_op(self, op_type, connection, topic, apis, api_name, extra=None):
+        # Mostly v3 style with the topic on an API, sometimes a bare operation
+        if self.rng.random() < 0.1:
+            return {'_op': op_type, 'connection': connection, 'topic': topic, **(extra or {})}
+        self._api(apis, api_name, _connection=connection, topic=topic, **(extra or {}))
+        return {'_op': op_type, '_api_name': api_name}
+
+    def source(self, apis):
+        kind = self.rng.choices(SOURCE_KINDS, SOURCE_WEIGHTS)[0]
+        if kind == 'shared_topic' and not self.topics:
+            kind = 'ingest_topic'
+
+        if kind == 'shared_topic':
+            # Favour recent topics so pipelines grow deep, not just wide
+            index = len(self.topics) - 1 - min(int(self.rng.expovariate(0.05)), len(self.topics) - 1)
+            connection, topic = self.topics[index]
+            return self._topic_op('kafka_reader', connection, topic, apis, 'kafka_reader_api',
+                                  {'group': f'{topic}-consumer-{self.rng.randint(1, 3)}', 'size': 10000,
+                                   'wait': 30000, 'rdkafka_options': {'fetch.min.bytes': 100000}})
+        if kind == 'ingest_topic':
+            self.ingest_count += 1
+            connection = self.rng.choice(KAFKA_CONNECTIONS)
+            topic = f"ingest-{self.rng.choice(DATA_TYPES)}-{self.ingest_count}"
+            return self._topic_op('kafka_reader', connection, topic, apis, 'kafka_reader_api',
+                                  {'group': f'{topic}-consumer', 'size': 10000, 'wait': 30000})
+        if kind == 'file':
+            return {'_op': 'file_reader', 'path': f"/data/incoming/{self.rng.choice(DATA_TYPES)}",
+                    'format': 'ldjson', 'size': 10000}
+        if kind == 's3':
+            api_name = self._api(apis, 's3_reader_api', _connection=self.rng.choice(S3_CONNECTIONS),
+                                 bucket=f"{self.rng.choice(DATA_TYPES)}-archive",
+                                 prefix=f"raw/{self.rng.randint(2019, 2025)}/", format='ldjson')
+            return {'_op': 's3_reader', '_api_name': api_name}
+        return {'_op': 'data_generator', 'size': 5000}
+
+    def destination(self, job_number, apis):
+        kind = self.rng.choices(DESTINATION_KINDS, DESTINATION_WEIGHTS)[0]
+        data_type = self.rng.choice(DATA_TYPES)
+
+        if kind == 'kafka':
+            connection = self.rng.choice(KAFKA_CONNECTIONS)
+            topic = f"{data_type}-stage-{job_number}"
+            self.topics.append((connection, topic))
+            return self._topic_op('kafka_sender', connection, topic, apis, 'kafka_sender_api',
+                                  {'size': 10000, 'compression': 'gzip'})
+        if kind == 'elasticsearch':
+            connection = self.rng.choice(ES_CONNECTIONS)
+            index = f"{data_type}-v{self.rng.randint(1, 5)}-{job_number}"
+            if self.rng.random() < 0.1:
+                return {'_op': 'elasticsearch_bulk', 'connection': connection, 'index': index}
+            api_name = self._api(apis, 'elasticsearch_sender_api', _connection=connection,
+                                 index=index, size=5000, type='_doc')
+            return {'_op': 'elasticsearch_bulk', '_api_name': api_name}
+        if kind in ('routed_kafka', 'routed_elasticsearch'):
+            routes = self.rng.randint(*self.routing_size)
+            prefix = f"{data_type}-routed-{job_number}"
+            if kind == 'routed_kafka':
+                api_name = self._api(apis, 'kafka_router', topic=prefix, size=10000)
+                connections = KAFKA_CONNECTIONS
+            else:
+                api_name = self._api(apis, 'elasticsearch_router', index=prefix, size=5000)
+                connections = ES_CONNECTIONS
+            routing = {f"{route:04d}": self.rng.choice(connections) for route in range(routes)}
+            if kind == 'routed_kafka':
+                # A few of the routed topics feed later stages
+                self.topics.extend((connection, f"{prefix}-{suffix}")
+                                   for suffix, connection in list(routing.items())[:3])
+            return {'_op': 'routed_sender', '_api_name': api_name, 'routing': routing}
+        if kind == 'file':
+            return {'_op': 'file_exporter', 'path': f"/data/export/{data_type}-{job_number}", 'format': 'ldjson'}
+        if kind == 's3':
+            api_name = self._api(apis, 's3_sender_api', _connection=self.rng.choice(S3_CONNECTIONS),
+                                 bucket=f"{data_type}-export", prefix=f"job-{job_number}/")
+            return {'_op': 's3_exporter', '_api_name': api_name}
+        return {'_op': kind}
+
+    def job(self, job_number):
+        apis = []
+        source = self.source(apis)
+        processors = [
+            {'_op': name, 'field': self.rng.choice(['date', 'ip', 'host', 'user', 'bytes'])}
+            for name in self.rng.sample(PROCESSORS, self.rng.randint(0, 4))
+        ]
+        destination = self.destination(job_number, apis)
+        data_type = self.rng.choice(DATA_TYPES)
+        return {
+            'job_id': str(uuid.UUID(int=self.rng.getrandbits(128), version=4)),
+            'name': f"{data_type}-pipeline-{job_number}",
+            'lifecycle': 'persistent',
+            'workers': self.rng.choice([1, 1, 2, 2, 4, 5, 10, 20, 40]),
+            'slicers': 1,
+            'max_retries': 3,
+            'analytics': False,
+            'assets': ['kafka', 'elasticsearch', 'standard'],
+            'active': True,
+            'ex': {'_status': self.rng.choices(STATUSES, STATUS_WEIGHTS)[0]},
+            'operations': [source, *processors, destination],
+            'apis': apis,
+            '_created': f"2024-{self.rng.randint(1, 12):02d}-{self.rng.randint(1, 28):02d}T00:00:00.000Z",
+        }
+
+
+def generate_jobs(count, seed=0, routing_size=(20, 200)):
+    """Generate `count` synthetic jobs.
+
+    Args:
+        count (int): Number of jobs to generate.
+        seed (int): Random seed, the same seed always gives the same jobs.
+        routing_size (tuple): Inclusive range for the number of routes in a
+            routed_sender's routing map.
+
+    Returns:
+        list: Teraslice jobs as returned by the `/jobs` API.
+    """
+    builder = _JobBuilder(random.Random(seed), routing_size)
+    return [builder.job(number) for number in range(count)]
@@ -593,3 +593,36 @@ def bare_operation_job():
         ],
         "apis": []
     }
+
+
+def make_job(job_id, source, destination, status="running", workers=1, name=None,
+             connection="kafka_cluster1", destination_op=None):
+    """A job reading Kafka topic `source` on `connection` and writing
+    `destination`, which is:
+
+    - an index on es_cluster1 (elasticsearch_bulk) when it starts with
+      'index', or `destination_op` is 'elasticsearch_bulk'
+    - indices on several ES clusters (routed_sender) when it's a routing map
+      of {suffix: connection}
+    - otherwise a Kafka topic on `connection` (kafka_sender)
+
+    Operations carry their fields directly, without APIs, except for the
+    routed_sender.
+    """
+    job = {
+        "job_id": job_id,
+        "name": name or f"pipeline-{job_id}",
+        "workers": workers,
+        "ex": {"_status": status},
+        "operations": [{"_op": "kafka_reader", "connection": connection, "topic": source}],
+    }
+    if isinstance(destination, dict):
+        job["apis"] = [{"_name": "routed_sender_api", "index": "logs"}]
+        job["operations"].append(
+            {"_op": "routed_sender", "_api_name": "routed_sender_api", "routing": destination}
+        )
+    elif destination_op == "elasticsearch_bulk" or (destination_op is None and destination.startswith("index")):
+        job["operations"].append({"_op": "elasticsearch_bulk", "connection": "es_cluster1", "index": destination})
+    else:
+        job["operations"].append({"_op": "kafka_sender", "connection": connection, "topic": destination})
+    return job
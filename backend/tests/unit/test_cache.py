@@ -1,7 +1,8 @@
+import json
 import pytest
 import asyncio
 import time
-from app.lib.cache import CacheManager, CacheEntry
+from app.lib.cache import CacheManager, CacheEntry, FetchResult
 
 
 class TestCacheEntry:
@@ -117,4 +118,117 @@ class TestCacheManager:
         assert cached_data.startswith("refreshed_data_")
         
         # Clean up
-        cache.clear()
\ No newline at end of file
+        cache.clear()
+
+    @pytest.mark.asyncio
+    async def test_concurrent_loads_share_a_fetch(self):
+        cache = CacheManager()
+        fetches = 0
+
+        async def fetch():
+            nonlocal fetches
+            fetches += 1
+            await asyncio.sleep(0.05)
+            return ["jobs"]
+
+        results = await asyncio.gather(*(cache.load("jobs_a", fetch) for _ in range(5)))
+        assert results == [["jobs"]] * 5
+        assert fetches == 1
+        assert len(cache.refresh_history) == 1
+
+        # Finished loads aren't shared
+        await cache.load("jobs_a", fetch)
+        assert fetches == 2
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_leaves_load_running(self):
+        cache = CacheManager()
+
+        async def fetch():
+            await asyncio.sleep(0.05)
+            return ["jobs"]
+
+        first = asyncio.create_task(cache.load("jobs_a", fetch))
+        second = asyncio.create_task(cache.load("jobs_a", fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+        assert await second == ["jobs"]
+        assert cache.get("jobs_a") == ["jobs"]
+
+class TestCacheIntrospection:
+    def test_lookup_counters(self):
+        cache = CacheManager()
+        cache.get("jobs_a")
+        cache.set("jobs_a", [1, 2, 3])
+        cache.get("jobs_a")
+        cache.get("jobs_a")
+        cache._refresh_intervals["jobs_a"] = -1  # every lookup is now after the refresh interval
+        cache.get("jobs_a")
+
+        stats = cache.get_status()['keys']['jobs_a']
+        assert stats['hits'] == 2
+        assert stats['misses'] == 1
+        assert stats['stale_serves'] == 1
+        assert stats['hit_ratio'] == 0.75
+
+    @pytest.mark.asyncio
+    async def test_refresh_history(self):
+        cache = CacheManager(history_size=3)
+        payloads = iter([b'["a"]', b'["a"]', b'["b"]'])
+
+        async def fetch():
+            payload = next(payloads)
+            return FetchResult.from_payload(json.loads(payload), payload)
+
+        async def fail():
+            raise ConnectionError("teraslice unreachable")
+
+        for _ in range(3):
+            await cache.load("jobs_a", fetch)
+        with pytest.raises(ConnectionError):
+            await cache.load("jobs_a", fail)
+
+        status = cache.get_status()
+        history = status['refresh_history']
+        # Oldest attempt has been dropped
+        assert [a['outcome'] for a in history] == ['success', 'success', 'error']
+        assert [a['changed'] for a in history] == [False, True, None]
+        assert history[0]['size_bytes'] == len('["a"]')
+        assert history[-1]['error'] == "ConnectionError: teraslice unreachable"
+        assert status['keys']['jobs_a']['last_error'] == "ConnectionError: teraslice unreachable"
+        assert status['entries'][0]['size_bytes'] == len('["b"]')
+        assert cache.get("jobs_a") == ["b"]
+
+    @pytest.mark.asyncio
+    async def test_refresh_history_without_payload(self):
+        cache = CacheManager()
+
+        async def fetch():
+            return ["a"]
+
+        await cache.load("jobs_a", fetch)
+        await cache.load("jobs_a", fetch)
+        # Nothing to size or compare, the data isn't serialized to find out
+        assert [(a['size_bytes'], a['changed']) for a in cache.refresh_history] == [(None, None), (None, None)]
+        assert cache.get("jobs_a") == ["a"]
+
+    @pytest.mark.asyncio
+    async def test_summary(self):
+        cache = CacheManager()
+
+        async def fetch():
+            return FetchResult.from_payload({"jobs": []}, b'{"jobs":[]}')
+
+        await cache.load("jobs_a", fetch)
+        cache.get("jobs_a")
+        cache.get("jobs_b")
+
+        summary = cache.get_summary()
+        assert summary['cache_size'] == 1
+        assert summary['hit_ratio'] == 0.5
+        assert summary['size_bytes'] == len('{"jobs":[]}')
+        assert summary['recent_refreshes'] == 1
+        assert summary['last_refresh_error'] is None
+
+        cache.clear()
+        assert cache.get_summary()['recent_refreshes'] == 0
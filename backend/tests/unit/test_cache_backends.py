@@ -0,0 +1,246 @@
+import pytest
+import pytest_asyncio
+import asyncio
+from app.lib.backends import InMemoryBackend, RedisBackend, create_backend
+from app.lib.cache import CacheManager
+from tests.fixtures.fake_redis import FakeRedisServer
+
+
+@pytest_asyncio.fixture
+async def fake_redis():
+    server = await FakeRedisServer().start()
+    yield server
+    await server.stop()
+
+
+class TestCreateBackend:
+    def test_no_url_means_no_backend(self):
+        assert create_backend(None) is None
+        assert create_backend("") is None
+
+    def test_memory_url(self):
+        assert isinstance(create_backend("memory://"), InMemoryBackend)
+
+    def test_redis_url(self):
+        backend = create_backend("redis://:secret@cache.example.com:6380/2")
+        assert isinstance(backend, RedisBackend)
+        assert backend.host == "cache.example.com"
+        assert backend.port == 6380
+        assert backend.password == "secret"
+        assert backend.db == 2
+
+    def test_unsupported_url(self):
+        with pytest.raises(ValueError):
+            create_backend("memcached://localhost")
+
+
+class TestInMemoryBackend:
+    @pytest.mark.asyncio
+    async def test_set_and_get(self):
+        backend = InMemoryBackend()
+        await backend.set("key", b"payload", ttl=30)
+
+        stored = await backend.get("key")
+        assert stored.payload == b"payload"
+        assert stored.age() < 1
+
+    @pytest.mark.asyncio
+    async def test_expiry(self):
+        backend = InMemoryBackend()
+        await backend.set("key", b"payload", ttl=0.05)
+        await asyncio.sleep(0.1)
+        assert await backend.get("key") is None
+
+    @pytest.mark.asyncio
+    async def test_lock_is_exclusive(self):
+        backend = InMemoryBackend()
+        token = await backend.acquire_lock("key", ttl=30)
+        assert token is not None
+        assert await backend.acquire_lock("key", ttl=30) is None
+
+        # Releasing with the wrong token leaves the lock held
+        await backend.release_lock("key", "not-the-token")
+        assert await backend.acquire_lock("key", ttl=30) is None
+
+        await backend.release_lock("key", token)
+        assert await backend.acquire_lock("key", ttl=30) is not None
+
+
+class TestRedisBackend:
+    @pytest.mark.asyncio
+    async def test_set_get_delete(self, fake_redis):
+        backend = RedisBackend(fake_redis.url)
+        await backend.set("jobs", b'[{"job_id": "a"}]', ttl=30)
+
+        stored = await backend.get("jobs")
+        assert stored.payload == b'[{"job_id": "a"}]'
+        assert stored.age() < 1
+
+        await backend.delete("jobs")
+        assert await backend.get("jobs") is None
+        await backend.close()
+
+    @pytest.mark.asyncio
+    async def test_keys_are_prefixed(self, fake_redis):
+        backend = RedisBackend(fake_redis.url, key_prefix="t3d:")
+        await backend.set("jobs", b"x", ttl=30)
+        assert b"t3d:jobs" in fake_redis.data
+        await backend.close()
+
+    @pytest.mark.asyncio
+    async def test_lock_between_clients(self, fake_redis):
+        first = RedisBackend(fake_redis.url)
+        second = RedisBackend(fake_redis.url)
+
+        token = await first.acquire_lock("jobs", ttl=30)
+        assert token is not None
+        assert await second.acquire_lock("jobs", ttl=30) is None
+
+        await second.release_lock("jobs", "someone-elses-token")
+        assert await second.acquire_lock("jobs", ttl=30) is None
+
+        await first.release_lock("jobs", token)
+        assert await second.acquire_lock("jobs", ttl=30) is not None
+        await first.close()
+        await second.close()
+
+    @pytest.mark.asyncio
+    async def test_reconnects_once_for_concurrent_commands(self, fake_redis):
+        backend = RedisBackend(fake_redis.url)
+        await backend.set("jobs", b"x", ttl=30)
+        fake_redis.drop_connections()
+        await asyncio.sleep(0.01)
+
+        results = await asyncio.gather(*(backend.get("jobs") for _ in range(5)))
+        assert [stored.payload for stored in results] == [b"x"] * 5
+        assert fake_redis.connections == 2
+        await backend.close()
+
+    @pytest.mark.asyncio
+    async def test_cancelled_command_drops_connection(self, fake_redis):
+        backend = RedisBackend(fake_redis.url)
+        await backend.set("jobs", b"x", ttl=30)
+        task = asyncio.create_task(backend.get("jobs"))
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        # The cancelled GET's reply isn't taken as this one's
+        await backend.set("other", b"y", ttl=30)
+        assert (await backend.get("other")).payload == b"y"
+        await backend.close()
+
+
+class TestSharedCacheManager:
+    @pytest.mark.asyncio
+    async def test_load_without_backend_calls_fetch(self):
+        cache = CacheManager()
+
+        async def fetch():
+            return ["fresh"]
+
+        assert await cache.load("key", fetch) == ["fresh"]
+        assert cache.get("key") == ["fresh"]
+
+    @pytest.mark.asyncio
+    async def test_only_one_worker_fetches(self, fake_redis):
+        """Several workers loading the same key concurrently should result in
+        a single upstream fetch, with everyone getting the same data."""
+        fetch_count = 0
+
+        async def fetch():
+            nonlocal fetch_count
+            fetch_count += 1
+            await asyncio.sleep(0.2)
+            return [{"job_id": "job_1"}]
+
+        workers = [CacheManager(backend=RedisBackend(fake_redis.url)) for _ in range(4)]
+        for worker in workers:
+            worker.lock_poll_interval = 0.02
+
+        results = await asyncio.gather(*(worker.load("jobs", fetch) for worker in workers))
+
+        assert fetch_count == 1
+        assert all(result == [{"job_id": "job_1"}] for result in results)
+        for worker in workers:
+            assert worker.get("jobs") == [{"job_id": "job_1"}]
+            await worker.backend.close()
+
+    @pytest.mark.asyncio
+    async def test_shared_payload_reused(self):
+        backend = InMemoryBackend()
+        first = CacheManager(backend=backend)
+        second = CacheManager(backend=backend)
+
+        async def fetch():
+            return {"value": 1}
+
+        async def should_not_fetch():
+            raise AssertionError("second worker should use the shared payload")
+
+        await first.load("key", fetch)
+        assert await second.load("key", should_not_fetch) == {"value": 1}
+
+    @pytest.mark.asyncio
+    async def test_waiter_takes_over_after_failed_refresh(self):
+        backend = InMemoryBackend()
+        first = CacheManager(backend=backend)
+        second = CacheManager(backend=backend)
+        second.lock_poll_interval = 0.01
+
+        async def failing_fetch():
+            await asyncio.sleep(0.05)
+            raise RuntimeError("upstream down")
+
+        async def fetch():
+            return "recovered"
+
+        failing = asyncio.create_task(first.load("key", failing_fetch))
+        await asyncio.sleep(0.01)
+        result = await second.load("key", fetch)
+
+        assert result == "recovered"
+        with pytest.raises(RuntimeError):
+            await failing
+
+    @pytest.mark.asyncio
+    async def test_background_refresh_single_refresher(self):
+        """Background refreshes on several workers should only hit upstream
+        once per interval."""
+        backend = InMemoryBackend()
+        refresh_count = 0
+
+        async def refresh():
+            nonlocal refresh_count
+            refresh_count += 1
+            return refresh_count
+
+        workers = [CacheManager(backend=backend) for _ in range(3)]
+        for worker in workers:
+            worker.lock_poll_interval = 0.02
+            worker.schedule_refresh("key", refresh, 0.2)
+
+        await asyncio.sleep(0.3)
+
+        assert refresh_count == 1
+        assert [worker.get("key") for worker in workers] == [1, 1, 1]
+        for worker in workers:
+            worker.clear()
+
+
+class TestAppShutdown:
+    def test_backend_closed(self, monkeypatch):
+        from fastapi.testclient import TestClient
+        from app import main
+
+        closed = []
+
+        class Backend(InMemoryBackend):
+            async def close(self):
+                closed.append(True)
+
+        monkeypatch.setattr(main.cache, 'backend', Backend())
+        with TestClient(main.app):
+            assert closed == []
+        assert closed == [True]
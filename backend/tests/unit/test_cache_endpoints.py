@@ -1,6 +1,8 @@
+import json
 import pytest
 from fastapi.testclient import TestClient
 from app.main import app, cache
+from tests.fixtures.teraslice_jobs import make_job
 
 
 class TestCacheEndpoints:
@@ -85,4 +87,24 @@ class TestCacheEndpoints:
         response = self.client.get("/api/cache/status")
         data = response.json()
         assert data["cache_size"] == 0
-        assert data["entries"] == []
\ No newline at end of file
+        assert data["entries"] == []
+
+    def test_cache_status_summary_view(self):
+        cache.set("test_key1", "test_data1")
+        cache.get("test_key1")
+
+        response = self.client.get("/api/cache/status", params={"view": "summary"})
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["cache_size"] == 1
+        assert data["hits"] == 1
+        assert "entries" not in data
+
+    def test_jobs_sized_from_response_body(self, serve_jobs):
+        jobs = [make_job('job_1', 'incoming', 'index1')]
+        serve_jobs(jobs)
+        self.client.get("/api/jobs")
+
+        attempt, = cache.get_status()["refresh_history"]
+        assert attempt["size_bytes"] == len(json.dumps(jobs).encode())
@@ -0,0 +1,96 @@
+import pytest
+import httpx
+import json
+import time
+from fastapi.testclient import TestClient
+
+from app import core, main
+from app.lib.capture import CaptureRecorder, CaptureReplayer
+from tests.fixtures.teraslice_jobs import kafka_reader_to_elasticsearch_job
+
+
+PARAMS = {'size': 500, 'active': 'true', 'ex': '_status'}
+OTHER_PARAMS = {'size': 10, 'active': 'true', 'ex': '_status'}
+
+
+def body(n):
+    return json.dumps([{**kafka_reader_to_elasticsearch_job(), 'job_id': f'job_{n}'}]).encode()
+
+
+class TestReplay:
+    def test_round_trip_in_order(self, tmp_path):
+        recorder = CaptureRecorder(tmp_path / 'jobs.capture.gz')
+        for n in range(3):
+            recorder.record(PARAMS, 200, body(n), duration=0.5)
+
+        replayer = CaptureReplayer(tmp_path / 'jobs.capture.gz')
+        replayed = [replayer.next(PARAMS) for _ in range(4)]
+
+        assert [r.body for r in replayed] == [body(0), body(1), body(2), body(2)]
+        assert replayed[0].status == 200
+        assert replayed[0].duration == 0.5
+        assert replayed[0].params == PARAMS
+
+    def test_interleaved_params(self, tmp_path):
+        recorder = CaptureRecorder(tmp_path / 'jobs.capture.gz')
+        recorder.record(OTHER_PARAMS, 200, body('other'), duration=0.1)
+        recorder.record(PARAMS, 200, body(0), duration=0.1)
+        recorder.record(PARAMS, 200, body(1), duration=0.1)
+
+        replayer = CaptureReplayer(tmp_path / 'jobs.capture.gz')
+        assert replayer.next(PARAMS).body == body(0)
+        assert replayer.next(OTHER_PARAMS).body == body('other')
+        assert replayer.next(PARAMS).body == body(1)
+
+    def test_unknown_params(self, tmp_path):
+        CaptureRecorder(tmp_path / 'jobs.capture.gz').record(PARAMS, 200, body(0), duration=0.1)
+        with pytest.raises(LookupError):
+            CaptureReplayer(tmp_path / 'jobs.capture.gz').next(OTHER_PARAMS)
+
+    def test_timed_replay(self, tmp_path):
+        recorder = CaptureRecorder(tmp_path / 'jobs.capture.gz')
+        for n in range(3):
+            recorder.record(PARAMS, 200, body(n), duration=1.0, timestamp=1000.0 + n * 10)
+
+        # 10 recorded seconds pass every 0.1s
+        replayer = CaptureReplayer(tmp_path / 'jobs.capture.gz', speed=100)
+        assert replayer.next(PARAMS).body == body(0)
+        assert replayer.next(PARAMS).body == body(0)
+        time.sleep(0.12)
+        assert replayer.next(PARAMS).body == body(1)
+        time.sleep(0.1)
+        assert replayer.next(PARAMS).body == body(2)
+
+
+class TestRecordAndReplayEndpoint:
+    def setup_method(self):
+        self.client = TestClient(main.app)
+        main.cache.clear()
+
+    def teardown_method(self):
+        main.cache.clear()
+
+    def test_replays_what_was_recorded(self, monkeypatch, tmp_path):
+        capture = tmp_path / 'jobs.capture.gz'
+        responses = iter([httpx.Response(200, content=body(0)), httpx.Response(503, content=b'down')])
+        monkeypatch.setattr(core, '_teraslice_client',
+                            lambda: httpx.AsyncClient(transport=httpx.MockTransport(lambda request: next(responses))))
+        monkeypatch.setattr(core, 'capture_recorder', CaptureRecorder(capture))
+
+        assert self.client.get("/api/jobs").json() == json.loads(body(0))
+        main.cache.clear()
+        with pytest.raises(httpx.HTTPStatusError):
+            self.client.get("/api/jobs")
+        main.cache.clear()
+
+        def unreachable():
+            raise AssertionError("Teraslice should not be called while replaying")
+
+        monkeypatch.setattr(core, '_teraslice_client', unreachable)
+        monkeypatch.setattr(core, 'capture_recorder', None)
+        monkeypatch.setattr(core, 'capture_replayer', CaptureReplayer(capture))
+
+        assert self.client.get("/api/jobs").json() == json.loads(body(0))
+        main.cache.clear()
+        with pytest.raises(httpx.HTTPStatusError):
+            self.client.get("/api/jobs")
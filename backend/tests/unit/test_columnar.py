@@ -0,0 +1,157 @@
+import asyncio
+import time
+
+import pytest
+
+from app import main
+from app.lib.columnar import GraphTable
+from app.core import _process_jobs_to_graph
+from tests.fixtures.teraslice_jobs import make_job
+
+
+JOBS = [
+    make_job('job_1', 'incoming', 'stage1', workers=4),
+    make_job('job_2', 'stage1', {'a': 'es_cluster1', 'b': 'es_cluster1', 'c': 'es_cluster2'},
+             workers=2, status='failing'),
+    make_job('job_3', 'stage1', {'a': 'es_cluster2'}, workers=5),
+    make_job('job_4', 'other', 'stage2', workers=3, status='stopped'),
+]
+
+
+@pytest.fixture
+def table():
+    return GraphTable(_process_jobs_to_graph(JOBS))
+
+
+def values(result, column):
+    return {group[column]: group['value'] for group in result['groups']}
+
+
+class TestGraphTable:
+    def test_metrics(self, table):
+        # job_2 has three links, two of them to es_cluster1
+        assert values(table.aggregate(['target_connection'], 'rows'), 'target_connection') == {
+            'kafka_cluster1': 2, 'es_cluster1': 2, 'es_cluster2': 2,
+        }
+        assert values(table.aggregate(['target_connection'], 'jobs'), 'target_connection') == {
+            'kafka_cluster1': 2, 'es_cluster1': 1, 'es_cluster2': 2,
+        }
+        # Each job's workers are counted once per group
+        assert values(table.aggregate(['target_connection'], 'workers'), 'target_connection') == {
+            'kafka_cluster1': 7, 'es_cluster1': 2, 'es_cluster2': 7,
+        }
+
+    def test_group_by_several_columns(self, table):
+        result = table.aggregate(['status', 'target_type'], 'jobs')
+        assert result['total_groups'] == 4
+        assert {(g['status'], g['target_type']): g['value'] for g in result['groups']} == {
+            ('running', 'KAFKA'): 1, ('failing', 'ES'): 1, ('running', 'ES'): 1, ('stopped', 'KAFKA'): 1,
+        }
+
+    def test_where(self, table):
+        result = table.aggregate(['source'], 'workers', where=[('target_type', 'ES')])
+        assert values(result, 'source') == {'kafka_cluster1:stage1': 7}
+        assert result['where'] == [{'column': 'target_type', 'value': 'ES'}]
+
+        result = table.aggregate(['source'], 'workers', where=[('status', 'unknown')])
+        assert result['total_groups'] == 0
+        assert result['groups'] == []
+
+    def test_largest_first_and_limit(self, table):
+        result = table.aggregate(['source'], 'workers', limit=2)
+        assert result['total_groups'] == 3
+        assert [(g['source'], g['value']) for g in result['groups']] == [
+            ('kafka_cluster1:stage1', 7), ('kafka_cluster1:incoming', 4),
+        ]
+
+    def test_results_memoized(self, table):
+        assert not table.is_memoized(['status'], 'jobs')
+        first = table.aggregate(['status'], 'jobs')
+        assert table.is_memoized(('status',), 'jobs')
+        assert table.aggregate(['status'], 'jobs') is first
+        assert table.aggregate(['status'], 'rows') is not first
+
+    @pytest.mark.parametrize('group_by,metric,where', [
+        (['bogus'], 'jobs', ()),
+        (['status'], 'bogus', ()),
+        (['status'], 'jobs', [('bogus', 'x')]),
+        ([], 'jobs', ()),
+        (['status', 'name', 'source', 'target'], 'jobs', ()),
+    ])
+    def test_invalid_queries(self, table, group_by, metric, where):
+        with pytest.raises(ValueError):
+            table.aggregate(group_by, metric, where)
+
+    def test_empty_graph(self):
+        result = GraphTable({'nodes': [], 'links': []}).aggregate(['status'])
+        assert result['groups'] == []
+
+
+class TestAggregateEndpoint:
+    @pytest.fixture(autouse=True)
+    def teraslice(self, serve_jobs):
+        self.fetches = serve_jobs(JOBS)
+
+    def test_aggregate(self, client, monkeypatch):
+        built = []
+        monkeypatch.setattr(main.columnar, 'GraphTable',
+                            lambda graph: built.append(1) or GraphTable(graph))
+
+        response = client.get("/api/aggregate",
+                              params={'group_by': 'target_connection', 'metric': 'workers',
+                                      'where': ['status:running', 'source_type:KAFKA']})
+        assert response.status_code == 200
+        assert values(response.json(), 'target_connection') == {'kafka_cluster1': 4, 'es_cluster2': 5}
+
+        response = client.get("/api/aggregate", params={'group_by': 'status,target_type'})
+        assert response.status_code == 200
+        assert response.json()['total_groups'] == 4
+        # One fetch and one table for both queries
+        assert len(self.fetches) == 1
+        assert len(built) == 1
+
+    def test_cold_queries_off_the_loop(self, client, monkeypatch):
+        offloaded = []
+        run_cpu_bound = main._run_cpu_bound
+        monkeypatch.setattr(main, '_run_cpu_bound',
+                            lambda func, *args: offloaded.append(func) or run_cpu_bound(func, *args))
+
+        first = client.get("/api/aggregate", params={'group_by': 'status'})
+        assert [func.__name__ for func in offloaded][-1] == 'aggregate'
+        offloaded.clear()
+        # Memoized, so answered right away
+        assert client.get("/api/aggregate", params={'group_by': 'status'}).json() == first.json()
+        assert offloaded == []
+
+    @pytest.mark.asyncio
+    async def test_concurrent_builds_shared(self, monkeypatch):
+        graph = _process_jobs_to_graph(JOBS)
+
+        async def current_graph():
+            return ('memo', 1), graph
+
+        monkeypatch.setattr(main, '_current_graph', current_graph)
+        monkeypatch.setattr(main, '_graph_indexes', {})
+        built = []
+
+        def build(graph):
+            built.append(graph)
+            time.sleep(0.05)
+            return GraphTable(graph)
+
+        tables = await asyncio.gather(*(main._graph_index('aggregate_table', build) for _ in range(5)))
+        assert len(built) == 1
+        assert all(table is tables[0] for table in tables)
+        assert main._index_builds == {}
+
+    def test_bad_limit(self, client):
+        assert client.get("/api/aggregate", params={'group_by': 'status', 'limit': -1}).status_code == 422
+
+    @pytest.mark.parametrize('params', [
+        {'group_by': 'bogus'},
+        {'group_by': 'status', 'metric': 'bogus'},
+        {'group_by': 'status', 'where': 'no-colon'},
+    ])
+    def test_bad_queries(self, client, params):
+        response = client.get("/api/aggregate", params=params)
+        assert response.status_code == 400
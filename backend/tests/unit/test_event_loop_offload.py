@@ -0,0 +1,104 @@
+import pytest
+import asyncio
+import json
+import time
+import httpx
+
+from app import core
+
+
+def make_large_jobs(count):
+    """Build `count` kafka_reader -> kafka_sender jobs chained by topic."""
+    return [
+        {
+            'job_id': f'job-{i}',
+            'name': f'pipeline-{i}',
+            'workers': 2,
+            'ex': {'_status': 'running'},
+            'operations': [
+                {'_op': 'kafka_reader', '_api_name': 'kafka_reader_api'},
+                {'_op': 'noop'},
+                {'_op': 'kafka_sender', '_api_name': 'kafka_sender_api'}
+            ],
+            'apis': [
+                {'_name': 'kafka_reader_api', '_connection': 'kafka_cluster1',
+                 'topic': f'topic-{i}', 'group': 'consumer-group-' * 10},
+                {'_name': 'kafka_sender_api', '_connection': 'kafka_cluster1',
+                 'topic': f'topic-{i + 1}'}
+            ]
+        }
+        for i in range(count)
+    ]
+
+
+async def max_loop_lag_during(coro, interval=0.005):
+    """Run `coro` while a ticker measures how late the event loop wakes it.
+    Returns (result, worst lag in seconds)."""
+    lags = []
+    done = False
+
+    async def ticker():
+        while not done:
+            start = time.perf_counter()
+            await asyncio.sleep(interval)
+            lags.append(time.perf_counter() - start - interval)
+
+    task = asyncio.create_task(ticker())
+    await asyncio.sleep(interval * 2)
+    try:
+        result = await coro
+    finally:
+        done = True
+        await task
+    return result, max(lags)
+
+
+class TestEventLoopOffload:
+    @pytest.mark.asyncio
+    async def test_fetch_decodes_response(self, monkeypatch):
+        jobs = make_large_jobs(3)
+
+        def handler(request):
+            assert request.url.path == '/jobs'
+            assert request.url.params['size'] == '500'
+            return httpx.Response(200, content=json.dumps(jobs).encode())
+
+        monkeypatch.setattr(core, '_teraslice_client',
+                            lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+
+        assert await core._fetch_jobs_from_api() == jobs
+
+    @pytest.mark.asyncio
+    async def test_fetch_raises_http_errors(self, monkeypatch):
+        monkeypatch.setattr(core, '_teraslice_client',
+                            lambda: httpx.AsyncClient(transport=httpx.MockTransport(
+                                lambda request: httpx.Response(500))))
+
+        with pytest.raises(httpx.HTTPStatusError):
+            await core._fetch_jobs_from_api()
+
+    @pytest.mark.asyncio
+    async def test_event_loop_stays_responsive_during_large_refresh(self, monkeypatch):
+        """Decoding a large /jobs body and building its graph should not
+        hold up the event loop for anywhere near as long as the work takes."""
+        body = json.dumps(make_large_jobs(5000)).encode()
+        monkeypatch.setattr(core, '_teraslice_client',
+                            lambda: httpx.AsyncClient(transport=httpx.MockTransport(
+                                lambda request: httpx.Response(200, content=body))))
+
+        # How long the CPU-bound part takes when run inline on the loop
+        start = time.perf_counter()
+        core._encode_pipeline_graph(json.loads(body))
+        inline_duration = time.perf_counter() - start
+
+        async def refresh():
+            jobs = await core._fetch_jobs_from_api()
+            return await core._run_cpu_bound(core._encode_pipeline_graph, jobs)
+
+        graph_json, max_lag = await max_loop_lag_during(refresh())
+
+        assert len(json.loads(graph_json)['links']) == 5000
+        assert max_lag < inline_duration / 2, (
+            f"event loop stalled {max_lag * 1000:.1f}ms during a refresh "
+            f"whose CPU work takes {inline_duration * 1000:.1f}ms"
+        )
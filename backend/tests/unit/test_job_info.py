@@ -5,7 +5,7 @@ import pytest
 import logging
 from unittest.mock import Mock
 
-from app.lib.ts import JobInfo, StorageNode
+from app.lib.ts import DESTINATION_OPERATORS, SOURCE_OPERATORS, JobInfo, StorageNode
 from tests.fixtures.teraslice_jobs import (
     kafka_reader_to_elasticsearch_job,
     kafka_reader_to_elasticsearch_default_job,
@@ -157,6 +157,32 @@ class TestJobInfoHelperMethods:
 
         assert result == "my-index"
 
+    def test_duplicate_api_names_use_first_definition(self):
+        """Test that the API index keeps the first of duplicate names, as a
+        linear search would"""
+        job_data = {
+            "operations": [{"_op": "kafka_reader", "_api_name": "my_api"}],
+            "apis": [
+                {"_name": "my_api", "topic": "first-topic", "_connection": "kafka_a"},
+                {"_name": "my_api", "topic": "second-topic", "_connection": "kafka_b"}
+            ]
+        }
+        job_info = JobInfo(job_data, self.logger)
+
+        assert job_info.source.id == "kafka_a:first-topic"
+
+    def test_resolve_operation_with_missing_api(self):
+        """Test that a missing API resolves to no fields and the default
+        connection, ignoring fields on the operation"""
+        job_data = {
+            "operations": [{"_op": "kafka_reader"}],
+            "apis": []
+        }
+        job_info = JobInfo(job_data, self.logger)
+        op = {"_op": "kafka_reader", "_api_name": "my_api", "topic": "op-topic", "connection": "kafka_x"}
+
+        assert job_info._resolve_operation(op) == ({}, 'default')
+
 
 class TestJobInfoSourceNode:
     """Test JobInfo.process_source_node() method"""
@@ -164,6 +190,8 @@ class TestJobInfoSourceNode:
     def setup_method(self):
         """Set up test fixtures"""
         self.logger = Mock(spec=logging.Logger)
+        # Unknown operations only warn the first time they're seen
+        SOURCE_OPERATORS.unknown.clear()
     
     def test_process_source_node_kafka_reader(self):
         """Test source node processing for kafka_reader operation"""
@@ -239,6 +267,8 @@ class TestJobInfoDestinationNodes:
     def setup_method(self):
         """Set up test fixtures"""
         self.logger = Mock(spec=logging.Logger)
+        # Unknown operations only warn the first time they're seen
+        DESTINATION_OPERATORS.unknown.clear()
     
     def test_process_destination_nodes_kafka_sender(self):
         """Test destination node processing for kafka_sender operation"""
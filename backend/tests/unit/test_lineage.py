@@ -0,0 +1,149 @@
+import pytest
+
+from app import main
+from app.lib.lineage import LineageIndex
+from app.core import _process_jobs_to_graph
+from tests.fixtures.teraslice_jobs import make_job
+
+
+# incoming -> stage1 -> stage2 -> index1, with a shortcut incoming -> stage2,
+# a second job on stage1 -> stage2 and a branch stage1 -> index2
+JOBS = [
+    make_job('job_1', 'incoming', 'stage1'),
+    make_job('job_2', 'stage1', 'stage2'),
+    make_job('job_3', 'stage1', 'stage2'),
+    make_job('job_4', 'stage2', 'index1'),
+    make_job('job_5', 'stage1', 'index2'),
+    make_job('job_6', 'incoming', 'stage2'),
+    make_job('job_7', 'unrelated', 'index3'),
+]
+
+
+@pytest.fixture
+def index():
+    return LineageIndex(_process_jobs_to_graph(JOBS))
+
+
+def distances(result):
+    return {node['id']: node['distance'] for node in result['nodes']}
+
+
+class TestLineageIndex:
+    def test_downstream(self, index):
+        result = index.closure('kafka_cluster1:incoming')
+        assert distances(result) == {
+            'kafka_cluster1:stage1': 1, 'kafka_cluster1:stage2': 1,
+            'es_cluster1:index2': 2, 'es_cluster1:index1': 2,
+        }
+        assert sorted(link['job_id'] for link in result['links']) == [
+            'job_1', 'job_2', 'job_3', 'job_4', 'job_5', 'job_6',
+        ]
+
+    def test_upstream(self, index):
+        result = index.closure('es_cluster1:index1', 'up')
+        assert distances(result) == {
+            'kafka_cluster1:stage2': 1, 'kafka_cluster1:stage1': 2, 'kafka_cluster1:incoming': 2,
+        }
+        assert result['nodes'][0]['connector_type'] == 'KAFKA'
+
+    def test_depth(self, index):
+        result = index.closure('kafka_cluster1:stage1', 'down', depth=1)
+        assert distances(result) == {'kafka_cluster1:stage2': 1, 'es_cluster1:index2': 1}
+        assert sorted(link['job_id'] for link in result['links']) == ['job_2', 'job_3', 'job_5']
+
+    def test_no_links(self, index):
+        assert index.closure('kafka_cluster1:incoming', 'up')['nodes'] == []
+
+    def test_cycles_terminate(self):
+        index = LineageIndex(_process_jobs_to_graph([make_job('a', 't1', 't2'), make_job('b', 't2', 't1')]))
+        assert distances(index.closure('kafka_cluster1:t1')) == {'kafka_cluster1:t2': 1}
+
+    def test_shortest_path(self, index):
+        path = index.path('kafka_cluster1:incoming', 'es_cluster1:index1')
+        assert path['nodes'] == ['kafka_cluster1:incoming', 'kafka_cluster1:stage2', 'es_cluster1:index1']
+        assert [[link['job_id'] for link in hop] for hop in path['hops']] == [['job_6'], ['job_4']]
+
+    def test_parallel_jobs_in_a_hop(self, index):
+        path = index.path('kafka_cluster1:stage1', 'kafka_cluster1:stage2')
+        assert [[link['job_id'] for link in hop] for hop in path['hops']] == [['job_2', 'job_3']]
+
+    def test_no_path(self, index):
+        # Paths follow the data downstream only
+        assert index.path('es_cluster1:index1', 'kafka_cluster1:incoming') is None
+        assert index.path('kafka_cluster1:incoming', 'es_cluster1:index3') is None
+
+    def test_unknown_node(self, index):
+        with pytest.raises(KeyError):
+            index.closure('kafka_cluster1:bogus')
+        with pytest.raises(KeyError):
+            index.path('kafka_cluster1:incoming', 'kafka_cluster1:bogus')
+
+    def test_results_memoized(self, index):
+        assert not index.closure_memoized('kafka_cluster1:incoming')
+        first = index.closure('kafka_cluster1:incoming')
+        assert index.closure_memoized('kafka_cluster1:incoming')
+        assert index.closure('kafka_cluster1:incoming') is first
+        assert index.closure('kafka_cluster1:incoming', depth=1) is not first
+
+        # Including there being no path
+        assert index.path('es_cluster1:index1', 'kafka_cluster1:incoming') is None
+        assert index.path_memoized('es_cluster1:index1', 'kafka_cluster1:incoming')
+
+
+class TestLineageEndpoints:
+    @pytest.fixture(autouse=True)
+    def teraslice(self, serve_jobs):
+        self.fetches = serve_jobs(JOBS)
+
+    def test_lineage(self, client):
+        response = client.get("/api/lineage/kafka_cluster1:stage2", params={'direction': 'up'})
+        assert response.status_code == 200
+        assert distances(response.json()) == {'kafka_cluster1:stage1': 1, 'kafka_cluster1:incoming': 1}
+
+        response = client.get("/api/lineage/kafka_cluster1:incoming", params={'depth': 1})
+        assert distances(response.json()) == {'kafka_cluster1:stage1': 1, 'kafka_cluster1:stage2': 1}
+        assert len(self.fetches) == 1
+
+    def test_cold_queries_off_the_loop(self, client, monkeypatch):
+        offloaded = []
+        run_cpu_bound = main._run_cpu_bound
+        monkeypatch.setattr(main, '_run_cpu_bound',
+                            lambda func, *args: offloaded.append(func.__name__) or run_cpu_bound(func, *args))
+
+        params = {'from': 'kafka_cluster1:incoming', 'to': 'es_cluster1:index1'}
+        client.get("/api/lineage/kafka_cluster1:incoming")
+        client.get("/api/path", params=params)
+        assert offloaded[-2:] == ['closure', 'path']
+        offloaded.clear()
+        # Memoized, so answered right away
+        client.get("/api/lineage/kafka_cluster1:incoming")
+        client.get("/api/path", params=params)
+        assert offloaded == []
+
+    def test_node_ids_with_slashes(self, client, serve_jobs):
+        jobs = [{
+            'job_id': 'job_1', 'name': 'export', 'workers': 1, 'ex': {'_status': 'running'},
+            'operations': [{'_op': 'kafka_reader', 'connection': 'kafka_cluster1', 'topic': 'topic1'},
+                           {'_op': 's3_exporter', 'connection': 's3', 'bucket': 'bucket', 'path': 'a/b'}],
+        }]
+        serve_jobs(jobs)
+        response = client.get("/api/lineage/s3:bucket/a/b", params={'direction': 'up'})
+        assert response.status_code == 200
+        assert distances(response.json()) == {'kafka_cluster1:topic1': 1}
+
+    def test_path(self, client):
+        response = client.get("/api/path", params={'from': 'kafka_cluster1:incoming', 'to': 'es_cluster1:index2'})
+        assert response.status_code == 200
+        assert response.json()['nodes'] == ['kafka_cluster1:incoming', 'kafka_cluster1:stage1', 'es_cluster1:index2']
+
+    @pytest.mark.parametrize('url,params', [
+        ("/api/lineage/kafka_cluster1:bogus", {}),
+        ("/api/path", {'from': 'kafka_cluster1:bogus', 'to': 'es_cluster1:index1'}),
+        ("/api/path", {'from': 'es_cluster1:index1', 'to': 'kafka_cluster1:incoming'}),
+    ])
+    def test_not_found(self, client, url, params):
+        assert client.get(url, params=params).status_code == 404
+
+    def test_bad_parameters(self, client):
+        assert client.get("/api/lineage/kafka_cluster1:incoming", params={'direction': 'sideways'}).status_code == 422
+        assert client.get("/api/lineage/kafka_cluster1:incoming", params={'depth': 0}).status_code == 422
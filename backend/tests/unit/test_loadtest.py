@@ -0,0 +1,82 @@
+import pytest
+import httpx
+
+from app import core, main
+from loadtest.driver import LoadDriver, percentile, refreshes_in_flight
+from loadtest.mock_teraslice import MockTeraslice, create_app
+from tests.fixtures.synthetic_jobs import generate_jobs
+
+
+def mock_client(mock):
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=create_app(mock)),
+                             base_url='http://teraslice')
+
+
+class TestMockTeraslice:
+    @pytest.mark.asyncio
+    async def test_serves_up_to_size_jobs(self):
+        mock = MockTeraslice(generate_jobs(30))
+        async with mock_client(mock) as client:
+            response = await client.get('/jobs', params={'size': 20})
+        assert response.status_code == 200
+        assert response.json() == mock.jobs[:20]
+
+    @pytest.mark.asyncio
+    async def test_error_rate(self):
+        mock = MockTeraslice(generate_jobs(5), error_rate=1.0)
+        async with mock_client(mock) as client:
+            response = await client.get('/jobs')
+        assert response.status_code == 500
+
+    @pytest.mark.asyncio
+    async def test_churn(self):
+        jobs = generate_jobs(100)
+        mock = MockTeraslice(jobs, churn=0.2)
+        async with mock_client(mock) as client:
+            first = (await client.get('/jobs', params={'size': 100})).json()
+            second = (await client.get('/jobs', params={'size': 100})).json()
+        assert first != jobs
+        assert first != second
+        assert len(second) == 100
+        assert mock.requests == 2
+
+
+class TestDriverHelpers:
+    def test_percentile(self):
+        values = list(range(1, 101))
+        assert percentile(values, 50) == 50
+        assert percentile(values, 99) == 99
+        assert percentile([], 50) == 0.0
+
+    def test_refreshes_in_flight(self):
+        text = (
+            '# TYPE teraslice3d_cache_refreshes_in_flight gauge\n'
+            'teraslice3d_cache_refreshes_in_flight{family="jobs"} 1.0\n'
+            'teraslice3d_cache_refreshes_in_flight{family="snapshot"} 0.0\n'
+        )
+        assert refreshes_in_flight(text) == 1.0
+
+
+class TestLoadDriver:
+    @pytest.mark.asyncio
+    async def test_phases_against_mock_teraslice(self, monkeypatch):
+        mock = MockTeraslice(generate_jobs(50), latency=0.2)
+        monkeypatch.setattr(core, '_teraslice_client', lambda: mock_client(mock))
+        monkeypatch.setattr(main.settings, 'refresh_interval', 0.3)
+
+        try:
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app),
+                                         base_url='http://backend') as client:
+                driver = LoadDriver(client, clients=5, duration=1.5, poll_interval=0.02)
+                report = await driver.run()
+        finally:
+            # Cancel the background refreshes while their loop is running
+            main.cache.clear()
+
+        # All cold requests share one upstream fetch
+        assert sum(stats['requests'] for stats in report['cold'].values()) == 5
+        assert report['cold']['/api/pipeline_graph']['p50_ms'] >= 200
+        assert report['warm']['/api/jobs']['errors'] == 0
+        assert report['warm']['/api/pipeline_graph']['throughput_rps'] > 0
+        assert 'refresh' in report
+        assert mock.requests >= 2
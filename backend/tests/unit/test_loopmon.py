@@ -0,0 +1,93 @@
+import pytest
+import asyncio
+import time
+from fastapi.testclient import TestClient
+
+from app.lib.loopmon import LAG_BUCKETS, LoopMonitor
+from app import main
+from app.main import app
+
+
+def block_the_loop(seconds):
+    time.sleep(seconds)
+
+
+class TestLoopMonitor:
+    def test_record_histogram(self):
+        monitor = LoopMonitor()
+        monitor.record(0.0005)
+        monitor.record(0.03)
+        monitor.record(10)
+
+        status = monitor.get_status()
+        assert status['samples'] == 3
+        assert status['lag_seconds']['max'] == 10
+        buckets = {bucket['le']: bucket['count'] for bucket in status['histogram']}
+        # Buckets are cumulative
+        assert buckets[0.001] == 1
+        assert buckets[0.05] == 2
+        assert buckets['inf'] == 3
+        assert len(status['histogram']) == len(LAG_BUCKETS)
+
+    def test_negative_lag_clamped(self):
+        monitor = LoopMonitor()
+        monitor.record(-0.001)
+        assert monitor.get_status()['lag_seconds']['max'] == 0
+
+    @pytest.mark.asyncio
+    async def test_samples_lag(self):
+        monitor = LoopMonitor(interval=0.01)
+        monitor.start()
+        await asyncio.sleep(0.05)
+        block_the_loop(0.1)
+        await asyncio.sleep(0.03)
+        monitor.stop()
+
+        status = monitor.get_status()
+        assert status['samples'] >= 2
+        assert status['lag_seconds']['max'] >= 0.05
+        assert not status['running']
+
+    @pytest.mark.asyncio
+    async def test_debug_mode_captures_blocking_stack(self):
+        monitor = LoopMonitor(interval=0.01, block_threshold=0.05, debug=True)
+        monitor.start()
+        await asyncio.sleep(0.06)
+        block_the_loop(0.3)
+        await asyncio.sleep(0.1)
+        monitor.stop()
+
+        events = monitor.get_status()['blocking_events']
+        assert len(events) >= 1
+        assert events[0]['duration_seconds'] >= 0.2
+        assert any('block_the_loop' in line for line in events[0]['stack'])
+
+    @pytest.mark.asyncio
+    async def test_no_blocking_events_without_debug(self):
+        monitor = LoopMonitor(interval=0.01, block_threshold=0.05)
+        monitor.start()
+        await asyncio.sleep(0.02)
+        block_the_loop(0.1)
+        await asyncio.sleep(0.02)
+        monitor.stop()
+
+        assert monitor.get_status()['blocking_events'] == []
+
+
+class TestEventLoopEndpoint:
+    def test_requires_admin(self, monkeypatch):
+        monkeypatch.setattr(main.settings, 'admin_token', 'secret')
+        client = TestClient(app)
+        assert client.get("/api/debug/event_loop").status_code == 403
+        assert client.get("/api/debug/event_loop", headers={'X-Admin-Token': 'wrong'}).status_code == 403
+
+    def test_event_loop_status_endpoint(self, monkeypatch):
+        monkeypatch.setattr(main.settings, 'admin_token', 'secret')
+        client = TestClient(app)
+        response = client.get("/api/debug/event_loop", headers={'X-Admin-Token': 'secret'})
+
+        assert response.status_code == 200
+        data = response.json()
+        assert "samples" in data
+        assert "histogram" in data
+        assert "blocking_events" in data
@@ -0,0 +1,119 @@
+import pytest
+import asyncio
+import logging
+import sys
+import tracemalloc
+from fastapi.testclient import TestClient
+
+from app import core, main
+from app.lib.memdiag import MemoryDiagnostics, deep_size, rss_bytes
+from app.lib.ts import StorageNode
+
+
+class TestDeepSize:
+    def test_counts_nested_containers(self):
+        inner = ['x' * 1000]
+        outer = {'a': inner}
+        assert deep_size(outer) >= sys.getsizeof(outer) + sys.getsizeof(inner) + 1000
+
+    def test_shared_objects_counted_once(self):
+        shared = 'y' * 10000
+        assert deep_size([shared, shared]) < 2 * sys.getsizeof(shared)
+
+    def test_follows_model_attributes(self):
+        node = StorageNode(id='kafka_cluster1:' + 'z' * 5000, connector_type='KAFKA')
+        assert deep_size(node) > 5000
+
+    def test_rss(self):
+        assert rss_bytes() is None or rss_bytes() > 0
+
+
+class TestMemoryDiagnostics:
+    def setup_method(self):
+        tracemalloc.start()
+
+    def teardown_method(self):
+        tracemalloc.stop()
+
+    def test_growth_between_cycles_is_logged(self, caplog):
+        diagnostics = MemoryDiagnostics(growth_threshold=1024 * 1024)
+        first = diagnostics.check_cycle()
+        assert first['traced_growth_bytes'] is None
+
+        leak = [bytearray(1024) for _ in range(4096)]
+        with caplog.at_level(logging.WARNING, logger='app.lib.memdiag'):
+            second = diagnostics.check_cycle()
+
+        assert second['traced_growth_bytes'] > 4 * 1024 * 1024
+        assert any('test_memdiag.py' in g['location'] for g in second['top_growth'])
+        assert 'Memory grew by' in caplog.text
+        del leak
+
+    def test_small_growth_is_quiet(self, caplog):
+        diagnostics = MemoryDiagnostics(growth_threshold=1024 * 1024 * 1024)
+        diagnostics.check_cycle()
+        with caplog.at_level(logging.WARNING, logger='app.lib.memdiag'):
+            diagnostics.check_cycle()
+        assert caplog.text == ''
+        assert len(diagnostics.cycles) == 2
+
+    def test_status_includes_object_sizes(self):
+        status = MemoryDiagnostics().get_status({'entry': ['a' * 2048]})
+        assert status['tracemalloc']['tracing']
+        assert status['objects']['entry'] > 2048
+
+
+class TestBackgroundSampling:
+    @pytest.mark.asyncio
+    async def test_samples_and_checks_cycles(self):
+        diagnostics = MemoryDiagnostics(sample_interval=0.05)
+        diagnostics.start()
+        try:
+            diagnostics.refresh_completed()
+            await asyncio.sleep(0.2)
+            assert len(diagnostics.rss_samples) >= 2
+            assert len(diagnostics.cycles) == 1
+        finally:
+            diagnostics.stop()
+        assert not tracemalloc.is_tracing()
+
+
+class TestMemoryEndpoint:
+    def setup_method(self):
+        self.client = TestClient(main.app)
+        main.cache.clear()
+
+    def teardown_method(self):
+        main.cache.clear()
+
+    def test_requires_admin(self, monkeypatch):
+        monkeypatch.setattr(main.settings, 'admin_token', 'secret')
+        assert self.client.get("/api/debug/memory").status_code == 403
+
+    def test_disabled(self, monkeypatch):
+        monkeypatch.setattr(main.settings, 'admin_token', 'secret')
+        response = self.client.get("/api/debug/memory", headers={'X-Admin-Token': 'secret'})
+        assert response.status_code == 404
+
+    def test_reports_cache_entry_sizes(self, monkeypatch):
+        monkeypatch.setattr(main.settings, 'admin_token', 'secret')
+        monkeypatch.setattr(core, 'memory_diagnostics', MemoryDiagnostics())
+        main.cache.set('jobs_test', [{'job_id': 'j' * 4096}])
+
+        response = self.client.get("/api/debug/memory", headers={'X-Admin-Token': 'secret'})
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data['objects']['cache:jobs_test'] > 4096
+        assert data['refresh_tasks'] == 0
+
+    @pytest.mark.asyncio
+    async def test_leaves_existing_tracing_running(self):
+        tracemalloc.start()
+        try:
+            diagnostics = MemoryDiagnostics(sample_interval=0.05)
+            diagnostics.start()
+            diagnostics.stop()
+            assert tracemalloc.is_tracing()
+        finally:
+            tracemalloc.stop()
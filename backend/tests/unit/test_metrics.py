@@ -0,0 +1,157 @@
+import pytest
+import httpx
+from fastapi.testclient import TestClient
+
+from app import core, main
+from app.lib.cache import CACHE_REQUESTS, REFRESHES_IN_FLIGHT, CacheManager
+from app.lib.metrics import Counter, Gauge, Histogram, Registry, _Metric, _Value
+
+
+def sample_value(metric, **labels):
+    return metric.labels(**labels).value
+
+
+class TestMetricTypes:
+    def setup_method(self):
+        self.registry = Registry()
+
+    def test_counter_render(self):
+        counter = Counter('requests', 'Requests seen.', ['method'], registry=self.registry)
+        counter.labels(method='GET').inc()
+        counter.labels(method='GET').inc(2)
+
+        output = self.registry.render()
+        assert '# HELP requests Requests seen.' in output
+        assert '# TYPE requests counter' in output
+        assert 'requests_total{method="GET"} 3.0' in output
+
+    def test_gauge_without_labels(self):
+        gauge = Gauge('in_flight', 'In flight.', registry=self.registry)
+        gauge.inc()
+        gauge.inc()
+        gauge.dec()
+        assert 'in_flight 1.0' in self.registry.render()
+
+    def test_gauge_track_inprogress(self):
+        gauge = Gauge('in_flight', 'In flight.', registry=self.registry)
+        with gauge.track_inprogress():
+            assert gauge.labels().value == 1
+        assert gauge.labels().value == 0
+
+    def test_histogram_render(self):
+        histogram = Histogram('latency', 'Latency.', ['outcome'], buckets=(0.1, 1), registry=self.registry)
+        histogram.labels(outcome='success').observe(0.05)
+        histogram.labels(outcome='success').observe(0.5)
+        histogram.labels(outcome='success').observe(5)
+
+        output = self.registry.render()
+        assert 'latency_bucket{outcome="success",le="0.1"} 1.0' in output
+        assert 'latency_bucket{outcome="success",le="1.0"} 2.0' in output
+        assert 'latency_bucket{outcome="success",le="+Inf"} 3.0' in output
+        assert 'latency_sum{outcome="success"} 5.55' in output
+        assert 'latency_count{outcome="success"} 3.0' in output
+
+    def test_label_values_escaped(self):
+        counter = Counter('things', 'Things.', ['name'], registry=self.registry)
+        counter.labels(name='say "hi"\n').inc()
+        assert r'things_total{name="say \"hi\"\n"} 1.0' in self.registry.render()
+
+    def test_wrong_labels_rejected(self):
+        counter = Counter('things', 'Things.', ['name'], registry=self.registry)
+        with pytest.raises(ValueError):
+            counter.labels(other='x')
+
+    def test_duplicate_registration_rejected(self):
+        Counter('things', 'Things.', registry=self.registry)
+        with pytest.raises(ValueError):
+            Counter('things', 'Things.', registry=self.registry)
+
+    def test_incomplete_metric_rejected(self):
+        class Summary(_Metric):
+            type = 'summary'
+
+            def _new_child(self):
+                return _Value()
+
+        with pytest.raises(TypeError):
+            Summary('latency', 'Latency.', registry=self.registry)
+        assert self.registry.render() == '\n'
+
+
+class TestCacheMetrics:
+    def test_hits_misses_and_stale(self, monkeypatch):
+        cache = CacheManager()
+        before = {
+            result: sample_value(CACHE_REQUESTS, family='widgets', result=result)
+            for result in ('hit', 'miss', 'stale')
+        }
+
+        cache.get('widgets_1')
+        cache.set('widgets_1', 'data')
+        cache.get('widgets_1')
+
+        # Past its refresh interval without being refreshed
+        cache._refresh_intervals['widgets_1'] = 10
+        cache.cache['widgets_1'].timestamp -= 20
+        cache.get('widgets_1')
+
+        def delta(result):
+            return sample_value(CACHE_REQUESTS, family='widgets', result=result) - before[result]
+
+        assert (delta('miss'), delta('hit'), delta('stale')) == (1, 1, 1)
+
+    @pytest.mark.asyncio
+    async def test_refreshes_in_flight(self):
+        cache = CacheManager()
+        seen = []
+
+        async def fetch():
+            seen.append(sample_value(REFRESHES_IN_FLIGHT, family='gadgets'))
+            return 'data'
+
+        await cache.load('gadgets_1', fetch)
+        assert seen == [1]
+        assert sample_value(REFRESHES_IN_FLIGHT, family='gadgets') == 0
+
+
+class TestMetricsEndpoint:
+    def setup_method(self):
+        self.client = TestClient(main.app)
+        main.cache.clear()
+
+    def test_metrics_endpoint(self):
+        self.client.get("/api/version")
+        response = self.client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        assert 'teraslice3d_http_request_duration_seconds_count{method="GET",route="/api/version",status="200"}' in response.text
+
+    def test_upstream_and_graph_metrics(self, monkeypatch):
+        jobs = b'''[{"job_id": "job_1", "name": "pipeline_1", "workers": 1,
+                     "ex": {"_status": "running"},
+                     "operations": [{"_op": "kafka_reader", "topic": "t1"},
+                                    {"_op": "elasticsearch_bulk", "index": "i1"}]}]'''
+        monkeypatch.setattr(core, '_teraslice_client',
+                            lambda: httpx.AsyncClient(transport=httpx.MockTransport(
+                                lambda request: httpx.Response(200, content=jobs))))
+
+        assert self.client.get("/api/pipeline_graph").status_code == 200
+        output = self.client.get("/metrics").text
+        main.cache.clear()
+
+        assert 'teraslice3d_upstream_jobs_request_duration_seconds_count{outcome="success"}' in output
+        assert 'teraslice3d_graph_build_duration_seconds_count' in output
+        assert 'teraslice3d_graph_payload_bytes_count' in output
+        assert 'teraslice3d_cache_requests_total{family="jobs",result="miss"}' in output
+
+    def test_upstream_errors_counted_by_outcome(self, monkeypatch):
+        monkeypatch.setattr(core, '_teraslice_client',
+                            lambda: httpx.AsyncClient(transport=httpx.MockTransport(
+                                lambda request: httpx.Response(502))))
+
+        with pytest.raises(httpx.HTTPStatusError):
+            self.client.get("/api/jobs")
+
+        output = self.client.get("/metrics").text
+        assert 'teraslice3d_upstream_jobs_request_duration_seconds_count{outcome="http_error"}' in output
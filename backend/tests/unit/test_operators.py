@@ -0,0 +1,85 @@
+import logging
+from unittest.mock import Mock
+
+from app.lib.operators import OperatorRegistry
+from app.lib.parse_warnings import ParseWarnings
+from app.lib.ts import DESTINATION_OPERATORS, SOURCE_OPERATORS, JobInfo, StorageNode
+from tests.fixtures.teraslice_jobs import unknown_destination_job
+
+
+def job_with(source_op, destination_op, apis=()):
+    return {'job_id': 'job_1', 'operations': [source_op, destination_op], 'apis': list(apis)}
+
+
+class TestOperatorRegistry:
+    def test_exact_names_win_over_patterns(self):
+        registry = OperatorRegistry('source')
+        registry.register(pattern='file')(lambda *args: 'pattern')
+        registry.register('file_reader')(lambda *args: 'exact')
+
+        assert registry.resolve('file_reader')() == 'exact'
+        assert registry.resolve('hdfs_file_reader')() == 'pattern'
+        assert registry.resolve('kafka_reader') is None
+
+    def test_patterns_checked_in_registration_order(self):
+        registry = OperatorRegistry('destination')
+        registry.register(pattern='file')(lambda *args: 'file')
+        registry.register(pattern='s3')(lambda *args: 's3')
+
+        assert registry.resolve('s3_file_sender')() == 'file'
+
+    def test_resolution_is_memoized_until_registration(self):
+        registry = OperatorRegistry('source')
+        assert registry.resolve('custom_reader') is None
+        assert 'custom_reader' in registry.handlers
+
+        registry.register('custom_reader')(lambda *args: 'custom')
+        assert registry.resolve('custom_reader')() == 'custom'
+
+    def test_first_unknown(self):
+        registry = OperatorRegistry('source')
+        assert registry.first_unknown('custom_reader')
+        assert not registry.first_unknown('custom_reader')
+
+
+class TestBuiltinOperators:
+    def test_substring_fallbacks(self):
+        job_info = JobInfo(job_with({'_op': 'hdfs_file_reader', 'path': '/in'},
+                                    {'_op': 'custom_s3_writer', 'bucket': 'b'}), Mock(spec=logging.Logger))
+
+        assert job_info.source == StorageNode(id='default:/in', connector_type='FILE')
+        assert job_info.destinations == [StorageNode(id='default:b', connector_type='S3')]
+
+    def test_in_house_operator(self):
+        @SOURCE_OPERATORS.register('test_in_house_queue_reader')
+        def in_house_queue_reader(job_info, op_type, op, fields, connection):
+            return StorageNode(id=f"{connection}:{fields['queue']}", connector_type='OTHER')
+
+        logger = Mock(spec=logging.Logger)
+        job_info = JobInfo(job_with({'_op': 'test_in_house_queue_reader', '_api_name': 'queue_api'}, {'_op': 'noop'},
+                                    [{'_name': 'queue_api', '_connection': 'queues1', 'queue': 'orders'}]), logger)
+
+        assert job_info.source == StorageNode(id='queues1:orders', connector_type='OTHER')
+        logger.warning.assert_not_called()
+
+
+class TestUnknownOperators:
+    def setup_method(self):
+        DESTINATION_OPERATORS.unknown.clear()
+
+    def test_logged_once_per_process(self):
+        logger = Mock(spec=logging.Logger)
+        for _ in range(3):
+            job_info = JobInfo(unknown_destination_job(), logger)
+
+        assert job_info.destinations[0].id == 'default:custom_mystery_exporter'
+        logger.warning.assert_called_once_with('UNHANDLED DESTINATION OPERATION: custom_mystery_exporter')
+
+    def test_every_job_collected(self):
+        warnings = ParseWarnings()
+        for job_id in ('job_1', 'job_2'):
+            job = unknown_destination_job()
+            job['job_id'] = job_id
+            JobInfo(job, Mock(spec=logging.Logger), warnings)
+
+        assert warnings.report()['warnings'][0]['job_ids'] == ['job_1', 'job_2']
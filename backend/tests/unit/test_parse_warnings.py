@@ -0,0 +1,100 @@
+import pytest
+import httpx
+import json
+import logging
+from unittest.mock import Mock
+from fastapi.testclient import TestClient
+
+from app import core, main
+from app.lib import parse_warnings
+from app.lib.parse_warnings import ParseWarnings
+from app.lib.ts import JobInfo
+from app.core import _process_jobs_to_graph
+from tests.fixtures.teraslice_jobs import kafka_reader_to_elasticsearch_job, unknown_source_job
+
+
+def with_id(job, job_id):
+    job['job_id'] = job_id
+    return job
+
+
+MIXED_JOBS = [
+    with_id(unknown_source_job(), 'job_1'),
+    with_id(unknown_source_job(), 'job_2'),
+    with_id(kafka_reader_to_elasticsearch_job(), 'job_3'),
+]
+
+
+class TestParseWarnings:
+    def test_job_info_collects_instead_of_logging(self):
+        logger = Mock(spec=logging.Logger)
+        warnings = ParseWarnings()
+        JobInfo(unknown_source_job(), logger, warnings)
+
+        logger.warning.assert_not_called()
+        report = warnings.report()
+        assert report['warnings'][0]['operation'] == 'custom_mystery_reader'
+        assert report['warnings'][0]['message'] == 'UNHANDLED SOURCE OPERATION: custom_mystery_reader'
+
+    def test_deduplicated_per_job_and_operation(self):
+        warnings = ParseWarnings()
+        for job_id in ('job_2', 'job_1', 'job_1'):
+            warnings.add(job_id, 'custom_reader', 'UNHANDLED SOURCE OPERATION: custom_reader')
+        warnings.add('job_3', 'kafka_sender', 'kafka_sender missing topic')
+
+        report = warnings.report()
+        assert report['jobs_with_warnings'] == 3
+        assert report['warnings'][0] == {
+            'operation': 'custom_reader',
+            'message': 'UNHANDLED SOURCE OPERATION: custom_reader',
+            'jobs': 2,
+            'job_ids': ['job_1', 'job_2'],
+        }
+
+
+class TestGraphBuildWarnings:
+    def test_one_summary_per_build(self, caplog, monkeypatch):
+        monkeypatch.setattr(parse_warnings, 'latest', {'computed_at': None, 'jobs_with_warnings': 0, 'warnings': []})
+        with caplog.at_level(logging.WARNING, logger='app.core'):
+            _process_jobs_to_graph(MIXED_JOBS)
+            _process_jobs_to_graph(MIXED_JOBS)
+
+        records = [r for r in caplog.records if r.name == 'app.core']
+        assert len(records) == 2
+        assert '2 jobs have parse warnings, 1 distinct (1 new)' in records[0].getMessage()
+        assert '(0 new)' in records[1].getMessage()
+        assert parse_warnings.latest['warnings'][0]['job_ids'] == ['job_1', 'job_2']
+
+    def test_clean_build_logs_nothing(self, caplog):
+        with caplog.at_level(logging.WARNING, logger='app.core'):
+            _process_jobs_to_graph(MIXED_JOBS[2:])
+        assert caplog.records == []
+        assert parse_warnings.latest['warnings'] == []
+
+    def test_debug_lines_not_formatted_unless_enabled(self):
+        class Unprintable(str):
+            def __str__(self):
+                raise AssertionError("formatted a disabled debug message")
+
+        job = with_id(kafka_reader_to_elasticsearch_job(), 'job_1')
+        job['name'] = Unprintable('pipeline')
+        _process_jobs_to_graph([job])
+
+
+class TestParseWarningsEndpoint:
+    def setup_method(self):
+        self.client = TestClient(main.app)
+        main.cache.clear()
+
+    def teardown_method(self):
+        main.cache.clear()
+
+    def test_current_warnings(self, monkeypatch):
+        monkeypatch.setattr(core, '_teraslice_client',
+                            lambda: httpx.AsyncClient(transport=httpx.MockTransport(
+                                lambda request: httpx.Response(200, content=json.dumps(MIXED_JOBS).encode()))))
+
+        data = self.client.get("/api/parse_warnings").json()
+
+        assert data['jobs_with_warnings'] == 2
+        assert data['warnings'][0]['operation'] == 'custom_mystery_reader'
@@ -1,6 +1,13 @@
 import pytest
-from app.main import _process_jobs_to_graph
+import os
+import random
+import subprocess
+import sys
+from pathlib import Path
+
+from app.core import _process_jobs_to_graph, _serialize_graph
 from app.lib.ts import JobInfo
+from tests.fixtures.synthetic_jobs import generate_jobs
 
 
 class TestPipelineGraphProcessing:
@@ -126,7 +133,7 @@ class TestPipelineGraphProcessing:
 
     def test_grafana_url_included_when_setting_is_present(self, monkeypatch):
         """Test that grafana_url is correctly generated for each link when settings.grafana_url is set."""
-        from app.main import settings
+        from app.core import settings
         monkeypatch.setattr(settings, 'grafana_url', 'http://grafana.example.com')
         
         test_job = {
@@ -147,7 +154,7 @@ class TestPipelineGraphProcessing:
 
     def test_grafana_url_omitted_when_setting_is_none(self, monkeypatch):
         """Test that grafana_url is omitted when settings.grafana_url is None."""
-        from app.main import settings
+        from app.core import settings
         monkeypatch.setattr(settings, 'grafana_url', None)
         
         test_job = {
@@ -163,4 +170,44 @@ class TestPipelineGraphProcessing:
         
         result = _process_jobs_to_graph([test_job])
         link = result['links'][0]
-        assert 'grafana_url' not in link
\ No newline at end of file
+        assert 'grafana_url' not in link
+
+GRAPH_DIGEST_SCRIPT = """
+import hashlib
+from app.core import _process_jobs_to_graph, _serialize_graph
+from tests.fixtures.synthetic_jobs import generate_jobs
+print(hashlib.sha256(_serialize_graph(_process_jobs_to_graph(generate_jobs(300, seed=7)))).hexdigest())
+"""
+
+
+class TestDeterministicOutput:
+    def test_independent_of_job_order(self):
+        """Test that the graph doesn't depend on the order jobs are listed in."""
+        jobs = generate_jobs(200, seed=3)
+        shuffled = list(jobs)
+        random.Random(1).shuffle(shuffled)
+
+        assert _serialize_graph(_process_jobs_to_graph(shuffled)) == _serialize_graph(_process_jobs_to_graph(jobs))
+
+    def test_defined_order(self):
+        """Test that links follow job_id order and nodes first appearance."""
+        graph = _process_jobs_to_graph(generate_jobs(200, seed=3))
+        job_ids = [link['job_id'] for link in graph['links']]
+        assert job_ids == sorted(job_ids)
+
+        first_seen = {}
+        for link in graph['links']:
+            first_seen.setdefault(link['source'], len(first_seen))
+            first_seen.setdefault(link['target'], len(first_seen))
+        linked = [node.id for node in graph['nodes'] if node.id in first_seen]
+        assert linked == sorted(linked, key=first_seen.get)
+
+    def test_byte_identical_across_processes(self):
+        """Test that processes with different hash seeds build identical graphs."""
+        backend_dir = Path(__file__).parents[2]
+        digests = {
+            subprocess.run([sys.executable, '-c', GRAPH_DIGEST_SCRIPT], cwd=backend_dir, check=True,
+                           capture_output=True, text=True, env={**os.environ, 'PYTHONHASHSEED': seed}).stdout
+            for seed in ('1', '2', '3')
+        }
+        assert len(digests) == 1
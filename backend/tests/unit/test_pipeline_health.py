@@ -0,0 +1,139 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from app import main
+from app.lib import health, parse_warnings
+from app.lib.metrics import REGISTRY
+from app.core import _process_jobs_to_graph
+from tests.fixtures.teraslice_jobs import make_job
+
+
+PIPELINE_JOBS = [
+    # incoming -> stage1 -> index1, plus an orphaned topic at each end
+    make_job('job_1', 'incoming', 'stage1', workers=4),
+    make_job('job_2', 'stage1', 'index1', workers=2, status='failing'),
+    make_job('job_3', 'unfed', 'index2', workers=1, status='stopped'),
+    make_job('job_4', 'stage1', 'dead-end', workers=3, connection='kafka_cluster2'),
+]
+
+
+class TestComputePipelineHealth:
+    def test_jobs_by_status(self):
+        report = health.compute_pipeline_health(PIPELINE_JOBS, _process_jobs_to_graph(PIPELINE_JOBS))
+        assert report['jobs_by_status'] == {'running': 2, 'failing': 1, 'stopped': 1}
+
+    def test_workers_by_connection(self):
+        report = health.compute_pipeline_health(PIPELINE_JOBS, _process_jobs_to_graph(PIPELINE_JOBS))
+        assert report['workers_by_connection'] == {
+            'kafka_cluster1': 4 + 2 + 1,
+            'es_cluster1': 2 + 1,
+            'kafka_cluster2': 3,
+        }
+
+    def test_dead_end_and_sourceless_topics(self):
+        report = health.compute_pipeline_health(PIPELINE_JOBS, _process_jobs_to_graph(PIPELINE_JOBS))
+        # kafka_cluster2:stage1 is read by job_4 but nothing writes it there
+        assert report['dead_end_topics'] == ['kafka_cluster2:dead-end']
+        assert report['sourceless_topics'] == [
+            'kafka_cluster1:incoming', 'kafka_cluster1:unfed', 'kafka_cluster2:stage1'
+        ]
+
+    def test_elasticsearch_indices_are_not_dead_ends(self):
+        jobs = [make_job('job_1', 'topic', 'index1')]
+        report = health.compute_pipeline_health(jobs, _process_jobs_to_graph(jobs))
+        assert report['dead_end_topics'] == []
+
+    def test_empty(self):
+        report = health.compute_pipeline_health([], {'nodes': [], 'links': []})
+        assert report['jobs_by_status'] == {}
+        assert report['dead_end_topics'] == []
+
+
+class TestPipelineHealthExport:
+    def test_gauges_replaced_each_refresh(self):
+        health.export_pipeline_health(
+            health.compute_pipeline_health(PIPELINE_JOBS, _process_jobs_to_graph(PIPELINE_JOBS))
+        )
+        output = REGISTRY.render()
+        assert 'teraslice3d_pipeline_jobs{status="failing"} 1.0' in output
+        assert 'teraslice3d_pipeline_workers{connection="kafka_cluster1"} 7.0' in output
+        assert 'teraslice3d_pipeline_dead_end_topics{connection="kafka_cluster2"} 1.0' in output
+        assert 'teraslice3d_pipeline_sourceless_topics{connection="kafka_cluster1"} 2.0' in output
+
+        jobs = PIPELINE_JOBS[:1]
+        health.export_pipeline_health(health.compute_pipeline_health(jobs, _process_jobs_to_graph(jobs)))
+        output = REGISTRY.render()
+        assert 'status="failing"' not in output
+        assert 'teraslice3d_pipeline_dead_end_topics{connection="kafka_cluster1"} 1.0' in output
+
+
+class TestPipelineHealthEndpoint:
+    def test_computed_once_per_refresh(self, client, serve_jobs, monkeypatch):
+        fetches = serve_jobs(PIPELINE_JOBS)
+        computed = []
+        original = health.compute_pipeline_health
+        monkeypatch.setattr(health, 'compute_pipeline_health',
+                            lambda *args: computed.append(1) or original(*args))
+
+        response = client.get("/api/pipeline_health")
+        client.get("/api/pipeline_graph")
+        client.get("/api/pipeline_health")
+
+        assert response.status_code == 200
+        assert response.json()['dead_end_topics'] == ['kafka_cluster2:dead-end']
+        assert len(fetches) == 1
+        assert len(computed) == 1
+
+
+class TestGraphBuilds:
+    @pytest.fixture(autouse=True)
+    def fresh_memo(self, monkeypatch):
+        monkeypatch.setattr(main, '_graph_memo', {**main._graph_memo, 'jobs_data': None, 'generation': 0})
+        monkeypatch.setattr(health, 'latest', None)
+        monkeypatch.setattr(parse_warnings, 'latest', parse_warnings.latest)
+
+    def slow_builds(self, monkeypatch, seconds):
+        """Have graph builds take `seconds[id(jobs)]` (or no) extra time,
+        returning the jobs built."""
+        built = []
+        original = main._build_pipeline_graph
+
+        def build(jobs):
+            built.append(jobs)
+            time.sleep(seconds.get(id(jobs), 0))
+            return original(jobs)
+
+        monkeypatch.setattr(main, '_build_pipeline_graph', build)
+        return built
+
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_share_a_build(self, monkeypatch):
+        jobs = list(PIPELINE_JOBS)
+        built = self.slow_builds(monkeypatch, {id(jobs): 0.05})
+
+        results = await asyncio.gather(*(main._get_pipeline_graph_json(jobs) for _ in range(20)))
+        assert built == [jobs]
+        assert all(result is results[0] for result in results)
+        assert main._graph_memo['jobs_data'] is jobs
+        assert main._graph_builds == {}
+
+    @pytest.mark.asyncio
+    async def test_older_build_finishing_last_is_dropped(self, monkeypatch):
+        old, new = PIPELINE_JOBS, PIPELINE_JOBS[:1]
+        self.slow_builds(monkeypatch, {id(old): 0.2})
+
+        old_build = asyncio.ensure_future(main._get_pipeline_graph_json(old))
+        await asyncio.sleep(0.05)
+        await main._get_pipeline_graph_json(new)
+        version = main._graph_memo['version']
+        old_json = await old_build
+
+        # The older jobs' requests still get their graph...
+        assert len(json.loads(old_json)['links']) == 4
+        # ...but it and its reports don't replace the newer ones
+        assert main._graph_memo['jobs_data'] is new
+        assert main._graph_memo['version'] == version
+        assert health.latest['jobs_by_status'] == {'running': 1}
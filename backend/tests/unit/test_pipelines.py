@@ -0,0 +1,142 @@
+import json
+
+import pytest
+
+from app import main
+from app.lib.pipelines import PipelineIndex, find_cycles, label_pipelines
+from app.core import _process_jobs_to_graph
+from tests.fixtures.teraslice_jobs import make_job
+
+
+JOBS = [
+    # b -> c -> d, plus a job joining a -> c
+    make_job('job_1', 'b', 'c', workers=2),
+    make_job('job_2', 'c', 'd', workers=3, status='failing'),
+    make_job('job_3', 'a', 'c', workers=1),
+    # x -> y -> x loops, and z loops on itself
+    make_job('job_4', 'x', 'y'),
+    make_job('job_5', 'y', 'x', status='stopped'),
+    make_job('job_6', 'z', 'z'),
+]
+
+
+@pytest.fixture
+def graph():
+    return _process_jobs_to_graph(JOBS)
+
+
+class TestLabelPipelines:
+    def test_pipeline_of_each_node(self, graph):
+        # Named after the pipeline's smallest node id
+        assert label_pipelines(graph['nodes'], graph['links']) == {
+            'kafka_cluster1:a': 'kafka_cluster1:a',
+            'kafka_cluster1:b': 'kafka_cluster1:a',
+            'kafka_cluster1:c': 'kafka_cluster1:a',
+            'kafka_cluster1:d': 'kafka_cluster1:a',
+            'kafka_cluster1:x': 'kafka_cluster1:x',
+            'kafka_cluster1:y': 'kafka_cluster1:x',
+            'kafka_cluster1:z': 'kafka_cluster1:z',
+        }
+
+    def test_graph_left_alone(self, graph):
+        label_pipelines(graph['nodes'], graph['links'])
+        assert not any('pipeline_id' in link for link in graph['links'])
+
+
+class TestFindCycles:
+    def test_cycles(self):
+        adjacency = {'a': ['b'], 'b': ['c', 'd'], 'c': ['a'], 'd': ['d'], 'e': ['a']}
+        # Found in reverse topological order
+        assert find_cycles('abcde', adjacency) == [['d'], ['a', 'b', 'c']]
+
+    def test_acyclic(self):
+        assert find_cycles('abc', {'a': ['b', 'c'], 'b': ['c']}) == []
+
+    def test_long_chain(self):
+        # Deeper than the recursion limit
+        nodes = list(range(5000))
+        adjacency = {i: [i + 1] for i in nodes[:-1]}
+        adjacency[nodes[-1]] = [0]
+        assert find_cycles(nodes, adjacency) == [nodes]
+
+
+class TestPipelineIndex:
+    def test_summaries(self, graph):
+        summaries = {summary['pipeline_id']: summary for summary in PipelineIndex(graph).summaries}
+        assert summaries['kafka_cluster1:a'] == {
+            'pipeline_id': 'kafka_cluster1:a',
+            'nodes': 4,
+            'jobs': 3,
+            'workers': 6,
+            'statuses': {'running': 2, 'failing': 1},
+            'cycles': [],
+        }
+        assert summaries['kafka_cluster1:x']['cycles'] == [['kafka_cluster1:x', 'kafka_cluster1:y']]
+        assert summaries['kafka_cluster1:z']['cycles'] == [['kafka_cluster1:z']]
+
+    def test_subgraph(self, graph):
+        index = PipelineIndex(graph)
+        subgraph = index.subgraph('kafka_cluster1:x')
+        assert [node.id for node in subgraph['nodes']] == ['kafka_cluster1:x', 'kafka_cluster1:y']
+        assert [link['job_id'] for link in subgraph['links']] == ['job_4', 'job_5']
+        assert index.pipeline_of['kafka_cluster1:y'] == 'kafka_cluster1:x'
+
+        with pytest.raises(KeyError):
+            index.subgraph('kafka_cluster1:b')
+
+    def test_labels(self, graph):
+        index = PipelineIndex(graph)
+        assert not index.labels_memoized()
+        labels = json.loads(index.labels_json())
+        assert index.labels_memoized()
+        assert labels['nodes'] == index.pipeline_of
+        assert labels['jobs'] == {
+            'job_1': 'kafka_cluster1:a', 'job_2': 'kafka_cluster1:a', 'job_3': 'kafka_cluster1:a',
+            'job_4': 'kafka_cluster1:x', 'job_5': 'kafka_cluster1:x', 'job_6': 'kafka_cluster1:z',
+        }
+
+
+class TestPipelineEndpoints:
+    @pytest.fixture(autouse=True)
+    def teraslice(self, serve_jobs):
+        serve_jobs(JOBS)
+
+    def test_pipelines(self, client):
+        response = client.get("/api/pipelines")
+        assert response.status_code == 200
+        assert [p['pipeline_id'] for p in response.json()['pipelines']] == [
+            'kafka_cluster1:a', 'kafka_cluster1:x', 'kafka_cluster1:z',
+        ]
+
+    def test_one_pipeline(self, client):
+        response = client.get("/api/pipelines/kafka_cluster1:x")
+        assert response.status_code == 200
+        assert response.headers['content-type'] == 'application/json'
+        assert [link['job_id'] for link in response.json()['links']] == ['job_4', 'job_5']
+
+        assert client.get("/api/pipelines/kafka_cluster1:bogus").status_code == 404
+
+    def test_labels(self, client):
+        response = client.get("/api/pipeline_labels")
+        assert response.status_code == 200
+        labels = response.json()
+        graph = client.get("/api/pipeline_graph").json()
+        # Every node and link of the graph is labelled
+        assert {node['id'] for node in graph['nodes']} == set(labels['nodes'])
+        assert all(labels['jobs'][link['job_id']] == labels['nodes'][link['source']] for link in graph['links'])
+        assert labels['nodes']['kafka_cluster1:y'] == 'kafka_cluster1:x'
+
+    def test_labelled_only_when_asked_for(self, client, monkeypatch):
+        labelled = []
+        original = main.pipelines.label_pipelines
+        monkeypatch.setattr(main.pipelines, 'label_pipelines',
+                            lambda *args: labelled.append(1) or original(*args))
+
+        graph = client.get("/api/pipeline_graph").json()
+        assert {'id': 'kafka_cluster1:a', 'connector_type': 'KAFKA'} in graph['nodes']
+        assert not any('pipeline_id' in link for link in graph['links'])
+        assert labelled == []
+
+        client.get("/api/pipelines")
+        client.get("/api/pipelines/kafka_cluster1:a")
+        assert labelled == [1]
@@ -0,0 +1,182 @@
+import asyncio
+import contextvars
+
+import pytest
+import httpx
+import json
+import time
+from fastapi.testclient import TestClient
+
+from app import core, main
+from app.lib import profiling
+from app.lib.profiling import ProfilerBusy, ProfileSession
+
+
+TEST_JOBS = [{
+    'job_id': 'job_1',
+    'name': 'pipeline_1',
+    'workers': 1,
+    'ex': {'_status': 'running'},
+    'operations': [
+        {'_op': 'kafka_reader', 'topic': 'topic_1'},
+        {'_op': 'elasticsearch_bulk', 'index': 'index_1'}
+    ]
+}]
+
+
+def busy_work(seconds=0.05):
+    end = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < end:
+        total += inner_work()
+    return total
+
+
+def inner_work():
+    return sum(range(100))
+
+
+def function_names(nodes):
+    for node in nodes:
+        yield node['function']
+        yield from function_names(node['children'])
+
+
+class TestProfileSession:
+    def test_cprofile_report(self):
+        session = ProfileSession('cprofile')
+        assert session.run(busy_work, 0.01) > 0
+
+        report = session.report()
+        assert report['mode'] == 'cprofile'
+        assert report['profiled_seconds'] >= 0.01
+        assert any(f['function'].startswith('busy_work (') for f in report['top_functions'])
+        names = list(function_names(report['call_tree']))
+        assert any(name.startswith('inner_work (') for name in names)
+
+    def test_sample_report(self):
+        session = ProfileSession('sample', sample_interval=0.001)
+        session.run(busy_work, 0.1)
+
+        report = session.report()
+        assert report['mode'] == 'sample'
+        busy = next(f for f in report['top_functions'] if f['function'].startswith('busy_work ('))
+        assert busy['total_samples'] > 0
+        assert busy['total_percent'] > 50
+        assert any(name.startswith('busy_work (') for name in function_names(report['call_tree']))
+
+    def test_unknown_mode(self):
+        with pytest.raises(ValueError):
+            ProfileSession('perf')
+
+    def test_one_session_at_a_time(self):
+        with ProfileSession('sample').activate():
+            with pytest.raises(ProfilerBusy):
+                with ProfileSession('sample').activate():
+                    pass
+
+    def test_current_only_while_active(self):
+        session = ProfileSession('sample')
+        with session.activate():
+            assert profiling.current_session() is session
+            # e.g. a task started during the session
+            context = contextvars.copy_context()
+        assert profiling.current_session() is None
+        assert context.run(profiling.current_session) is None
+
+    def test_save(self, tmp_path):
+        deterministic = ProfileSession('cprofile')
+        deterministic.run(busy_work, 0.01)
+        assert deterministic.save(tmp_path).suffix == '.prof'
+
+        sampled = ProfileSession('sample')
+        sampled.run(busy_work, 0.05)
+        folded = sampled.save(tmp_path)
+        assert folded.suffix == '.folded'
+        assert 'busy_work (test_profiling.py:' in folded.read_text()
+
+
+class TestProfilingEndpoint:
+    def setup_method(self):
+        self.client = TestClient(main.app)
+        main.cache.clear()
+
+    def teardown_method(self):
+        main.cache.clear()
+
+    @pytest.fixture(autouse=True)
+    def mock_teraslice(self, monkeypatch):
+        self.fetches = []
+
+        def handler(request):
+            self.fetches.append(request)
+            return httpx.Response(200, content=json.dumps(TEST_JOBS).encode())
+
+        monkeypatch.setattr(core, '_teraslice_client',
+                            lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+
+    def enable(self, monkeypatch, **settings):
+        monkeypatch.setattr(main.settings, 'profiling_enabled', True)
+        monkeypatch.setattr(main.settings, 'admin_token', 'secret')
+        for name, value in settings.items():
+            monkeypatch.setattr(main.settings, name, value)
+
+    def test_header_ignored_when_disabled(self):
+        response = self.client.get("/api/pipeline_graph", headers={'X-Profile': 'cprofile'})
+        assert response.status_code == 200
+        assert 'nodes' in response.json()
+
+    def test_requires_admin_token(self, monkeypatch):
+        self.enable(monkeypatch)
+        response = self.client.get("/api/pipeline_graph",
+                                   headers={'X-Profile': 'cprofile', 'X-Admin-Token': 'wrong'})
+        assert response.status_code == 403
+
+    def test_profiles_graph_build(self, monkeypatch):
+        self.enable(monkeypatch)
+        response = self.client.get("/api/pipeline_graph",
+                                   headers={'X-Profile': 'cprofile', 'X-Admin-Token': 'secret'})
+
+        assert response.status_code == 200
+        report = response.json()
+        assert report['target'] == 'request'
+        assert report['jobs'] == 1
+        assert any(f['function'].startswith('_process_jobs_to_graph (') for f in report['top_functions'])
+
+    def test_refresh_target_fetches_and_saves(self, monkeypatch, tmp_path):
+        self.enable(monkeypatch, profile_dir=tmp_path)
+        self.client.get("/api/pipeline_graph")
+        response = self.client.get("/api/pipeline_graph", headers={
+            'X-Profile': 'sample', 'X-Admin-Token': 'secret',
+            'X-Profile-Target': 'refresh', 'X-Profile-Output': 'file',
+        })
+
+        assert response.status_code == 200
+        assert len(self.fetches) == 2
+        assert response.json()['saved_to'].endswith('.folded')
+        assert len(list(tmp_path.iterdir())) == 1
+
+    @pytest.mark.asyncio
+    async def test_later_refreshes_not_profiled(self, monkeypatch):
+        self.enable(monkeypatch, refresh_interval=0.01)
+        profiled = []
+        run = ProfileSession.run
+        monkeypatch.setattr(ProfileSession, 'run',
+                            lambda session, func, *args: profiled.append(func) or run(session, func, *args))
+
+        # Fetches the jobs, scheduling their background refresh
+        await main._profile_pipeline_graph('cprofile', 'request', 'response')
+        assert profiled
+        profiled.clear()
+        fetches = len(self.fetches)
+        await asyncio.sleep(0.1)
+        main.cache.clear()
+
+        assert len(self.fetches) > fetches
+        assert profiled == []
+
+    def test_bad_mode(self, monkeypatch):
+        self.enable(monkeypatch)
+        response = self.client.get("/api/pipeline_graph",
+                                   headers={'X-Profile': 'perf', 'X-Admin-Token': 'secret'})
+        assert response.status_code == 400
@@ -0,0 +1,68 @@
+import pytest
+import httpx
+import json
+from fastapi.testclient import TestClient
+
+from app import core, main
+from app.lib.schema import JobSchemaError, decode_jobs
+from tests.fixtures.synthetic_jobs import generate_jobs
+from tests.fixtures.teraslice_jobs import empty_operations_job, kafka_reader_to_elasticsearch_job
+
+
+class TestDecodeJobs:
+    def test_full_documents_decoded(self):
+        jobs = generate_jobs(200)
+        assert decode_jobs(json.dumps(jobs).encode()) == jobs
+
+    def test_missing_status_names_field(self):
+        job = kafka_reader_to_elasticsearch_job()
+        del job['ex']['_status']
+
+        with pytest.raises(JobSchemaError, match=r"missing required field `_status` - at `\$\[1\]\.ex`"):
+            decode_jobs(json.dumps([kafka_reader_to_elasticsearch_job(), job]).encode())
+
+    def test_wrong_type(self):
+        job = {**kafka_reader_to_elasticsearch_job(), 'workers': 'ten'}
+        with pytest.raises(JobSchemaError, match=r"Expected `int`, got `str` - at `\$\[0\]\.workers`"):
+            decode_jobs(json.dumps([job]).encode())
+
+    def test_job_without_operations(self):
+        with pytest.raises(JobSchemaError, match=r"operations"):
+            decode_jobs(json.dumps([empty_operations_job()]).encode())
+
+    def test_not_json(self):
+        with pytest.raises(JobSchemaError, match="isn't valid JSON"):
+            decode_jobs(b'<html>Bad Gateway</html>')
+
+    def test_unvalidated(self):
+        assert decode_jobs(b'[{"job_id": "job_1"}]', validate=False) == [{'job_id': 'job_1'}]
+
+
+class TestSchemaDriftResponse:
+    def setup_method(self):
+        self.client = TestClient(main.app)
+        main.cache.clear()
+
+    def teardown_method(self):
+        main.cache.clear()
+
+    def test_bad_gateway_with_reason(self, monkeypatch):
+        job = kafka_reader_to_elasticsearch_job()
+        del job['operations'][0]['_op']
+        monkeypatch.setattr(core, '_teraslice_client',
+                            lambda: httpx.AsyncClient(transport=httpx.MockTransport(
+                                lambda request: httpx.Response(200, content=json.dumps([job]).encode()))))
+
+        response = self.client.get("/api/pipeline_graph")
+
+        assert response.status_code == 502
+        assert "missing required field `_op` - at `$[0].operations[0]`" in response.json()['detail']
+
+    def test_other_execution_fields_not_validated(self, monkeypatch):
+        monkeypatch.setattr(core, '_teraslice_client',
+                            lambda: httpx.AsyncClient(transport=httpx.MockTransport(
+                                lambda request: httpx.Response(200, content=b'[{"job_id": "job_1"}]'))))
+
+        response = self.client.get("/api/jobs", params={'ex': '_failureReason'})
+
+        assert response.json() == [{'job_id': 'job_1'}]
@@ -0,0 +1,89 @@
+import pytest
+
+from app.lib.search import SearchIndex
+from app.core import _process_jobs_to_graph
+from tests.fixtures.teraslice_jobs import make_job
+
+
+JOBS = [
+    make_job('a1b2', 'proxy-incoming', 'proxy-v1', name='Proxy-Indexer', destination_op='elasticsearch_bulk'),
+    make_job('c3d4', 'dns-incoming', 'dns-v1', status='failing', name='dns-indexer',
+             destination_op='elasticsearch_bulk'),
+    make_job('e5f6', 'ünicode', 'ü-v1', name='ünicode-indexer', destination_op='elasticsearch_bulk'),
+]
+
+
+@pytest.fixture
+def index():
+    return SearchIndex(_process_jobs_to_graph(JOBS))
+
+
+def found(results):
+    return [(result['type'], result['id'], result['matched']) for result in results]
+
+
+class TestSearchIndex:
+    def test_prefix_of_ids_and_names(self, index):
+        # Alphabetically by the term matched
+        assert found(index.search('proxy')) == [
+            ('node', 'kafka_cluster1:proxy-incoming', 'prefix'),
+            ('job', 'a1b2', 'prefix'),
+            ('node', 'es_cluster1:proxy-v1', 'prefix'),
+        ]
+        assert found(index.search('es_cluster1:d')) == [('node', 'es_cluster1:dns-v1', 'prefix')]
+
+    def test_substring_after_prefix(self, index):
+        assert found(index.search('ncoming')) == [
+            ('node', 'kafka_cluster1:dns-incoming', 'substring'),
+            ('node', 'kafka_cluster1:proxy-incoming', 'substring'),
+        ]
+        # Prefix matches come first, and each entry only once
+        assert found(index.search('dns')) == [
+            ('node', 'kafka_cluster1:dns-incoming', 'prefix'),
+            ('job', 'c3d4', 'prefix'),
+            ('node', 'es_cluster1:dns-v1', 'prefix'),
+        ]
+
+    def test_case_insensitive(self, index):
+        assert found(index.search('PROXY-INDEX')) == [('job', 'a1b2', 'prefix')]
+        assert found(index.search('-Indexer')) == [
+            ('job', 'c3d4', 'substring'), ('job', 'a1b2', 'substring'), ('job', 'e5f6', 'substring'),
+        ]
+
+    def test_short_queries_only_match_prefixes(self, index):
+        assert found(index.search('v1')) == []
+        assert [result['id'] for result in index.search('c3')] == ['c3d4']
+
+    def test_non_ascii(self, index):
+        assert [result['id'] for result in index.search('ünic')] == ['kafka_cluster1:ünicode', 'e5f6']
+        assert [result['id'] for result in index.search('1:ün')] == ['kafka_cluster1:ünicode']
+
+    def test_entries(self, index):
+        node, = index.search('es_cluster1:dns')
+        assert node == {'type': 'node', 'id': 'es_cluster1:dns-v1', 'connector_type': 'ES', 'matched': 'prefix'}
+        job, = index.search('c3d4')
+        assert job == {'type': 'job', 'id': 'c3d4', 'name': 'dns-indexer', 'status': 'failing', 'matched': 'prefix'}
+
+    def test_limit(self, index):
+        assert len(index.search('indexer', limit=2)) == 2
+        assert len(index.search('e', limit=1)) == 1
+
+    def test_no_matches(self, index):
+        assert index.search('nothing') == []
+        assert SearchIndex({'nodes': [], 'links': []}).search('anything') == []
+
+
+class TestSearchEndpoint:
+    @pytest.fixture(autouse=True)
+    def teraslice(self, serve_jobs):
+        serve_jobs(JOBS)
+
+    def test_search(self, client):
+        response = client.get("/api/search", params={'q': 'dns', 'limit': 2})
+        assert response.status_code == 200
+        assert response.json()['q'] == 'dns'
+        assert [result['id'] for result in response.json()['results']] == ['kafka_cluster1:dns-incoming', 'c3d4']
+
+    @pytest.mark.parametrize('params', [{}, {'q': ''}, {'q': 'dns', 'limit': 0}])
+    def test_bad_parameters(self, client, params):
+        assert client.get("/api/search", params=params).status_code == 422
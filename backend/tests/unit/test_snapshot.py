@@ -0,0 +1,211 @@
+import pytest
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+from fastapi.testclient import TestClient
+
+from app import core, main
+from app.lib.snapshot import HEADER, LeaderLock, SnapshotStore
+
+
+class TestSnapshotStore:
+    def test_read_missing_snapshot(self, tmp_path):
+        store = SnapshotStore(tmp_path)
+        assert store.read("jobs") is None
+
+    def test_publish_and_read(self, tmp_path):
+        store = SnapshotStore(tmp_path)
+        version = store.publish("jobs", b'[{"job_id": "a"}]')
+
+        snapshot = store.read("jobs")
+        assert version == 1
+        assert snapshot.version == 1
+        assert isinstance(snapshot.payload, memoryview)
+        assert bytes(snapshot.payload) == b'[{"job_id": "a"}]'
+        assert snapshot.age() < 1
+
+    def test_versions_increase(self, tmp_path):
+        store = SnapshotStore(tmp_path)
+        store.publish("jobs", b"1")
+        store.publish("jobs", b"22")
+
+        snapshot = store.read("jobs")
+        assert snapshot.version == 2
+        assert bytes(snapshot.payload) == b"22"
+
+    def test_reader_in_other_store_sees_new_version(self, tmp_path):
+        """A reader (as in another worker) picks up each publish."""
+        writer = SnapshotStore(tmp_path)
+        reader = SnapshotStore(tmp_path)
+
+        writer.publish("graph", b'{"nodes": []}')
+        first = reader.read("graph")
+        writer.publish("graph", b'{"nodes": [1]}')
+        second = reader.read("graph")
+
+        assert (first.version, second.version) == (1, 2)
+        # The view handed out earlier still points at the old, intact mapping
+        assert bytes(first.payload) == b'{"nodes": []}'
+        assert bytes(second.payload) == b'{"nodes": [1]}'
+
+    def test_unchanged_file_is_not_remapped(self, tmp_path):
+        store = SnapshotStore(tmp_path)
+        store.publish("jobs", b"payload")
+        assert store.read("jobs") is store.read("jobs")
+
+    def test_corrupt_file_rejected(self, tmp_path):
+        store = SnapshotStore(tmp_path)
+        store.path("jobs").write_bytes(b"x" * HEADER.size)
+        with pytest.raises(ValueError):
+            store.read("jobs")
+
+
+class TestLeaderLock:
+    def test_only_one_leader(self, tmp_path):
+        first = LeaderLock(tmp_path / "leader.lock")
+        second = LeaderLock(tmp_path / "leader.lock")
+
+        assert first.try_acquire()
+        assert first.held
+        assert not second.try_acquire()
+
+        first.release()
+        assert not first.held
+        assert second.try_acquire()
+        second.release()
+
+
+class TestSnapshotEndpoints:
+    def setup_method(self):
+        self.client = TestClient(main.app)
+        main.cache.clear()
+
+    def test_pipeline_graph_served_from_snapshot(self, tmp_path, monkeypatch):
+        store = SnapshotStore(tmp_path)
+        monkeypatch.setattr(core, "snapshots", store)
+        graph = {"nodes": [{"id": "kafka:topic", "connector_type": "KAFKA"}], "links": []}
+        store.publish(main.PIPELINE_GRAPH_SNAPSHOT, json.dumps(graph).encode())
+
+        async def should_not_fetch(*args, **kwargs):
+            raise AssertionError("snapshot followers should not call Teraslice")
+        monkeypatch.setattr(main, "_fetch_jobs", should_not_fetch)
+
+        response = self.client.get("/api/pipeline_graph")
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/json"
+        assert response.json() == graph
+
+    def test_jobs_served_from_snapshot(self, tmp_path, monkeypatch):
+        store = SnapshotStore(tmp_path)
+        monkeypatch.setattr(core, "snapshots", store)
+        store.publish(main._jobs_cache_key(**main.DEFAULT_JOBS_PARAMS), b'[{"job_id": "a"}]')
+
+        response = self.client.get("/api/jobs")
+        assert response.json() == [{"job_id": "a"}]
+
+    @pytest.mark.asyncio
+    async def test_refresh_publishes_jobs_and_graph(self, tmp_path, monkeypatch):
+        store = SnapshotStore(tmp_path)
+        monkeypatch.setattr(core, "snapshots", store)
+        jobs = [{
+            'job_id': 'job_1',
+            'name': 'pipeline_1',
+            'workers': 2,
+            'ex': {'_status': 'running'},
+            'operations': [
+                {'_op': 'kafka_reader', 'topic': 'topic_1'},
+                {'_op': 'elasticsearch_bulk', 'index': 'index_1'}
+            ]
+        }]
+
+        async def fetch(**kwargs):
+            return jobs
+        monkeypatch.setattr(core, "_fetch_jobs_from_api", fetch)
+
+        await main._refresh_snapshots()
+
+        jobs_snapshot = store.read(main._jobs_cache_key(**main.DEFAULT_JOBS_PARAMS))
+        graph_snapshot = store.read(main.PIPELINE_GRAPH_SNAPSHOT)
+        assert json.loads(bytes(jobs_snapshot.payload)) == jobs
+        graph = json.loads(bytes(graph_snapshot.payload))
+        assert {node['id'] for node in graph['nodes']} == {'default:topic_1', 'default:index_1'}
+        assert graph['links'][0]['job_id'] == 'job_1'
+
+
+class TestSnapshotReaderMode:
+    def setup_method(self):
+        self.client = TestClient(main.app)
+        main.cache.clear()
+
+    def test_reader_returns_503_without_snapshot(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(core, "snapshots", SnapshotStore(tmp_path))
+        monkeypatch.setattr(main.settings, "snapshot_mode", "reader")
+
+        async def should_not_fetch(*args, **kwargs):
+            raise AssertionError("readers must never call Teraslice")
+        monkeypatch.setattr(main, "_fetch_jobs", should_not_fetch)
+
+        assert self.client.get("/api/pipeline_graph").status_code == 503
+        assert self.client.get("/api/jobs").status_code == 503
+
+    def test_reader_serves_old_snapshot(self, tmp_path, monkeypatch):
+        store = SnapshotStore(tmp_path)
+        monkeypatch.setattr(core, "snapshots", store)
+        monkeypatch.setattr(main.settings, "snapshot_mode", "reader")
+        monkeypatch.setattr(main.settings, "cache_ttl", 0)
+        store.publish(main.PIPELINE_GRAPH_SNAPSHOT, b'{"nodes": [], "links": []}')
+
+        response = self.client.get("/api/pipeline_graph")
+        assert response.status_code == 200
+        assert response.headers["x-snapshot-version"] == "1"
+
+    def test_gzip_variant_served_when_accepted(self, tmp_path, monkeypatch):
+        store = SnapshotStore(tmp_path)
+        monkeypatch.setattr(core, "snapshots", store)
+        graph = {"nodes": [{"id": "default:topic", "connector_type": "KAFKA"}], "links": []}
+        core._publish_snapshot(main.PIPELINE_GRAPH_SNAPSHOT, json.dumps(graph).encode())
+
+        response = self.client.get("/api/pipeline_graph", headers={"Accept-Encoding": "gzip"})
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.json() == graph
+
+        response = self.client.get("/api/pipeline_graph", headers={"Accept-Encoding": "identity"})
+        assert "content-encoding" not in response.headers
+        assert response.json() == graph
+
+
+class TestRefresher:
+    @pytest.mark.asyncio
+    async def test_run_once_publishes_snapshots(self, tmp_path, monkeypatch):
+        from app import refresher
+
+        store = SnapshotStore(tmp_path)
+        monkeypatch.setattr(core, "snapshots", store)
+        monkeypatch.setattr(core, "snapshot_leader", LeaderLock(tmp_path / "leader.lock"))
+
+        async def fetch(**kwargs):
+            return []
+        monkeypatch.setattr(core, "_fetch_jobs_from_api", fetch)
+
+        await refresher.run(interval=0.01, once=True)
+        await refresher.run(interval=0.01, once=True)
+
+        assert store.read(main.PIPELINE_GRAPH_SNAPSHOT).version == 2
+        assert store.read(f"{main.PIPELINE_GRAPH_SNAPSHOT}.gz").version == 2
+        # The lock is released after running
+        assert not core.snapshot_leader.held
+
+    def test_requires_snapshot_dir(self, monkeypatch):
+        from app import refresher
+
+        monkeypatch.setattr(core, "snapshots", None)
+        with pytest.raises(SystemExit):
+            refresher.main(["--once"])
+
+    def test_runs_without_the_api(self, tmp_path):
+        # From outside backend/, where the frontend build the API mounts isn't
+        script = "import sys, app.refresher; sys.exit('app.main' in sys.modules)"
+        env = {**os.environ, "PYTHONPATH": str(Path(__file__).parents[2])}
+        assert subprocess.run([sys.executable, "-c", script], cwd=tmp_path, env=env).returncode == 0
@@ -2,7 +2,11 @@
 Unit tests for StorageNode class
 """
 import pytest
-from app.lib.ts import StorageNode
+from pydantic_core import to_json
+
+from app.lib.ts import NodeTable, StorageNode
+from app.core import _process_jobs_to_graph
+from tests.fixtures.synthetic_jobs import generate_jobs
 
 
 class TestStorageNode:
@@ -83,4 +87,48 @@ class TestStorageNode:
         
         # So they will create separate entries in a set despite same hash
         node_set = {node1, node2}
-        assert len(node_set) == 2
\ No newline at end of file
+        assert len(node_set) == 2
+
+    def test_storage_node_is_immutable_and_slotted(self):
+        """Test that StorageNodes can't be changed and carry no __dict__"""
+        node = StorageNode(id="kafka_cluster1:topic1", connector_type="KAFKA")
+
+        with pytest.raises(AttributeError):
+            node.id = "kafka_cluster1:topic2"
+        assert not hasattr(node, '__dict__')
+
+    def test_storage_node_json(self):
+        """Test that StorageNodes serialize with their field names"""
+        node = StorageNode(id="kafka_cluster1:topic1", connector_type="KAFKA")
+
+        assert to_json([node]) == b'[{"id":"kafka_cluster1:topic1","connector_type":"KAFKA"}]'
+
+
+class TestNodeTable:
+    """Test interning of StorageNodes"""
+
+    def test_same_node_shared(self):
+        """Test that asking for an existing node returns the same object"""
+        table = NodeTable()
+        first = table.node("kafka_cluster1:" + "topic1", "KAFKA")
+        second = table.node("kafka_cluster1:" + "topic1", "KAFKA")
+
+        assert first is second
+        assert len(table) == 1
+
+    def test_connector_type_kept_apart(self):
+        """Test that the same ID with another connector type is another node"""
+        table = NodeTable()
+        kafka = table.node("cluster1:resource1", "KAFKA")
+        es = table.node("cluster1:resource1", "ES")
+
+        assert kafka != es
+        assert list(table) == [kafka, es]
+
+    def test_graph_build_shares_nodes(self):
+        """Test that jobs sharing a topic share its node, and its id string"""
+        graph = _process_jobs_to_graph(generate_jobs(200, seed=1))
+        ids = {node.id: node.id for node in graph['nodes']}
+
+        assert all(ids[link['source']] is link['source'] for link in graph['links'])
+        assert all(ids[link['target']] is link['target'] for link in graph['links'])
@@ -0,0 +1,142 @@
+import json
+import re
+import time
+
+import pytest
+
+from app.lib.subgraph import GraphFilter, SubgraphIndex
+from app.core import _process_jobs_to_graph
+from tests.fixtures.teraslice_jobs import make_job
+
+
+JOBS = [
+    # team-a: a-incoming -> a-stage -> index-a
+    make_job('job_1', 'a-incoming', 'a-stage', name='team-a-enrich'),
+    make_job('job_2', 'a-stage', 'index-a', status='failing', name='team-a-index'),
+    # team-b: b-incoming -> index-b
+    make_job('job_3', 'b-incoming', 'index-b', status='stopped', name='team-b-index'),
+]
+
+
+@pytest.fixture
+def index():
+    return SubgraphIndex(_process_jobs_to_graph(JOBS))
+
+
+def ids(result):
+    return [node.id for node in result['nodes']], [link['job_id'] for link in result['links']]
+
+
+class TestSubgraphIndex:
+    def test_node_id_substring(self, index):
+        # Case-insensitive, and the links between matched nodes come along
+        assert ids(index.subgraph(GraphFilter(q='CLUSTER1:A'))) == (
+            ['kafka_cluster1:a-incoming', 'kafka_cluster1:a-stage'], ['job_1'],
+        )
+
+    def test_job_name_matches_its_nodes(self, index):
+        assert ids(index.subgraph(GraphFilter(q='team-a-index'))) == (
+            ['kafka_cluster1:a-stage', 'es_cluster1:index-a'], ['job_2'],
+        )
+        assert ids(index.subgraph(GraphFilter(q='job_3'))) == (
+            ['kafka_cluster1:b-incoming', 'es_cluster1:index-b'], ['job_3'],
+        )
+
+    def test_regex(self, index):
+        assert ids(index.subgraph(GraphFilter(q=r'INDEX-[ab]$', regex=True)))[0] == [
+            'es_cluster1:index-a', 'es_cluster1:index-b',
+        ]
+        with pytest.raises(re.error):
+            index.subgraph(GraphFilter(q='(', regex=True))
+
+    @pytest.mark.parametrize('q', ['(x|x)*y', '(.|.)*!', '(a+)+$'])
+    def test_regex_time_bounded(self, q):
+        # Patterns `re` takes exponential time to fail to match with
+        jobs = [make_job('job_1', 'x' * 5000 + '-', 'a' * 5000 + '-', name='a' * 5000 + '-')]
+        index = SubgraphIndex(_process_jobs_to_graph(jobs))
+        start = time.perf_counter()
+        assert ids(index.subgraph(GraphFilter(q=q, regex=True))) == ([], [])
+        assert time.perf_counter() - start < 1
+
+    @pytest.mark.parametrize('q', ['a' * 101, r'(a)\1', '(?=a)'])
+    def test_regex_rejected(self, index, q):
+        # Too long, or not supported by RE2
+        with pytest.raises(re.error):
+            index.subgraph(GraphFilter(q=q, regex=True))
+
+    def test_regex_not_set(self):
+        assert GraphFilter(q='(a+)+$').pattern() is None
+
+    def test_connector_type(self, index):
+        assert ids(index.subgraph(GraphFilter(connector_types=('ES',)))) == (
+            ['es_cluster1:index-a', 'es_cluster1:index-b'], [],
+        )
+
+    def test_depth(self, index):
+        result = index.subgraph(GraphFilter(connector_types=('ES',), q='index-a', depth=1))
+        assert ids(result) == (['kafka_cluster1:a-stage', 'es_cluster1:index-a'], ['job_2'])
+
+        result = index.subgraph(GraphFilter(q='index-a', depth=2))
+        assert ids(result)[1] == ['job_1', 'job_2']
+
+    def test_status(self, index):
+        assert ids(index.subgraph(GraphFilter(statuses=('running', 'stopped')))) == (
+            ['kafka_cluster1:a-incoming', 'kafka_cluster1:a-stage',
+             'kafka_cluster1:b-incoming', 'es_cluster1:index-b'],
+            ['job_1', 'job_3'],
+        )
+
+    def test_depth_follows_only_kept_jobs(self, index):
+        result = index.subgraph(GraphFilter(statuses=('running',), q='a-incoming', depth=5))
+        assert ids(result) == (['kafka_cluster1:a-incoming', 'kafka_cluster1:a-stage'], ['job_1'])
+
+    def test_no_matches(self, index):
+        assert ids(index.subgraph(GraphFilter(q='nothing'))) == ([], [])
+
+    def test_json_memoized(self, index):
+        graph_filter = GraphFilter(q='team-a')
+        assert index.memoized(graph_filter) is None
+        payload = index.subgraph_json(graph_filter)
+        assert index.memoized(graph_filter) is payload
+        assert index.subgraph_json(graph_filter) is payload
+        assert [link['job_id'] for link in json.loads(payload)['links']] == ['job_1', 'job_2']
+
+
+class TestFilteredPipelineGraph:
+    @pytest.fixture(autouse=True)
+    def teraslice(self, serve_jobs):
+        serve_jobs(JOBS)
+
+    def test_unfiltered(self, client):
+        graph = client.get("/api/pipeline_graph").json()
+        assert len(graph['links']) == 3
+
+    def test_filtered(self, client):
+        response = client.get("/api/pipeline_graph",
+                              params={'connector_type': ['es'], 'q': 'index-a', 'depth': 1})
+        assert response.status_code == 200
+        assert [node['id'] for node in response.json()['nodes']] == ['kafka_cluster1:a-stage', 'es_cluster1:index-a']
+
+        response = client.get("/api/pipeline_graph", params={'status': ['failing', 'stopped']})
+        assert [link['job_id'] for link in response.json()['links']] == ['job_2', 'job_3']
+
+    def test_filters_memoized(self, client, monkeypatch):
+        params = {'q': 'team', 'status': 'running'}
+        first = client.get("/api/pipeline_graph", params=params)
+        computed = []
+        monkeypatch.setattr(SubgraphIndex, 'subgraph',
+                            lambda self, graph_filter: computed.append(graph_filter))
+        # The same filter whatever order the parameters come in
+        second = client.get("/api/pipeline_graph", params={'status': 'running', 'q': 'team'})
+        assert second.content == first.content
+        assert computed == []
+
+    @pytest.mark.parametrize('params,status_code', [
+        ({'q': '(', 'regex': 'true'}, 400),
+        ({'q': '(?=a)', 'regex': 'true'}, 400),
+        ({'q': '(x|x)*y', 'regex': 'true'}, 200),
+        ({'q': '(a+)+$'}, 200),
+        ({'q': 'a', 'depth': -1}, 422),
+    ])
+    def test_bad_filters(self, client, params, status_code):
+        assert client.get("/api/pipeline_graph", params=params).status_code == status_code
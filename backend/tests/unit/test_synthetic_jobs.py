@@ -0,0 +1,61 @@
+import pytest
+import logging
+
+from app.lib.ts import JobInfo
+from app.core import _process_jobs_to_graph
+from benchmarks.suite import compare, run
+from tests.fixtures.synthetic_jobs import generate_jobs
+
+
+class TestGenerateJobs:
+    def test_seeded(self):
+        assert generate_jobs(50, seed=1) == generate_jobs(50, seed=1)
+        assert generate_jobs(50, seed=1) != generate_jobs(50, seed=2)
+
+    def test_every_job_is_understood(self, caplog):
+        jobs = generate_jobs(500)
+        with caplog.at_level(logging.WARNING):
+            for job in jobs:
+                JobInfo(job, logging.getLogger(__name__))
+        assert caplog.records == []
+
+    def test_covers_connector_types(self):
+        graph = _process_jobs_to_graph(generate_jobs(500))
+        assert {node.connector_type for node in graph['nodes']} == {
+            'KAFKA', 'ES', 'FILE', 'S3', 'DATA_GENERATOR', 'NOOP', 'STDOUT'
+        }
+
+    def test_jobs_form_multi_stage_pipelines(self):
+        graph = _process_jobs_to_graph(generate_jobs(500))
+        targets = {link['target'] for link in graph['links']}
+        sources = {link['source'] for link in graph['links']}
+        # Plenty of topics are written by one job and read by another
+        assert len(targets & sources) > 50
+
+    def test_routing_size(self):
+        jobs = generate_jobs(200, routing_size=(300, 300))
+        routed = [job['operations'][-1] for job in jobs if job['operations'][-1]['_op'] == 'routed_sender']
+        assert routed
+        assert all(len(op['routing']) == 300 for op in routed)
+
+
+class TestBenchmarks:
+    def test_run(self):
+        results = run([20], ['process_graph', 'serialize'], repeat=1)
+        assert set(results) == {'process_graph/20', 'serialize/20'}
+        assert results['process_graph/20']['seconds'] > 0
+        assert results['process_graph/20']['peak_bytes'] > 0
+
+    def test_compare(self):
+        baseline = {
+            'a/100': {'seconds': 1.0, 'peak_bytes': 1000},
+            'b/100': {'seconds': 1.0, 'peak_bytes': 1000},
+        }
+        results = {
+            'a/100': {'seconds': 1.2, 'peak_bytes': 1050},
+            'b/100': {'seconds': 1.5, 'peak_bytes': 2000},
+            'c/100': {'seconds': 9.0, 'peak_bytes': 9000},
+        }
+        regressions = compare(results, baseline, time_tolerance=0.25, memory_tolerance=0.10)
+        assert len(regressions) == 2
+        assert all(r.startswith('b/100') for r in regressions)
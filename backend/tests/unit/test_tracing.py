@@ -0,0 +1,124 @@
+import pytest
+import httpx
+import json
+from fastapi.testclient import TestClient
+
+from app import core, main
+from app.lib.tracing import RequestTrace, TraceBuffer, _current_trace, describe, span
+
+
+TEST_JOBS = [{
+    'job_id': 'job_1',
+    'name': 'pipeline_1',
+    'workers': 1,
+    'ex': {'_status': 'running'},
+    'operations': [
+        {'_op': 'kafka_reader', 'topic': 'topic_1'},
+        {'_op': 'elasticsearch_bulk', 'index': 'index_1'}
+    ]
+}]
+
+
+def finished_trace(route, duration):
+    trace = RequestTrace('GET', route)
+    trace.route = route
+    trace.duration = duration
+    return trace
+
+
+class TestSpans:
+    def test_span_outside_request_is_noop(self):
+        with span('anything'):
+            pass
+        describe('anything', 'hit')
+
+    def test_spans_are_summed(self):
+        trace = RequestTrace('GET', '/api/x')
+        token = _current_trace.set(trace)
+        try:
+            with span('parse'):
+                pass
+            with span('parse'):
+                pass
+            describe('jobs_cache', 'hit')
+        finally:
+            _current_trace.reset(token)
+
+        assert list(trace.phases) == ['parse']
+        header = trace.server_timing()
+        assert header.startswith('parse;dur=')
+        assert 'jobs_cache;desc="hit"' in header
+        assert header.split(', ')[-1].startswith('total;dur=')
+
+    def test_finished_trace_ignores_late_spans(self):
+        trace = RequestTrace('GET', '/api/x')
+        trace.finish()
+        trace.add('refresh', 1.0)
+        assert trace.phases == {}
+
+
+class TestTraceBuffer:
+    def test_keeps_slowest_per_route(self):
+        buffer = TraceBuffer(size=2)
+        for duration in (0.1, 0.5, 0.2, 0.3):
+            buffer.record(finished_trace('/api/pipeline_graph', duration))
+        buffer.record(finished_trace('/api/jobs', 0.05))
+
+        slowest = buffer.slowest('/api/pipeline_graph')
+        assert [t['duration_ms'] for t in slowest['/api/pipeline_graph']] == [500.0, 300.0]
+        assert set(buffer.slowest()) == {'/api/pipeline_graph', '/api/jobs'}
+
+    def test_disabled_buffer_records_nothing(self):
+        buffer = TraceBuffer(size=0)
+        buffer.record(finished_trace('/api/jobs', 1.0))
+        assert buffer.slowest() == {}
+
+
+class TestServerTimingHeader:
+    def setup_method(self):
+        self.client = TestClient(main.app)
+        main.cache.clear()
+
+    def teardown_method(self):
+        main.cache.clear()
+        main.trace_buffer.clear()
+
+    def test_pipeline_graph_phases(self, monkeypatch):
+        monkeypatch.setattr(core, '_teraslice_client',
+                            lambda: httpx.AsyncClient(transport=httpx.MockTransport(
+                                lambda request: httpx.Response(200, content=json.dumps(TEST_JOBS).encode()))))
+
+        cold = self.client.get("/api/pipeline_graph")
+        warm = self.client.get("/api/pipeline_graph")
+
+        cold_phases = {entry.split(';')[0] for entry in cold.headers['server-timing'].split(', ')}
+        assert {'jobs_cache', 'upstream', 'decode', 'parse', 'dedup', 'serialize', 'total'} <= cold_phases
+        assert 'jobs_cache;desc="miss"' in cold.headers['server-timing']
+
+        assert 'jobs_cache;desc="hit"' in warm.headers['server-timing']
+        assert 'graph;desc="memoized"' in warm.headers['server-timing']
+        assert 'upstream' not in warm.headers['server-timing']
+
+    def test_version_has_total_only(self):
+        response = self.client.get("/api/version")
+        assert response.headers['server-timing'].startswith('total;dur=')
+
+    def test_traces_endpoint(self, monkeypatch):
+        monkeypatch.setattr(main.trace_buffer, 'size', 5)
+        monkeypatch.setattr(main.settings, 'admin_token', 'secret')
+        monkeypatch.setattr(core, '_teraslice_client',
+                            lambda: httpx.AsyncClient(transport=httpx.MockTransport(
+                                lambda request: httpx.Response(200, content=json.dumps(TEST_JOBS).encode()))))
+        self.client.get("/api/pipeline_graph")
+        self.client.get("/api/version")
+
+        assert self.client.get("/api/debug/traces").status_code == 403
+        data = self.client.get("/api/debug/traces", params={'endpoint': '/api/pipeline_graph'},
+                               headers={'X-Admin-Token': 'secret'}).json()
+
+        assert data['buffer_size'] == 5
+        traces = data['traces']['/api/pipeline_graph']
+        assert len(traces) == 1
+        assert traces[0]['status'] == 200
+        assert 'parse' in traces[0]['phases_ms']
+        assert '/api/version' not in data['traces']